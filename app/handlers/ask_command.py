@@ -1,14 +1,26 @@
+import asyncio
 import hashlib
 import re
 import logging
 import json
+import time
 from slack_bolt.async_app import AsyncAck, AsyncRespond
 
 # Use relative imports because the app root is the Python path in Docker
-from app.services.redis_service import RedisService
-from app.services.knowledge_base import KnowledgeBaseService
-from app.services.openai_service import OpenAIService
+from app.services.admission import AdmissionRejected
+from app.services.ask_queue import AskJob
+from app.services.container import ServiceContainer, get_services
+from app.services.resilience import CircuitOpenError
 from app.utils import config
+from app.utils.metrics import (
+    ANSWER_CACHE_LOOKUPS,
+    ASK_IN_FLIGHT,
+    ASK_REQUESTS,
+    OPENAI_FIRST_TOKEN_SECONDS,
+    RETRIEVED_CHUNKS,
+    RETRIEVED_TOKENS,
+    stage_timer,
+)
 import datetime
 
 logger = logging.getLogger(__name__)
@@ -42,12 +54,84 @@ generic_error_blocks = [
 openai_error_blocks = [
     {"type": "section", "text": {"type": "mrkdwn", "text": ":robot_face: Sorry, I'm having trouble connecting to my brain right now. Please try again soon!"}}
 ]
+busy_blocks = [
+    {"type": "section", "text": {"type": "mrkdwn", "text": ":hourglass: I'm answering a lot of questions right now. Please try again in a minute!"}}
+]
 not_found_blocks = [
     {"type": "section", "text": {"type": "mrkdwn", "text": ":mag: I couldn't find a specific answer to your question, but you can try rephrasing or asking something else!"}}
 ]
 
+
+class ProgressiveReply:
+    """
+    Shows a streaming answer by posting a placeholder and replacing it in place.
+
+    Slash command response URLs accept only a handful of messages, so updates
+    are throttled to `min_interval` seconds and capped at `max_messages`
+    (placeholder and final answer included).
+    """
+    def __init__(self, respond, question: str, min_interval: float = 1.5, max_messages: int = 5):
+        self.respond = respond
+        self.question = question
+        self.min_interval = min_interval
+        self.max_messages = max_messages
+        self.sent = 0
+        self._last_sent = 0.0
+        self._placeholder = None
+
+    def start(self):
+        """Posts the placeholder in the background so retrieval is not delayed."""
+        if self._placeholder is None:
+            self._placeholder = asyncio.create_task(
+                self._post(format_block_kit(":hourglass_flowing_sand: _Thinking..._", question_text=self.question))
+            )
+
+    async def _post(self, blocks):
+        if self.sent:
+            await self.respond(blocks=blocks, replace_original=True)
+        else:
+            await self.respond(blocks=blocks)
+        self.sent += 1
+        self._last_sent = time.monotonic()
+
+    async def _wait_for_placeholder(self):
+        if self._placeholder is None:
+            return
+        try:
+            await self._placeholder
+        except Exception as e:
+            logger.exception(f"Failed to post placeholder: {e}")
+
+    async def update(self, partial_text: str):
+        """Shows the answer so far, unless throttled. One message is kept for the final answer."""
+        await self._wait_for_placeholder()
+        if self.sent >= self.max_messages - 1 or time.monotonic() - self._last_sent < self.min_interval:
+            return
+        await self._post(format_block_kit(partial_text + " :writing_hand:", question_text=self.question))
+
+    async def send(self, blocks):
+        """Posts the final message, replacing the placeholder if one was shown."""
+        await self._wait_for_placeholder()
+        await self._post(blocks)
+
+
+STALE_ANSWER_NOTE = "\n\n_:warning: I can't reach OpenAI right now, so this is a previously saved answer._"
+
+
 # Handler for /ask command
-async def handle_ask_command(ack, command, respond):
+async def handle_ask_command(ack, command, respond, services: ServiceContainer = None, allow_queue: bool = True):
+    """
+    Answers an /ask slash command. With ASK_MODE=queue (and `allow_queue`)
+    the command is only acknowledged and enqueued for `app.worker`.
+    """
+    ASK_IN_FLIGHT.inc()
+    try:
+        await _handle_ask_command(ack, command, respond, services, allow_queue)
+    finally:
+        ASK_IN_FLIGHT.dec()
+
+
+async def _handle_ask_command(ack, command, respond, services: ServiceContainer = None, allow_queue: bool = True):
     user_id = command.get('user_id', 'unknown')
     question = command.get('text', '').strip()
     timestamp = datetime.datetime.utcnow().isoformat()
@@ -56,63 +140,197 @@ async def handle_ask_command(ack, command, respond):
     normalized = re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', '', question.lower())).strip()
     cache_key = hashlib.sha256(normalized.encode()).hexdigest()
 
-    logger.info(f"/ask command received | user_id={user_id} | timestamp={timestamp} | request_id={cache_key}")
-    redis_service = RedisService()
-    kb_service = KnowledgeBaseService(config.PDF_DATA_DIR)
-    openai_service = OpenAIService()
+    with stage_timer("ack"):
+        await ack()  # Immediate ack
 
-    await ack()  # Immediate ack
+    logger.info(f"/ask command received | user_id={user_id} | question={question} | timestamp={timestamp} | request_id={cache_key}")
+
+    # Shared, pre-warmed services (created once per worker at startup)
+    services = services or get_services()
+    redis_service = services.redis_service
+    kb_service = services.kb_service
+    openai_service = services.openai_service
+    semantic_cache = services.semantic_cache
+    answer_cache = services.answer_cache
 
     if not question:
         usage = "*Usage:* `/ask <your question>`\n_Ask a question and I'll try to answer using my knowledge base and OpenAI._"
         await respond(blocks=format_block_kit(usage))
+        ASK_REQUESTS.labels(outcome="usage").inc()
         return
 
-    # --- Redis get_value with error handling ---
+    # --- Queue mode: a worker answers via the response_url ---
+    if allow_queue and config.ASK_MODE == "queue" and command.get("response_url"):
+        with stage_timer("enqueue"):
+            entry_id = await services.ask_queue.enqueue(AskJob.from_command(command))
+        if entry_id:
+            ASK_REQUESTS.labels(outcome="queued").inc()
+            logger.info(f"/ask queued as {entry_id} | request_id={cache_key}")
+            return
+        logger.warning(f"Could not enqueue /ask, answering inline | request_id={cache_key}")
+
+    # --- Redis get_value with error handling (outdated by a PDF change = miss) ---
     try:
-        cached_answer = await redis_service.get_value(cache_key)
+        with stage_timer("cache_get"):
+            cached_answer = await answer_cache.get(cache_key)
     except Exception as e:
         logger.exception(f"Redis get_value error for /ask: {question}")
         cached_answer = None  # Proceed as cache miss
 
     if cached_answer:
-        await respond(blocks=format_block_kit(cached_answer, question_text=question))
+        ANSWER_CACHE_LOOKUPS.labels(tier="exact", result="hit").inc()
+        with stage_timer("respond"):
+            await respond(blocks=format_block_kit(cached_answer, question_text=question))
+        ASK_REQUESTS.labels(outcome="cache_hit").inc()
         logger.info(f"Cache hit for key: {cache_key}")
         return
     else:
+        ANSWER_CACHE_LOOKUPS.labels(tier="exact", result="miss").inc()
         logger.info(f"Cache miss for key: {cache_key}")
 
+    # --- Semantic (near-duplicate) cache lookup ---
+    if semantic_cache:
+        try:
+            with stage_timer("semantic_lookup"):
+                match = await semantic_cache.lookup(normalized, request_id=cache_key)
+                if match:
+                    cached_answer = await answer_cache.get(match[0])
+        except Exception as e:
+            logger.exception(f"Semantic cache lookup error for /ask: {question}")
+            cached_answer = None
+        ANSWER_CACHE_LOOKUPS.labels(tier="semantic", result="hit" if cached_answer else "miss").inc()
+        if cached_answer:
+            with stage_timer("respond"):
+                await respond(blocks=format_block_kit(cached_answer, question_text=question))
+            ASK_REQUESTS.labels(outcome="semantic_hit").inc()
+            logger.info(f"Semantic cache hit for key: {cache_key} | matched={match[0]} | similarity={match[1]:.2f}")
+            return
+
+    # --- Streaming replies show the answer while it is generated ---
+    reply = ProgressiveReply(respond, question, min_interval=config.OPENAI_STREAM_UPDATE_INTERVAL,
+                             max_messages=config.SLACK_RESPONSE_MAX_MESSAGES)
+
+    # --- Single-flight: one retrieval + OpenAI call per question at a time ---
+    async def generate():
+        return await _generate_answer(question, normalized, cache_key, services,
+                                      reply=reply if config.OPENAI_STREAMING else None)
+
+    async def fetch_cached():
+        # Followers on other replicas pick up the leader's cached answer
+        cached = await answer_cache.get(cache_key)
+        return (cached, None) if cached else None
+
+    single_flight = services.single_flight
+    if single_flight:
+        answer, error_blocks = await single_flight.do(cache_key, generate, fetch_result=fetch_cached)
+    else:
+        answer, error_blocks = await generate()
+
+    if error_blocks:
+        with stage_timer("respond"):
+            await reply.send(error_blocks)
+        ASK_REQUESTS.labels(outcome="busy" if error_blocks is busy_blocks else "error").inc()
+        return
+
+    # --- Not found or no answer logic ---
+    if answer is None or (isinstance(answer, str) and not answer.strip()):
+        with stage_timer("respond"):
+            await reply.send(not_found_blocks)
+        ASK_REQUESTS.labels(outcome="not_found").inc()
+        logger.warning(f"No answer found for /ask: {question} | request_id={cache_key}")
+        logger.info(f"Sending answer (source: not_found) | request_id={cache_key}")
+        return
+
+    with stage_timer("respond"):
+        await reply.send(format_block_kit(answer, question_text=question))
+    ASK_REQUESTS.labels(outcome="answered").inc()
+    # Check if the answer came from cache or OpenAI
+    source = "cache" if cached_answer else "openai"
+    logger.info(f"Sending answer (source: {source}) | request_id={cache_key}")
+
+
+async def _generate_answer(question: str, normalized: str, cache_key: str, services: ServiceContainer,
+                           reply: ProgressiveReply = None):
+    """
+    Retrieves context, asks OpenAI and caches the answer.
+    With `reply`, the answer is streamed and shown progressively while it is generated.
+    Returns (answer, error_blocks); error_blocks is set when a service failed.
+    """
+    if reply:
+        reply.start()
+
     # --- KnowledgeBaseService with error handling ---
     try:
-        context = await kb_service.find_relevant_context(question, request_id=cache_key)
+        with stage_timer("retrieval"):
+            packed = await services.kb_service.retrieve(question, request_id=cache_key)
+        RETRIEVED_TOKENS.observe(packed.tokens)
+        RETRIEVED_CHUNKS.observe(len(packed.chunks))
+        context = packed.text
+        # Versions of the PDFs behind this answer; a change to any of them invalidates it
+        dependencies = services.answer_cache.dependencies(chunk.doc_id for chunk in packed.chunks)
     except Exception as e:
         logger.exception(f"KnowledgeBaseService error for /ask: {question}")
-        await respond(blocks=generic_error_blocks)
-        return
+        return None, generic_error_blocks
 
     # --- OpenAIService with error handling ---
     try:
-        answer = await openai_service.get_answer(question, context, request_id=cache_key)
+        with stage_timer("openai"):
+            if reply:
+                answer = await _stream_answer(question, packed, cache_key, services.openai_service, reply)
+            else:
+                answer = await services.openai_service.get_answer(question, context, request_id=cache_key,
+                                                                  retrieval=packed)
+    except AdmissionRejected:
+        logger.warning(f"OpenAI admission rejected for /ask: {question} | request_id={cache_key}")
+        return None, busy_blocks
+    except CircuitOpenError:
+        logger.warning(f"OpenAI circuit open for /ask: {question} | request_id={cache_key}")
+        return await _stale_answer(cache_key, services)
     except Exception as e:
         logger.exception(f"OpenAIService error for /ask: {question}")
-        await respond(blocks=openai_error_blocks)
-        return
+        return await _stale_answer(cache_key, services)
 
-    # --- Not found or no answer logic ---
     if answer is None or (isinstance(answer, str) and not answer.strip()):
-        await respond(blocks=not_found_blocks)
-        logger.warning(f"No answer found for /ask: {question} | request_id={cache_key}")
-        logger.info(f"Sending answer (source: not_found) | request_id={cache_key}")
-        return
+        return None, None
 
     # --- Redis set_value with error handling ---
     try:
-        await redis_service.set_value(cache_key, answer, ttl_seconds=86400)
+        with stage_timer("cache_set"):
+            await services.answer_cache.put(cache_key, answer, dependencies)
+            if services.semantic_cache:
+                await services.semantic_cache.store(normalized, cache_key, ttl_seconds=config.ANSWER_CACHE_TTL)
     except Exception as e:
         logger.exception(f"Redis set_value error for /ask: {question}")
         # Do not block sending the answer to the user
 
-    await respond(blocks=format_block_kit(answer, question_text=question))
-    # Check if the answer came from cache or OpenAI
-    source = "cache" if cached_answer else "openai"
-    logger.info(f"Sending answer (source: {source}) | request_id={cache_key}") 
\ No newline at end of file
+    return answer, None
+
+
+async def _stale_answer(cache_key: str, services: ServiceContainer):
+    """Falls back to an expired answer when OpenAI cannot be used; otherwise reports the error."""
+    try:
+        stale = await services.answer_cache.get_stale(cache_key)
+    except Exception as e:
+        logger.exception(f"Redis get_value error for stale answer | request_id={cache_key}")
+        stale = None
+    ANSWER_CACHE_LOOKUPS.labels(tier="stale", result="hit" if stale else "miss").inc()
+    if stale:
+        logger.info(f"Serving stale answer | request_id={cache_key}")
+        return stale + STALE_ANSWER_NOTE, None
+    return None, openai_error_blocks
+
+
+async def _stream_answer(question: str, packed, cache_key: str, openai_service, reply: ProgressiveReply) -> str:
+    """Consumes the OpenAI stream for the `packed` context, pushing throttled partial answers to Slack."""
+    parts = []
+    first_token_at = None
+    started = time.monotonic()
+    async for delta in openai_service.stream_answer(question, packed.text, request_id=cache_key, retrieval=packed):
+        if first_token_at is None:
+            first_token_at = time.monotonic()
+            OPENAI_FIRST_TOKEN_SECONDS.observe(first_token_at - started)
+            logger.info(f"First answer token after {first_token_at - started:.2f}s | request_id={cache_key}")
+        parts.append(delta)
+        await reply.update("".join(parts))
+    return "".join(parts)
+
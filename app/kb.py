@@ -0,0 +1,69 @@
+"""
+Knowledge base artifacts, built ahead of time.
+
+    python -m app.kb build
+
+Extracts every PDF in PDF_DATA_DIR into the extraction cache (PDF_CACHE_DIR),
+writes the chunk corpus store (CORPUS_DIR) and, for dense or hybrid
+retrieval, the chunk embeddings (VECTOR_INDEX_DIR). Run it in the image
+build or in an init container sharing those directories with the app: web
+and worker processes then map the prebuilt corpus at boot instead of
+parsing and chunking PDFs. A corpus that no longer matches the PDFs (or the
+chunking settings) is ignored and rebuilt by the first process to load it.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from app.utils import config
+from app.utils.logging_config import setup_logging
+
+
+async def build(pdf_dir: str = None, ingest_workers: int = None, rebuild: bool = True) -> dict:
+    """Builds every artifact for `pdf_dir` and returns a summary of what was written."""
+    from app.services.knowledge_base import KnowledgeBaseService
+
+    kb = KnowledgeBaseService(pdf_dir or config.PDF_DATA_DIR, ingest_workers=ingest_workers)
+    started = time.perf_counter()
+    try:
+        documents = await kb.load(rebuild=rebuild)
+    finally:
+        await kb.close()
+    stats = kb.stats()
+    return {
+        "pdf_dir": kb.pdf_data_dir,
+        "documents": documents,
+        "chunks": stats["chunks"],
+        "corpus": stats["corpus"],
+        "vectors": stats["vectors"],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.kb", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="extract, chunk and index the PDFs")
+    build_parser.add_argument("--pdf-dir", help="defaults to PDF_DATA_DIR")
+    build_parser.add_argument("--workers", type=int, help="extraction processes (defaults to INGEST_WORKERS)")
+    build_parser.add_argument("--reuse", action="store_true",
+                              help="keep an existing corpus store that still matches the PDFs")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if not config.CORPUS_DIR:
+        print("CORPUS_DIR is empty: only the extraction cache will be written.", file=sys.stderr)
+    summary = asyncio.run(build(args.pdf_dir, args.workers, rebuild=not args.reuse))
+    print(json.dumps(summary, indent=2))
+    if summary["corpus"] is None and config.CORPUS_DIR:
+        print(f"Failed to write the corpus store to {config.CORPUS_DIR}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,12 +26,16 @@ logger.info("SlackGPT application starting...")
 # Import config variables first
 from app.utils import config
 
+config.validate()
+
 from slack_bolt.async_app import AsyncApp
+from slack_bolt.authorization.async_authorize import AsyncInstallationStoreAuthorize
 # Add OAuth related imports
 from slack_bolt.oauth.async_oauth_settings import AsyncOAuthSettings
 # Reverted paths for v1.18 -> Corrected paths using slack_sdk for v1.18
 from slack_sdk.oauth.installation_store.file import FileInstallationStore
 from slack_sdk.oauth.state_store.file import FileOAuthStateStore
+from slack_sdk.web.async_client import AsyncWebClient
 
 # Load environment variables from .env file
 # load_dotenv() # This is now done in app.utils.config
@@ -48,19 +52,55 @@ try:
     # Define scopes required by the application
     bot_scopes = ["commands", "chat:write", "app_mentions:read"]
 
+    # Installations and OAuth state: local files, or Redis shared by every replica
+    if config.SLACK_STORE_BACKEND == "redis":
+        from app.services.container import current_services
+        from app.services.slack_stores import RedisInstallationStore, RedisOAuthStateStore
+
+        # Resolved per call: the container is only built by the lifespan warm-up, not at import
+        def redis_service():
+            return getattr(current_services(), "redis_service", None)
+
+        installation_store = RedisInstallationStore(redis_service, cache_ttl=config.SLACK_INSTALLATION_CACHE_TTL)
+        state_store = RedisOAuthStateStore(redis_service, expiration_seconds=600)
+    else:
+        installation_store = FileInstallationStore(base_dir=config.SLACK_INSTALLATION_DIR)
+        state_store = FileOAuthStateStore(expiration_seconds=600, base_dir=config.SLACK_STATE_DIR)
+
     # Configure OAuth settings explicitly
     oauth_settings = AsyncOAuthSettings(
         client_id=config.SLACK_CLIENT_ID,
         client_secret=config.SLACK_CLIENT_SECRET,
         scopes=bot_scopes,
-        installation_store=FileInstallationStore(base_dir="/app/data/installation"),
-        state_store=FileOAuthStateStore(expiration_seconds=600, base_dir="/app/data/state"),
+        installation_store=installation_store,
+        state_store=state_store,
     )
 
+    app_options = {}
+    slack_client = None
+    if config.SLACK_API_URL != AsyncWebClient.BASE_URL:
+        # Only replace Bolt's own client when the Web API URL is overridden
+        slack_client = AsyncWebClient(base_url=config.SLACK_API_URL)
+        app_options["client"] = slack_client
+    if config.SLACK_AUTHORIZE_CACHE:
+        # Bolt's default authorization with auth.test results cached per token.
+        # The cache never expires: a revoked token keeps authorizing until a restart.
+        app_options["authorize"] = AsyncInstallationStoreAuthorize(
+            logger=logger,
+            installation_store=installation_store,
+            client_id=config.SLACK_CLIENT_ID,
+            client_secret=config.SLACK_CLIENT_SECRET,
+            token_rotation_expiration_minutes=oauth_settings.token_rotation_expiration_minutes,
+            bot_only=oauth_settings.installation_store_bot_only,
+            user_token_resolution=oauth_settings.user_token_resolution,
+            cache_enabled=True,
+            client=slack_client,
+        )
     app = AsyncApp(
         # Initialize using signing secret and explicit OAuth settings
         signing_secret=config.SLACK_SIGNING_SECRET,
         oauth_settings=oauth_settings,
+        **app_options,
     )
 
     # Simple health check endpoint
@@ -121,5 +161,78 @@ if __name__ == "__main__":
         uvicorn.run(app, host="0.0.0.0", port=config.PORT)
 
 # Always create the ASGI adapter at module level for Uvicorn
+import asyncio
 from slack_bolt.adapter.asgi.async_handler import AsyncSlackRequestHandler
-api = AsyncSlackRequestHandler(app)
+from app.services.container import current_services, get_services, readiness_app
+
+
+class LifespanSlackRequestHandler(AsyncSlackRequestHandler):
+    """
+    Bolt ASGI adapter that starts and stops the shared service container
+    on the ASGI lifespan startup/shutdown events.
+
+    Startup completes at once, so the server accepts requests within a fraction
+    of a second; the services warm up in the background and READINESS_PATH
+    reports when they are ready. Questions asked before then wait for the load.
+    """
+    _startup_task = None
+
+    async def _start_services(self):
+        try:
+            # Importing the SDKs and building the clients happens off the event loop
+            services = await asyncio.to_thread(get_services)
+            # In queue mode the workers answer, so the web tier skips loading the corpus
+            await services.startup(load_knowledge_base=config.ASK_MODE != "queue")
+        except Exception as e:
+            logger.exception(f"Service startup failed: {e}")
+
+    async def _handle_lifespan(self, receive):
+        lifespan = await receive()
+        if lifespan["type"] == "lifespan.startup":
+            self._startup_task = asyncio.create_task(self._start_services())
+            return {"type": "lifespan.startup.complete"}
+        if lifespan["type"] == "lifespan.shutdown":
+            if self._startup_task is not None and not self._startup_task.done():
+                self._startup_task.cancel()
+                await asyncio.gather(self._startup_task, return_exceptions=True)
+            # Never build the container here: startup was cancelled or failed before creating it
+            services = current_services()
+            if services is not None:
+                await services.shutdown()
+            return {"type": "lifespan.shutdown.complete"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            # Keep handling lifespan messages until shutdown so the server
+            # delivers both events to this app.
+            while True:
+                message = await self._handle_lifespan(receive)
+                if message is None:
+                    continue
+                await send(message)
+                if message["type"] != "lifespan.startup.complete":
+                    return
+        await super().__call__(scope, receive, send)
+
+
+if isinstance(app, AsyncApp):
+    slack_api = LifespanSlackRequestHandler(app)
+else:
+    slack_api = AsyncSlackRequestHandler(app)
+
+from app.utils.metrics import metrics_app
+
+
+async def api(scope, receive, send):
+    """
+    ASGI entry point: serves Prometheus metrics on METRICS_PATH, the readiness
+    probe on READINESS_PATH, and routes everything else (Slack events, OAuth,
+    lifespan) to the Bolt adapter.
+    """
+    if scope["type"] == "http" and config.METRICS_ENABLED and scope.get("path") == config.METRICS_PATH:
+        await metrics_app(scope, receive, send)
+        return
+    if scope["type"] == "http" and scope.get("path") == config.READINESS_PATH:
+        await readiness_app(scope, receive, send)
+        return
+    await slack_api(scope, receive, send)
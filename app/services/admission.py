@@ -0,0 +1,186 @@
+"""
+Admission control for OpenAI calls.
+
+A concurrency limit plus token buckets for requests-per-minute and
+tokens-per-minute keep us just under the account's rate limits. Requests
+over budget wait in a FIFO queue for a bounded time instead of being sent
+and bounced with a 429; requests that cannot be admitted in time are
+rejected with `AdmissionRejected`.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from app.utils.metrics import OPENAI_IN_FLIGHT, OPENAI_QUEUE_DEPTH, OPENAI_QUEUE_WAIT_SECONDS, OPENAI_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted within the queue timeout."""
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `per_minute / 60` per second.
+    A limit of 0 disables the bucket.
+    """
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self._clock = clock
+        self._updated = clock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def cost(self, amount: float) -> float:
+        # A single request larger than the bucket would otherwise never be admitted
+        return min(float(amount), self.capacity)
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        missing = self.cost(amount) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float):
+        if self.enabled:
+            self._refill()
+            self.tokens -= self.cost(amount)
+
+    def refund(self, amount: float):
+        """Returns (or, if negative, charges) tokens after the real cost is known."""
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    rejected: int = 0
+    queued: int = 0
+    in_flight: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.admitted if self.admitted else 0.0
+
+
+class AdmissionTicket:
+    """Handed to an admitted caller so it can report the real token usage."""
+    def __init__(self, controller: "AdmissionController", estimated_tokens: int):
+        self._controller = controller
+        self.estimated_tokens = estimated_tokens
+
+    def settle(self, actual_tokens: Optional[int]):
+        """Corrects the TPM budget with the usage reported by the API."""
+        if actual_tokens is not None:
+            self._controller.tpm.refund(self.estimated_tokens - actual_tokens)
+            self.estimated_tokens = actual_tokens
+
+
+class AdmissionController:
+    """
+    Admits OpenAI requests under a concurrency limit and RPM/TPM budgets.
+    """
+    def __init__(self, max_concurrency: int = 16, rpm_limit: int = 0, tpm_limit: int = 0,
+                 max_queue_wait: float = 10.0, max_queue_depth: int = 100):
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self.max_queue_depth = max_queue_depth
+        self.rpm = TokenBucket(rpm_limit)
+        self.tpm = TokenBucket(tpm_limit)
+        self.stats = AdmissionStats()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # Serialises bucket waits so queued requests are admitted in arrival order
+        self._budget_lock = asyncio.Lock()
+
+    def snapshot(self) -> dict:
+        return {
+            "admitted": self.stats.admitted,
+            "rejected": self.stats.rejected,
+            "queued": self.stats.queued,
+            "in_flight": self.stats.in_flight,
+            "average_wait": round(self.stats.average_wait, 4),
+            "max_wait": round(self.stats.max_wait, 4),
+        }
+
+    def _reject(self, reason: str, request_id: str):
+        self.stats.rejected += 1
+        OPENAI_REJECTIONS.labels(reason=reason).inc()
+        logger.warning(f"OpenAI request rejected: {reason} | queued={self.stats.queued} | request_id={request_id}")
+        raise AdmissionRejected(reason)
+
+    async def _wait_for_budget(self, tokens: int, deadline: float, request_id: str):
+        async with self._budget_lock:
+            while True:
+                wait = max(self.rpm.wait_time(1), self.tpm.wait_time(tokens))
+                if wait == 0:
+                    self.rpm.take(1)
+                    self.tpm.take(tokens)
+                    return
+                if time.monotonic() + wait > deadline:
+                    self._reject("rate budget exhausted", request_id)
+                await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def admit(self, estimated_tokens: int, request_id: str = ""):
+        """
+        Waits (up to `max_queue_wait` seconds) for a free slot and enough
+        RPM/TPM budget, then yields an `AdmissionTicket`.
+        Raises AdmissionRejected if the queue is full or the wait would be too long.
+        """
+        if self.stats.queued >= self.max_queue_depth:
+            self._reject("queue full", request_id)
+        started = time.monotonic()
+        deadline = started + self.max_queue_wait
+        self.stats.queued += 1
+        OPENAI_QUEUE_DEPTH.inc()
+        acquired = False
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.max_queue_wait)
+                acquired = True
+            except asyncio.TimeoutError:
+                self._reject("no free slot", request_id)
+            await self._wait_for_budget(estimated_tokens, deadline, request_id)
+        except BaseException:
+            if acquired:
+                self._slots.release()
+            raise
+        finally:
+            self.stats.queued -= 1
+            OPENAI_QUEUE_DEPTH.dec()
+
+        waited = time.monotonic() - started
+        self.stats.admitted += 1
+        self.stats.total_wait += waited
+        self.stats.max_wait = max(self.stats.max_wait, waited)
+        self.stats.in_flight += 1
+        OPENAI_QUEUE_WAIT_SECONDS.observe(waited)
+        OPENAI_IN_FLIGHT.inc()
+        if waited > 0.05:
+            logger.info(f"OpenAI request admitted after {waited:.2f}s in queue | request_id={request_id}")
+        try:
+            yield AdmissionTicket(self, estimated_tokens)
+        finally:
+            self.stats.in_flight -= 1
+            OPENAI_IN_FLIGHT.dec()
+            self._slots.release()
@@ -0,0 +1,96 @@
+"""
+Answer cache with per-document dependency tracking.
+
+Each cached answer records the version of every PDF that contributed
+context to it. On read, those versions are compared with the knowledge
+base's current ones; if any document changed or disappeared the entry is
+treated as a miss. Updating one PDF therefore invalidates only the answers
+that depended on it, and nothing needs to be flushed.
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Dependency name used for answers built without any document context:
+# they are re-validated against the whole corpus instead.
+CORPUS_DEPENDENCY = "*"
+
+
+def encode_entry(answer: str, dependencies: Dict[str, str]) -> str:
+    return json.dumps({"answer": answer, "deps": dependencies})
+
+
+def decode_entry(raw: str) -> Tuple[str, Dict[str, str]]:
+    """Returns (answer, dependencies). Plain-text entries from older releases have none."""
+    if raw.startswith("{"):
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            entry = None
+        if isinstance(entry, dict) and "answer" in entry:
+            return entry["answer"], entry.get("deps") or {}
+    return raw, {}
+
+
+def stale_key(cache_key: str) -> str:
+    """Key of the long-lived copy of an answer, served while OpenAI is unavailable."""
+    return f"stale:{cache_key}"
+
+
+class AnswerCache:
+    """
+    Stores answers under their question cache key and validates them against
+    the knowledge base's document versions on read.
+    """
+    def __init__(self, redis_service, kb_service=None, ttl_seconds: int = 86400, stale_ttl_seconds: int = 0):
+        self.redis_service = redis_service
+        self.kb_service = kb_service
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+
+    def dependencies(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        """Current versions of the documents an answer was built from."""
+        if self.kb_service is None:
+            return {}
+        doc_ids = sorted(set(doc_ids))
+        if not doc_ids:
+            return {CORPUS_DEPENDENCY: self.kb_service.corpus_version}
+        return self.kb_service.document_versions(doc_ids)
+
+    def is_current(self, dependencies: Dict[str, str]) -> bool:
+        """
+        False if a document the answer depends on changed. Until the knowledge
+        base has loaded, versions are unknown and answers are served as current.
+        """
+        if not dependencies or self.kb_service is None or not getattr(self.kb_service, "loaded", True):
+            return True
+        corpus = dependencies.get(CORPUS_DEPENDENCY)
+        if corpus is not None and corpus != self.kb_service.corpus_version:
+            return False
+        documents = {doc: version for doc, version in dependencies.items() if doc != CORPUS_DEPENDENCY}
+        return not documents or self.kb_service.document_versions(documents) == documents
+
+    async def get(self, cache_key: str) -> Optional[str]:
+        """Returns the cached answer if every document it depends on is unchanged."""
+        raw = await self.redis_service.get_value(cache_key)
+        if not raw:
+            return None
+        answer, dependencies = decode_entry(raw)
+        if not self.is_current(dependencies):
+            logger.info(f"Cached answer outdated by a document change | request_id={cache_key}")
+            return None
+        return answer
+
+    async def get_stale(self, cache_key: str) -> Optional[str]:
+        """Returns the long-lived copy of an answer, current or not."""
+        raw = await self.redis_service.get_value(stale_key(cache_key))
+        return decode_entry(raw)[0] if raw else None
+
+    async def put(self, cache_key: str, answer: str, dependencies: Dict[str, str]):
+        entry = encode_entry(answer, dependencies)
+        await self.redis_service.set_value(cache_key, entry, ttl_seconds=self.ttl_seconds)
+        if self.stale_ttl_seconds:
+            await self.redis_service.set_value(stale_key(cache_key), entry, ttl_seconds=self.stale_ttl_seconds)
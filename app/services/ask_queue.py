@@ -0,0 +1,129 @@
+"""
+Durable queue of /ask jobs on a Redis Stream.
+
+With ASK_MODE=queue the web tier only acknowledges the slash command and
+enqueues it here; `python -m app.worker` processes read the stream through
+a consumer group, answer, and post to the job's response_url. An entry is
+acknowledged only after its answer was posted, so a worker that dies
+mid-job leaves it pending and another worker claims it once it has been
+idle long enough (at-least-once delivery).
+"""
+
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AskJob:
+    question: str
+    user_id: str
+    response_url: str
+    enqueued_at: float
+    channel_id: str = ""
+    team_id: str = ""
+
+    @classmethod
+    def from_command(cls, command: dict) -> "AskJob":
+        return cls(
+            question=command.get("text", ""),
+            user_id=command.get("user_id", "unknown"),
+            response_url=command.get("response_url", ""),
+            enqueued_at=time.time(),
+            channel_id=command.get("channel_id", ""),
+            team_id=command.get("team_id", ""),
+        )
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, str]) -> "AskJob":
+        """Rebuilds a job from stream fields. Raises KeyError/ValueError on malformed entries."""
+        return cls(
+            question=fields["question"],
+            user_id=fields["user_id"],
+            response_url=fields["response_url"],
+            enqueued_at=float(fields["enqueued_at"]),
+            channel_id=fields.get("channel_id", ""),
+            team_id=fields.get("team_id", ""),
+        )
+
+    def to_fields(self) -> Dict[str, str]:
+        return {key: str(value) for key, value in asdict(self).items()}
+
+    def to_command(self) -> dict:
+        """The slash command payload the /ask handler expects."""
+        return {
+            "text": self.question,
+            "user_id": self.user_id,
+            "response_url": self.response_url,
+            "channel_id": self.channel_id,
+            "team_id": self.team_id,
+        }
+
+
+class AskQueue:
+    """
+    Producer and consumer-group operations for the /ask stream.
+    Entries that cannot be processed are moved to `<stream>:dead`.
+    """
+    def __init__(self, redis_service, stream: str = "ask:jobs", group: str = "ask-workers",
+                 maxlen: int = 100000):
+        self.redis_service = redis_service
+        self.stream = stream
+        self.group = group
+        self.maxlen = maxlen
+        self.dead_letter_stream = f"{stream}:dead"
+
+    async def enqueue(self, job: AskJob) -> Optional[str]:
+        """Returns the entry ID, or None if the job could not be queued."""
+        return await self.redis_service.add_to_stream(self.stream, job.to_fields(), maxlen=self.maxlen)
+
+    async def ensure_group(self) -> bool:
+        return await self.redis_service.create_consumer_group(self.stream, self.group)
+
+    def _decode(self, entries) -> List[Tuple[str, Optional[AskJob]]]:
+        decoded = []
+        for entry_id, fields in entries:
+            try:
+                decoded.append((entry_id, AskJob.from_fields(fields)))
+            except (KeyError, ValueError) as e:
+                logger.error(f"Malformed /ask job {entry_id}: {e}")
+                decoded.append((entry_id, None))
+        return decoded
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> Optional[List[Tuple[str, Optional[AskJob]]]]:
+        """
+        New jobs for `consumer`; malformed entries are returned with a None job.
+        Returns None if the stream could not be read.
+        """
+        entries = await self.redis_service.read_from_group(self.stream, self.group, consumer, count, block_ms)
+        if entries is None:
+            return None
+        return self._decode(entries)
+
+    async def claim_idle(self, consumer: str, min_idle_seconds: float,
+                         count: int) -> List[Tuple[str, Optional[AskJob], int]]:
+        """
+        Claims jobs other consumers left unacknowledged for `min_idle_seconds`.
+        Returns (entry ID, job, times delivered) triples.
+        """
+        entries = await self.redis_service.claim_idle_messages(
+            self.stream, self.group, consumer, int(min_idle_seconds * 1000), count
+        )
+        if not entries:
+            return []
+        deliveries = await self.redis_service.delivery_counts(self.stream, self.group, [e for e, _ in entries])
+        return [(entry_id, job, deliveries.get(entry_id, 1)) for entry_id, job in self._decode(entries)]
+
+    async def ack(self, *entry_ids: str) -> int:
+        return await self.redis_service.ack_messages(self.stream, self.group, *entry_ids)
+
+    async def dead_letter(self, entry_id: str, job: Optional[AskJob], reason: str):
+        """Records a job that will not be retried and removes it from the pending list."""
+        fields = job.to_fields() if job else {}
+        fields.update({"entry_id": entry_id, "reason": reason, "failed_at": str(time.time())})
+        await self.redis_service.add_to_stream(self.dead_letter_stream, fields, maxlen=self.maxlen)
+        await self.ack(entry_id)
+        logger.warning(f"/ask job {entry_id} moved to {self.dead_letter_stream}: {reason}")
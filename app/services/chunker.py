@@ -0,0 +1,228 @@
+"""
+Token-aware chunking of extracted PDF text.
+
+PyMuPDF's output is split into headings and sentences, which are packed
+into chunks of about `target_tokens`. A sentence is only ever cut when it
+alone is larger than the target (e.g. a page-long table). A heading always
+starts a new chunk; consecutive chunks of the same section share up to
+`overlap_tokens` of trailing sentences, so a fact that straddles a boundary
+can still be retrieved whole. Each chunk records the pages it spans and the
+title of the section it belongs to.
+
+Token counts come from one `count_tokens_batch` call per document: a
+chunk's count is the sum of its parts, which is what the packer budgets
+with, so the chunk text is never tokenized a second time.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from app.utils.tokens import count_tokens_batch
+
+# Pages of a document are joined with form feeds, which PDF text never contains
+PAGE_BREAK = "\f"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*\.?|[A-Z]\.|(Section|Chapter|Part|Appendix)\s+\w+)\s+\S")
+_PAGE_NUMBER = re.compile(r"^(page\s+)?\d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+_MAX_HEADING_WORDS = 12
+
+
+def join_pages(pages: Sequence[str]) -> str:
+    """Joins per-page text into a document text whose page numbers `Chunker` can recover."""
+    return PAGE_BREAK.join(pages)
+
+
+def is_heading(line: str) -> bool:
+    """
+    Heuristic for PDF headings: a short line without closing punctuation that is
+    numbered ("2.1 Travel"), all caps, or in title case.
+    """
+    words = line.split()
+    if not words or len(words) > _MAX_HEADING_WORDS or line[-1] in ".,;!?" or _PAGE_NUMBER.match(line):
+        return False
+    if _NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) < 3:
+        return False
+    if all(c.isupper() for c in letters):
+        return True
+    # Short joining words ("of", "and") may stay lowercase in a title
+    return all(w[0].isupper() or not w[0].isalpha() or len(w) <= 3 for w in words) and words[0][0].isupper()
+
+
+@dataclass
+class Chunk:
+    """A chunk of document text with its token count and location."""
+    text: str
+    tokens: int
+    page: int
+    page_end: int
+    section: str = ""
+
+
+@dataclass
+class _Unit:
+    text: str
+    page: int
+    heading: bool = False
+    paragraph_start: bool = False
+    section: str = ""
+    tokens: int = 0
+    section_tokens: int = 0
+
+
+class Chunker:
+    """
+    Splits document text into chunks of roughly `target_tokens` tokens.
+    `overlap_tokens` of trailing sentences are repeated at the start of the
+    next chunk in the same section. Chunks that start mid-section repeat the
+    section title on their first line so they read (and match) in context.
+    """
+    def __init__(self, target_tokens: int = 300, overlap_tokens: int = 50, repeat_heading: bool = True):
+        if target_tokens <= 0:
+            raise ValueError("target_tokens must be positive")
+        self.target_tokens = target_tokens
+        self.overlap_tokens = max(0, min(overlap_tokens, target_tokens // 2))
+        self.repeat_heading = repeat_heading
+
+    def _units(self, text: str) -> List[_Unit]:
+        """Splits text into headings and sentences, tagged with page and section."""
+        units: List[_Unit] = []
+        section = ""
+        for page_number, page in enumerate(text.split(PAGE_BREAK), start=1):
+            paragraph: List[str] = []
+
+            def flush_paragraph():
+                body = " ".join(paragraph)
+                paragraph.clear()
+                for i, sentence in enumerate(_SENTENCE_END.split(body)):
+                    if sentence.strip():
+                        units.append(_Unit(sentence.strip(), page_number, paragraph_start=i == 0, section=section))
+
+            for raw in page.split("\n"):
+                line = raw.strip()
+                if not line:
+                    flush_paragraph()
+                elif is_heading(line):
+                    flush_paragraph()
+                    section = line
+                    units.append(_Unit(line, page_number, heading=True, paragraph_start=True, section=section))
+                elif paragraph and paragraph[-1].endswith("-") and line[0].islower():
+                    # Re-join a word hyphenated across a line break
+                    paragraph[-1] = paragraph[-1][:-1] + line
+                else:
+                    paragraph.append(line)
+            flush_paragraph()
+        return units
+
+    def _split_oversized(self, unit: _Unit) -> List[_Unit]:
+        """Cuts a unit larger than the target into word windows of about the target size."""
+        words = unit.text.split()
+        pieces = -(-unit.tokens // self.target_tokens)
+        per_piece = max(1, -(-len(words) // pieces))
+        split = []
+        for start in range(0, len(words), per_piece):
+            window = words[start:start + per_piece]
+            split.append(_Unit(
+                " ".join(window), unit.page, paragraph_start=unit.paragraph_start and start == 0,
+                section=unit.section, tokens=-(-unit.tokens * len(window) // len(words)),
+                section_tokens=unit.section_tokens,
+            ))
+        return split
+
+    def chunk(self, text: str, prefix: str = "") -> List[Chunk]:
+        """
+        Chunks a document. `prefix` is the text each chunk is shown with in the
+        prompt (e.g. its source line); its tokens are included in every chunk's count.
+        """
+        units = self._units(text)
+        if not units:
+            return []
+        counts = count_tokens_batch([prefix] + [u.text for u in units])
+        prefix_tokens, counts = counts[0], counts[1:]
+        sized: List[_Unit] = []
+        section_tokens = 0
+        for unit, tokens in zip(units, counts):
+            unit.tokens = tokens
+            if unit.heading:
+                section_tokens = tokens
+            unit.section_tokens = section_tokens if unit.section else 0
+            sized.extend(self._split_oversized(unit) if tokens > self.target_tokens else [unit])
+        return [self._finish(chunk_units, prefix_tokens) for chunk_units in self._pack(sized)]
+
+    def _pack(self, units: List[_Unit]) -> List[List[_Unit]]:
+        chunks: List[List[_Unit]] = []
+        current: List[_Unit] = []
+        fresh = 0  # Units of `current` not carried over from the previous chunk
+
+        def has_body():
+            return any(not u.heading for u in current[len(current) - fresh:])
+
+        def flush():
+            nonlocal current, fresh
+            if fresh and has_body():
+                chunks.append(current)
+            current, fresh = [], 0
+
+        for unit in units:
+            if unit.heading:
+                if has_body():
+                    self._merge_short_tail(chunks, current, fresh)
+                    flush()
+                current.append(unit)
+                fresh += 1
+                continue
+            size = sum(u.tokens for u in current)
+            if current and has_body() and size + unit.tokens > self.target_tokens:
+                tail = self._overlap(current, unit.tokens)
+                chunks.append(current)
+                current, fresh = tail, 0
+            current.append(unit)
+            fresh += 1
+        if has_body():
+            self._merge_short_tail(chunks, current, fresh)
+        flush()
+        return chunks
+
+    def _overlap(self, units: List[_Unit], next_tokens: int) -> List[_Unit]:
+        """Trailing sentences to repeat in the next chunk, leaving room for `next_tokens`."""
+        budget = min(self.overlap_tokens, self.target_tokens - next_tokens)
+        tail: List[_Unit] = []
+        used = 0
+        for unit in reversed(units):
+            if unit.heading or used + unit.tokens > budget:
+                break
+            tail.insert(0, unit)
+            used += unit.tokens
+        return tail
+
+    def _merge_short_tail(self, chunks: List[List[_Unit]], current: List[_Unit], fresh: int):
+        """
+        Folds a section's short last chunk into the previous one of the same
+        section, if that stays within a quarter over the target.
+        """
+        new = current[len(current) - fresh:]
+        new_tokens = sum(u.tokens for u in new)
+        if not chunks or not new or new_tokens >= self.target_tokens // 4:
+            return
+        previous = chunks[-1]
+        if previous[-1].section != new[0].section or any(u.heading for u in new):
+            return
+        if sum(u.tokens for u in previous) + new_tokens <= self.target_tokens * 5 // 4:
+            previous.extend(new)
+            current.clear()
+
+    def _finish(self, units: List[_Unit], prefix_tokens: int) -> Chunk:
+        text = units[0].text
+        for previous, unit in zip(units, units[1:]):
+            separator = "\n" if unit.heading or unit.paragraph_start or previous.heading else " "
+            text += separator + unit.text
+        tokens = prefix_tokens + sum(u.tokens for u in units)
+        section = units[-1].section
+        if self.repeat_heading and section and not units[0].heading:
+            text = f"{section}\n{text}"
+            tokens += units[0].section_tokens
+        return Chunk(text=text, tokens=tokens, page=units[0].page, page_end=units[-1].page, section=section)
@@ -0,0 +1,215 @@
+"""
+Process-wide service container.
+
+Creates the Redis, knowledge base and OpenAI services once per worker, warms
+them at boot and closes them on shutdown. Handlers receive the shared
+instances through `get_services()`; tests can swap in fakes with
+`set_services()`. `readiness_app` reports whether the warm-up has finished.
+"""
+
+import json
+import logging
+import math
+import threading
+from typing import Dict, Optional
+
+from app.utils import config
+
+logger = logging.getLogger(__name__)
+
+
+def default_lease_seconds() -> int:
+    """
+    A single-flight lease that outlives the slowest answer: the admission queue
+    wait, then every OpenAI attempt timing out, with the longest backoff between.
+    """
+    from app.services.resilience import RetryPolicy
+    backoff = RetryPolicy().max_delay * max(0, config.OPENAI_MAX_ATTEMPTS - 1)
+    return math.ceil(config.OPENAI_QUEUE_TIMEOUT + config.OPENAI_TIMEOUT * config.OPENAI_MAX_ATTEMPTS + backoff)
+
+
+class ServiceContainer:
+    """
+    Holds the long-lived service instances shared by all request handlers.
+    """
+    def __init__(self, redis_service=None, kb_service=None, openai_service=None, semantic_cache=None,
+                 single_flight=None, answer_cache=None, ask_queue=None):
+        """
+        Any service not passed in is created with its default configuration.
+        Passing fakes here is how tests replace the real backends.
+        """
+        if redis_service is None:
+            from app.services.redis_service import RedisService
+            redis_service = RedisService()
+            if config.LOCAL_CACHE_ENABLED:
+                from app.services.local_cache import LocalLRUCache, TieredCacheService
+                redis_service = TieredCacheService(redis_service, LocalLRUCache(
+                    max_bytes=config.LOCAL_CACHE_MAX_MB * 1024 * 1024,
+                    max_entries=config.LOCAL_CACHE_MAX_ENTRIES,
+                ))
+        if kb_service is None:
+            from app.services.knowledge_base import KnowledgeBaseService
+            kb_service = KnowledgeBaseService(config.PDF_DATA_DIR)
+        if openai_service is None:
+            from app.services.admission import AdmissionController
+            from app.services.model_router import ModelRouter, Route
+            from app.services.openai_service import OpenAIService
+            from app.services.resilience import CircuitBreaker, ResilientCaller, RetryPolicy
+            openai_service = OpenAIService(
+                admission=AdmissionController(
+                    max_concurrency=config.OPENAI_MAX_CONCURRENCY,
+                    rpm_limit=config.OPENAI_RPM_LIMIT,
+                    tpm_limit=config.OPENAI_TPM_LIMIT,
+                    max_queue_wait=config.OPENAI_QUEUE_TIMEOUT,
+                    max_queue_depth=config.OPENAI_MAX_QUEUE,
+                ),
+                resilience=ResilientCaller(
+                    retry=RetryPolicy(max_attempts=config.OPENAI_MAX_ATTEMPTS),
+                    breaker=CircuitBreaker(
+                        failure_threshold=config.OPENAI_CIRCUIT_FAILURES,
+                        reset_timeout=config.OPENAI_CIRCUIT_RESET,
+                    ),
+                    hedge_percentile=config.OPENAI_HEDGE_PERCENTILE or None,
+                ),
+                timeout=config.OPENAI_TIMEOUT,
+                router=ModelRouter.from_policy(
+                    config.OPENAI_ROUTING_POLICY,
+                    Route(name="default", model=config.OPENAI_MODEL, max_tokens=config.OPENAI_MAX_TOKENS,
+                          temperature=config.OPENAI_TEMPERATURE),
+                ),
+            )
+        self.redis_service = redis_service
+        self.kb_service = kb_service
+        self.openai_service = openai_service
+        if semantic_cache is None and config.SEMANTIC_CACHE_ENABLED:
+            from app.services.semantic_cache import SemanticAnswerCache
+            semantic_cache = SemanticAnswerCache(redis_service, threshold=config.SEMANTIC_CACHE_THRESHOLD)
+        self.semantic_cache = semantic_cache
+        if answer_cache is None:
+            from app.services.answer_cache import AnswerCache
+            answer_cache = AnswerCache(redis_service, kb_service, ttl_seconds=config.ANSWER_CACHE_TTL,
+                                       stale_ttl_seconds=config.ANSWER_STALE_TTL)
+        self.answer_cache = answer_cache
+        if single_flight is None:
+            from app.services.single_flight import SingleFlight
+            lease_seconds = config.SINGLE_FLIGHT_LEASE_SECONDS or default_lease_seconds()
+            single_flight = SingleFlight(
+                redis_service if config.SINGLE_FLIGHT_DISTRIBUTED else None,
+                lease_seconds=lease_seconds,
+                wait_timeout=config.SINGLE_FLIGHT_WAIT_TIMEOUT or lease_seconds,
+            )
+        self.single_flight = single_flight
+        if ask_queue is None:
+            from app.services.ask_queue import AskQueue
+            ask_queue = AskQueue(redis_service, stream=config.ASK_STREAM, group=config.ASK_CONSUMER_GROUP,
+                                 maxlen=config.ASK_STREAM_MAXLEN)
+        self.ask_queue = ask_queue
+        self.started = False
+        self.redis_state = "not started"
+        self.knowledge_base_state = "not loaded"
+
+    async def startup(self, load_knowledge_base: bool = True):
+        """
+        Warms the services: opens the Redis pool, loads the PDF corpus and
+        starts watching it for changes.
+        Web processes in queue mode pass `load_knowledge_base=False`: the
+        workers answer, so the corpus is only loaded if it is ever needed.
+        Failures are logged but never prevent the worker from serving requests.
+        """
+        if self.started:
+            return
+        try:
+            if not await self.redis_service.ping():
+                raise ConnectionError("Redis did not answer the ping")
+            start = getattr(self.redis_service, "start", None)
+            if start is not None:
+                # Local cache tier: subscribe to invalidations from other replicas
+                await start()
+            self.redis_state = "ok"
+        except Exception as e:
+            self.redis_state = "unavailable"
+            logger.exception(f"Redis warm-up failed: {e}")
+        if load_knowledge_base:
+            self.knowledge_base_state = "loading"
+            try:
+                await self.kb_service.load()
+                self.knowledge_base_state = "loaded"
+                if config.PDF_WATCH_ENABLED:
+                    await self.kb_service.start_watching()
+            except Exception as e:
+                if self.knowledge_base_state == "loading":
+                    self.knowledge_base_state = "failed"
+                logger.exception(f"Knowledge base warm-up failed: {e}")
+        else:
+            self.knowledge_base_state = "deferred"
+        self.started = True
+        logger.info("Service container started.")
+
+    async def shutdown(self):
+        """Closes every service that holds network or OS resources."""
+        for name in ("openai_service", "kb_service", "redis_service"):
+            service = getattr(self, name)
+            close = getattr(service, "close", None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.exception(f"Error closing {name}: {e}")
+        self.started = False
+        logger.info("Service container shut down.")
+
+
+    def status(self) -> Dict[str, str]:
+        return {"redis": self.redis_state, "knowledge_base": self.knowledge_base_state}
+
+
+_services: Optional[ServiceContainer] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> ServiceContainer:
+    """
+    Returns the process-wide container, creating it on first use.
+    Safe to call from a worker thread, e.g. to build the clients off the event loop.
+    """
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = ServiceContainer()
+    return _services
+
+
+def current_services() -> Optional[ServiceContainer]:
+    """Returns the process-wide container if it has been created, without creating it."""
+    return _services
+
+
+def set_services(services: Optional[ServiceContainer]) -> Optional[ServiceContainer]:
+    """
+    Replaces the process-wide container (e.g. with fakes in tests).
+    Returns the previous container so callers can restore it.
+    """
+    global _services
+    previous = _services
+    _services = services
+    return previous
+
+
+async def readiness_app(scope, receive, send):
+    """
+    Minimal ASGI readiness probe: 200 once the services have warmed up (the
+    knowledge base is loaded, or failed to load and will be retried on demand),
+    503 while the process is still starting.
+    """
+    services = current_services()
+    ready = services is not None and services.started
+    status = services.status() if services is not None else {}
+    body = json.dumps({"ready": ready, **status}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200 if ready else 503,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body if scope.get("method") != "HEAD" else b""})
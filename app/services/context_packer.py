@@ -0,0 +1,72 @@
+"""
+Packs ranked retrieval candidates into a prompt token budget.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, List, Sequence
+
+
+@dataclass
+class Candidate:
+    """A retrieved chunk as seen by the packer."""
+    text: str
+    tokens: int
+    score: float
+    doc_id: str = ""
+    payload: Any = None
+
+
+@dataclass
+class PackedContext:
+    """The chunks chosen for a prompt and how much of the available value they hold."""
+    chunks: List[Candidate] = field(default_factory=list)
+    tokens: int = 0
+    score: float = 0.0
+    budget: int = 0
+    candidate_score: float = 0.0
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(chunk.text for chunk in self.chunks)
+
+    @property
+    def score_ratio(self) -> float:
+        """Fraction of the total candidate score that made it into the budget."""
+        return self.score / self.candidate_score if self.candidate_score > 0 else 0.0
+
+
+def _greedy(ordered: Sequence[Candidate], budget: int) -> List[Candidate]:
+    """Takes candidates in order, skipping (not stopping at) any that do not fit."""
+    chosen: List[Candidate] = []
+    used = 0
+    for candidate in ordered:
+        if used + candidate.tokens <= budget:
+            chosen.append(candidate)
+            used += candidate.tokens
+    return chosen
+
+
+def pack_context(candidates: Sequence[Candidate], budget: int) -> PackedContext:
+    """
+    Chooses the subset of candidates that maximises total score within `budget` tokens.
+
+    Runs two greedy passes - by score per token and by raw score - and keeps the
+    better one. Taking the best of the two stays within a factor of two of the
+    optimal knapsack and in practice is near-optimal. Chosen chunks are returned
+    in relevance order.
+    """
+    usable = [c for c in candidates if c.score > 0]
+    by_density = sorted(usable, key=lambda c: c.score / max(c.tokens, 1), reverse=True)
+    by_score = sorted(usable, key=lambda c: c.score, reverse=True)
+    best = max(
+        (_greedy(by_density, budget), _greedy(by_score, budget)),
+        key=lambda chosen: sum(c.score for c in chosen),
+    )
+    best.sort(key=lambda c: c.score, reverse=True)
+    return PackedContext(
+        chunks=best,
+        tokens=sum(c.tokens for c in best),
+        score=sum(c.score for c in best),
+        budget=budget,
+        candidate_score=sum(c.score for c in usable),
+    )
@@ -0,0 +1,239 @@
+"""
+Compact, memory-mapped store of indexed chunk text.
+
+After a load the knowledge base writes its chunks here once and every
+uvicorn worker opens the same files read-only with `mmap`, so the chunk
+text lives once in the OS page cache instead of once per worker. Chunks
+are decoded lazily, only when a query actually uses them.
+
+A corpus version is a directory named after the digest of its contents:
+
+    <root>/<digest>/text.bin     UTF-8 chunk texts, back to back
+    <root>/<digest>/chunks.bin   header + fixed-width arrays, one entry per chunk:
+                                 offset (u64), length, tokens, document,
+                                 page, last page, section (u32 each)
+    <root>/<digest>/meta.json    document ids, section titles, document versions
+                                 and the chunking settings
+    <root>/CURRENT               digest of the most recently written version
+
+Versions are written to a temp directory and renamed into place, so
+workers building the same corpus at the same time all end up reading one
+copy, and a reader never sees a partial version.
+"""
+
+import array
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+TEXT_FILE = "text.bin"
+CHUNKS_FILE = "chunks.bin"
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"
+
+_MAGIC = b"KBCHUNK1"
+_HEADER = struct.Struct("=8sQ")
+_NO_SECTION = 0xFFFFFFFF
+_U32_FIELDS = ("lengths", "tokens", "documents", "pages", "page_ends", "sections")
+
+
+class StoredChunk:
+    """
+    A chunk read from a `CorpusStore`. Has the same attributes as an
+    `IndexedChunk`, but its text is decoded from the memory map on access.
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "CorpusStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def doc_id(self) -> str:
+        return self._store.documents[self._store.arrays["documents"][self._row]]
+
+    @property
+    def text(self) -> str:
+        return self._store.text(self._row)
+
+    @property
+    def tokens(self) -> int:
+        return self._store.arrays["tokens"][self._row]
+
+    @property
+    def page(self) -> int:
+        return self._store.arrays["pages"][self._row]
+
+    @property
+    def page_end(self) -> int:
+        return self._store.arrays["page_ends"][self._row]
+
+    @property
+    def section(self) -> str:
+        section = self._store.arrays["sections"][self._row]
+        return "" if section == _NO_SECTION else self._store.sections[section]
+
+
+class CorpusStore:
+    """Read-only view of one corpus version; chunk rows are in the order they were saved."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.documents: List[str] = meta["documents"]
+        self.sections: List[str] = meta["sections"]
+        self.versions: Dict[str, Optional[List[int]]] = meta.get("versions", {})
+        self.settings: Dict = meta.get("settings", {})
+        self._text = _map(os.path.join(path, TEXT_FILE))
+        self._chunks = _map(os.path.join(path, CHUNKS_FILE))
+        magic, count = _HEADER.unpack_from(self._chunks)
+        if magic != _MAGIC or count != meta["chunks"]:
+            raise ValueError(f"Corrupt corpus store in {path}")
+        self._count = count
+        view = memoryview(self._chunks)[_HEADER.size:]
+        self.arrays = {"offsets": view[:8 * count].cast("Q")}
+        position = 8 * count
+        for name in _U32_FIELDS:
+            self.arrays[name] = view[position:position + 4 * count].cast("I")
+            position += 4 * count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def text(self, row: int) -> str:
+        offset = self.arrays["offsets"][row]
+        return self._text[offset:offset + self.arrays["lengths"][row]].decode("utf-8")
+
+    def chunk(self, row: int) -> StoredChunk:
+        return StoredChunk(self, row)
+
+    @property
+    def digest(self) -> str:
+        return os.path.basename(self.path)
+
+
+def _map(path: str):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""  # mmap cannot map empty files
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _write_version(directory: str, chunks, versions, settings) -> str:
+    """Writes the three files of a version into `directory`; returns its content digest."""
+    digest = hashlib.blake2b(digest_size=16)
+    documents: Dict[str, int] = {}
+    sections: Dict[str, int] = {}
+    offsets: List[int] = []
+    columns: Dict[str, List[int]] = {name: [] for name in _U32_FIELDS}
+    offset = 0
+    with open(os.path.join(directory, TEXT_FILE), "wb") as text_file:
+        for chunk in chunks:
+            data = chunk.text.encode("utf-8")
+            text_file.write(data)
+            section = getattr(chunk, "section", "")
+            row = (
+                len(data),
+                chunk.tokens,
+                documents.setdefault(chunk.doc_id, len(documents)),
+                getattr(chunk, "page", 0),
+                getattr(chunk, "page_end", 0),
+                sections.setdefault(section, len(sections)) if section else _NO_SECTION,
+            )
+            offsets.append(offset)
+            for name, value in zip(_U32_FIELDS, row):
+                columns[name].append(value)
+            digest.update(f"{chunk.doc_id}\0{row[1]}\0{row[3]}\0{row[4]}\0{section}\0".encode())
+            digest.update(data)
+            offset += len(data)
+    with open(os.path.join(directory, CHUNKS_FILE), "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(offsets)))
+        # Native byte order, as read back by memoryview.cast
+        f.write(array.array("Q", offsets).tobytes())
+        for name in _U32_FIELDS:
+            f.write(array.array("I", columns[name]).tobytes())
+    versions = {doc: list(version) if version else None for doc, version in versions.items()}
+    digest.update(json.dumps([versions, settings], sort_keys=True).encode())
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "chunks": len(offsets),
+            "documents": list(documents),
+            "sections": list(sections),
+            "versions": versions,
+            "settings": settings,
+        }, f)
+    return digest.hexdigest()
+
+
+def save_corpus(root: str, chunks: Sequence, versions: Optional[Dict[str, Tuple]] = None,
+                settings: Optional[Dict] = None, keep: int = 2) -> str:
+    """
+    Writes `chunks` (objects with doc_id, text, tokens, page, page_end and section)
+    as a new corpus version under `root` and returns its directory. If another
+    process already wrote identical content, that version is reused.
+    `versions` records each document's (size, mtime) and `settings` how it was
+    chunked, so a process can later tell whether the corpus still matches the
+    PDFs. Only the `keep` most recent versions are retained.
+    """
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+    try:
+        digest = _write_version(tmp_dir, chunks, versions or {}, settings or {})
+        path = os.path.join(root, digest)
+        try:
+            os.rename(tmp_dir, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # Same content, written by another worker
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    write_current(root, digest)
+    prune_versions(root, keep, digest)
+    return path
+
+
+def write_current(root: str, digest: str):
+    """Points CURRENT at version `digest` in one atomic rename."""
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        f.write(digest)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def prune_versions(root: str, keep: int, current: str):
+    """Deletes all but the `keep` newest versions. Processes that still map them keep working."""
+    versions = [
+        entry for entry in os.scandir(root)
+        if entry.is_dir() and not entry.name.startswith(".") and entry.name != current
+    ]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[max(0, keep - 1):]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def open_corpus(root: str, digest: Optional[str] = None) -> Optional[CorpusStore]:
+    """
+    Opens a corpus version read-only (by default the CURRENT one).
+    Returns None if there is none or it cannot be read.
+    """
+    try:
+        if digest is None:
+            with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+                digest = f.read().strip()
+        return CorpusStore(os.path.join(root, digest))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Cannot open corpus store in {root}: {e}")
+        return None
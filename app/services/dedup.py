@@ -0,0 +1,149 @@
+"""
+Boilerplate removal and near-duplicate chunk grouping.
+
+PDFs repeat running headers, footers and disclaimers on every page, and
+successive versions of a manual repeat whole paragraphs. Left alone, both
+end up in the prompt many times over.
+
+- `strip_boilerplate` drops lines that recur on most pages of a document
+  before it is chunked.
+- `NearDuplicateIndex` groups chunks whose word shingles are near-identical
+  (estimated Jaccard similarity at or above a threshold), so retrieval can
+  keep only the best-ranked chunk of each group.
+
+Similarity uses bottom-k MinHash sketches: one hash per shingle, keeping the
+k smallest. That keeps indexing linear in the text, unlike the
+one-hash-per-permutation `MinHasher` used for (much shorter) questions.
+Sketches use Python's per-process string hash, so they are never persisted.
+"""
+
+import array
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+_WORD_RE = re.compile(r"\w+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def _line_key(line: str) -> str:
+    # Page numbers and dates differ from page to page; the furniture around them does not
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+
+def strip_boilerplate(pages: Sequence[str], min_pages: int = 3, min_fraction: float = 0.5) -> List[str]:
+    """
+    Removes lines that appear on at least `min_fraction` of a document's pages
+    (and on at least `min_pages` pages): running headers, footers, page
+    numbers and per-page disclaimers. Documents shorter than `min_pages` are
+    returned unchanged.
+    """
+    if len(pages) < min_pages:
+        return list(pages)
+    page_counts: Dict[str, int] = {}
+    for page in pages:
+        for key in {_line_key(line) for line in page.split("\n") if line.strip()}:
+            page_counts[key] = page_counts.get(key, 0) + 1
+    limit = max(min_pages, min_fraction * len(pages))
+    repeated = {key for key, count in page_counts.items() if count >= limit}
+    if not repeated:
+        return list(pages)
+    return ["\n".join(line for line in page.split("\n") if _line_key(line) not in repeated) for page in pages]
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Overlapping word n-grams of the lowercased text (the words themselves for very short texts)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def sketch(features: Iterable[str], k: int = 32) -> List[int]:
+    """Bottom-k MinHash sketch: the k smallest distinct feature hashes, ascending."""
+    return heapq.nsmallest(k, {hash(f) for f in features})
+
+
+def sketch_similarity(a: Sequence[int], b: Sequence[int], k: int = 32) -> float:
+    """Estimated Jaccard similarity of the feature sets behind two bottom-k sketches."""
+    if not a or not b:
+        return 0.0
+    sa, sb = set(a), set(b)
+    union = heapq.nsmallest(k, sa | sb)
+    return sum(1 for h in union if h in sa and h in sb) / len(union)
+
+
+class NearDuplicateIndex:
+    """
+    Assigns every chunk a group id; near-identical chunks share one.
+
+    Candidates are found through the few smallest hashes of each sketch (two
+    sets with Jaccard similarity J share their minimum hash with probability J),
+    then confirmed against the full sketch. Sketches are stored packed, about
+    `8 * k` bytes per chunk. When a chunk is removed, the buckets it held pass
+    to another member of its group, so re-indexing one copy of a repeated
+    paragraph still finds the others.
+    """
+    def __init__(self, threshold: float = 0.8, k: int = 32, keys: int = 4, shingle_size: int = 3):
+        self.threshold = threshold
+        self.k = k
+        self.keys = keys
+        self.shingle_size = shingle_size
+        self._sketches: Dict[int, bytes] = {}
+        self._groups: Dict[int, int] = {}
+        self._members: Dict[int, List[int]] = {}  # group -> chunk ids, only for groups of several chunks
+        self._buckets: Dict[int, int] = {}  # sketch hash -> a chunk id carrying it
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def _sketch(self, chunk_id: int) -> List[int]:
+        return array.array("q", self._sketches[chunk_id]).tolist()
+
+    def add(self, chunk_id: int, text: str) -> int:
+        """Indexes a chunk and returns its group id."""
+        signature = sketch(shingles(text, self.shingle_size), self.k)
+        match: Optional[int] = None
+        best = 0.0
+        for key in signature[:self.keys]:
+            candidate = self._buckets.get(key)
+            if candidate is None:
+                continue
+            similarity = sketch_similarity(signature, self._sketch(candidate), self.k)
+            if similarity >= self.threshold and similarity > best:
+                match, best = candidate, similarity
+        group = chunk_id
+        if match is not None:
+            group = self._groups[match]
+            # A group without a member list has a single member: the match
+            self._members.setdefault(group, [match]).append(chunk_id)
+        for key in signature[:self.keys]:
+            self._buckets.setdefault(key, chunk_id)
+        self._sketches[chunk_id] = array.array("q", signature).tobytes()
+        self._groups[chunk_id] = group
+        return group
+
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        """Forgets chunks, handing their buckets to a remaining member of their group."""
+        for chunk_id in chunk_ids:
+            group = self._groups.pop(chunk_id, None)
+            if group is None:
+                continue
+            heir = None
+            members = self._members.get(group)
+            if members:
+                members.remove(chunk_id)
+                heir = members[0]
+                if len(members) == 1:
+                    del self._members[group]
+            for key in self._sketch(chunk_id)[:self.keys]:
+                if self._buckets.get(key) == chunk_id:
+                    if heir is None:
+                        del self._buckets[key]
+                    else:
+                        self._buckets[key] = heir
+            del self._sketches[chunk_id]
+
+    def group(self, chunk_id: int) -> int:
+        """The chunk's group id; chunks never added are their own group."""
+        return self._groups.get(chunk_id, chunk_id)
@@ -0,0 +1,104 @@
+"""
+Pluggable embedding providers for dense retrieval.
+
+Every provider returns L2-normalised float32 vectors, so cosine similarity is
+a plain dot product. `HashingEmbeddingProvider` is deterministic and fully
+local, which makes it suitable for offline tests and air-gapped deployments.
+"""
+
+import abc
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.services.search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalises each row; all-zero rows stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingProvider(abc.ABC):
+    """Interface for turning texts into fixed-size vectors."""
+    name = "base"
+    dimension: int = 0
+
+    @abc.abstractmethod
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns a (len(texts), dimension) float32 array of normalised vectors."""
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic local embeddings via feature hashing of words and character
+    trigrams. Trigrams let inflected or paraphrased forms ("resetting" vs
+    "reset") land close together without any model download.
+    """
+    name = "hashing"
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def _features(self, text: str):
+        for word in tokenize(text):
+            yield "w:" + word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield "t:" + padded[i:i + 3], 0.5
+
+    def embed_sync(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dimension] += sign * weight
+        return normalize_rows(vectors)
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        # Hashing is pure-Python CPU work: embedding a corpus would otherwise stall the event loop
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from the OpenAI embeddings API."""
+    name = "openai"
+
+    def __init__(self, client=None, model: str = "text-embedding-3-small", dimension: int = 512, batch_size: int = 256):
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
+        self.model = model
+        self.dimension = dimension
+        self.batch_size = batch_size
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(texts[start:start + self.batch_size])
+            response = await self.client.embeddings.create(model=self.model, input=batch, dimensions=self.dimension)
+            rows.extend(item.embedding for item in response.data)
+        if not rows:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return normalize_rows(np.array(rows, dtype=np.float32))
+
+
+def get_embedding_provider(name: str, dimension: Optional[int] = None, client=None) -> EmbeddingProvider:
+    """Builds the provider configured by EMBEDDING_PROVIDER."""
+    if name == "hashing":
+        return HashingEmbeddingProvider(dimension or 256)
+    if name == "openai":
+        return OpenAIEmbeddingProvider(client=client, dimension=dimension or 512)
+    raise ValueError(f"Unknown embedding provider: {name}")
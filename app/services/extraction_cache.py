@@ -0,0 +1,116 @@
+"""
+Durable on-disk store for extracted PDF page text.
+
+Entries are keyed by the file's content hash, and a small stat index maps
+(path, size, mtime) to that hash so unchanged files are recognised without
+re-reading them. All writes are atomic (temp file + rename), so the store can
+live on a volume shared by several workers or replicas.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def content_hash(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Stores extracted page text per PDF, keyed by a (path, size, mtime, content hash) fingerprint.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._pages_dir = os.path.join(cache_dir, "pages")
+        self._stat_dir = os.path.join(cache_dir, "stat")
+
+    @staticmethod
+    def _stat_key(path: str, st: os.stat_result) -> str:
+        raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """
+        Returns the content hash for `path`, reusing the stat index when the
+        file's size and mtime are unchanged. Returns None if the file is unreadable.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stat_file = os.path.join(self._stat_dir, self._stat_key(path, st))
+        try:
+            with open(stat_file, "r", encoding="utf-8") as f:
+                cached = f.read().strip()
+            if cached:
+                return cached
+        except OSError:
+            pass
+        try:
+            digest = content_hash(path)
+        except OSError as e:
+            logger.error(f"Cannot fingerprint {path}: {e}")
+            return None
+        self._write_atomic(stat_file, digest)
+        return digest
+
+    def get(self, path: str, fingerprint: Optional[str] = None) -> Optional[List[str]]:
+        """Returns the cached page texts for `path`, or None on a miss."""
+        fingerprint = fingerprint or self.fingerprint(path)
+        if not fingerprint:
+            return None
+        entry_file = os.path.join(self._pages_dir, f"{fingerprint}.json")
+        try:
+            with open(entry_file, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable extraction cache entry {entry_file}: {e}")
+            return None
+        if entry.get("version") != CACHE_FORMAT_VERSION:
+            return None
+        logger.debug(f"Extraction cache hit for {path}")
+        return entry.get("pages", [])
+
+    def put(self, path: str, pages: List[str], fingerprint: Optional[str] = None) -> None:
+        """Stores the page texts extracted from `path`."""
+        fingerprint = fingerprint or self.fingerprint(path)
+        if not fingerprint:
+            return
+        entry = {
+            "version": CACHE_FORMAT_VERSION,
+            "source": os.path.basename(path),
+            "pages": pages,
+        }
+        entry_file = os.path.join(self._pages_dir, f"{fingerprint}.json")
+        self._write_atomic(entry_file, json.dumps(entry, ensure_ascii=False))
+
+    def _write_atomic(self, target: str, data: str) -> None:
+        directory = os.path.dirname(target)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_path, target)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.error(f"Failed to write extraction cache file {target}: {e}")
@@ -0,0 +1,171 @@
+"""
+Bulk PDF ingestion spread across a process pool.
+
+PyMuPDF text extraction is CPU-bound, so a cold start extracts documents in
+parallel worker processes. Large documents are split into page ranges so a
+single big manual does not serialize the tail of the run. Finished documents
+are handed back to the caller as soon as all of their pages are in.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+DocumentCallback = Callable[[str, List[str]], Awaitable[None]]
+
+
+@dataclass
+class IngestionStats:
+    """Summary of a bulk ingestion run."""
+    documents: int = 0
+    pages: int = 0
+    cached: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds > 0 else 0.0
+
+
+def count_pages(pdf_path: str) -> int:
+    """Returns the number of pages in a PDF (metadata only, no text extraction)."""
+    doc = fitz.open(pdf_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> Tuple[str, int, List[str]]:
+    """
+    Extracts the text of pages [start, stop) of a PDF. Runs in a worker process,
+    so it must stay a module-level function.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        pages = [doc[i].get_text() for i in range(start, min(stop, doc.page_count))]
+    finally:
+        doc.close()
+    return pdf_path, start, pages
+
+
+def plan_tasks(page_counts: Dict[str, int], pages_per_task: int) -> List[Tuple[str, int, int]]:
+    """Splits documents into (path, start, stop) page ranges, largest documents first."""
+    tasks: List[Tuple[str, int, int]] = []
+    for path, count in sorted(page_counts.items(), key=lambda item: -item[1]):
+        if count <= 0:
+            tasks.append((path, 0, 0))
+            continue
+        for start in range(0, count, pages_per_task):
+            tasks.append((path, start, min(start + pages_per_task, count)))
+    return tasks
+
+
+# Every web process forks its own pool at startup, so the automatic size stays small
+MAX_DEFAULT_WORKERS = 4
+
+
+def default_workers(processes: int = 1) -> int:
+    """The cores split among `processes` web processes, at most MAX_DEFAULT_WORKERS."""
+    return max(1, min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) // max(1, processes)))
+
+
+async def ingest_pdfs(
+    pdf_paths: List[str],
+    on_document: DocumentCallback,
+    max_workers: Optional[int] = None,
+    pages_per_task: int = 32,
+    extraction_cache=None,
+) -> IngestionStats:
+    """
+    Extracts every PDF in `pdf_paths` across a process pool and awaits
+    `on_document(path, pages)` for each one as soon as it is complete.
+    Documents found in `extraction_cache` are delivered without touching the pool.
+    """
+    stats = IngestionStats()
+    started = time.perf_counter()
+    max_workers = max_workers or default_workers()
+
+    fingerprints: Dict[str, Optional[str]] = {}
+    to_extract: List[str] = []
+    for path in pdf_paths:
+        pages = None
+        if extraction_cache:
+            fingerprints[path] = await asyncio.to_thread(extraction_cache.fingerprint, path)
+            pages = await asyncio.to_thread(extraction_cache.get, path, fingerprints[path])
+        if pages is None:
+            to_extract.append(path)
+            continue
+        stats.cached += 1
+        stats.documents += 1
+        stats.pages += len(pages)
+        await on_document(path, pages)
+
+    if to_extract:
+        page_counts: Dict[str, int] = {}
+        for path in to_extract:
+            try:
+                page_counts[path] = await asyncio.to_thread(count_pages, path)
+            except Exception as e:
+                logger.error(f"Error extracting text from {path}: {e}")
+                stats.failed += 1
+        tasks = plan_tasks(page_counts, pages_per_task)
+        remaining = {path: sum(1 for t in tasks if t[0] == path) for path in page_counts}
+        collected: Dict[str, Dict[int, List[str]]] = {path: {} for path in page_counts}
+        failed: set = set()
+
+        loop = asyncio.get_running_loop()
+        workers = min(max_workers, len(tasks)) or 1
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        async def run_task(path: str, start: int, stop: int):
+            try:
+                _, _, pages = await loop.run_in_executor(pool, extract_page_range, path, start, stop)
+                return path, start, pages, None
+            except Exception as e:
+                return path, start, None, e
+
+        running = [asyncio.ensure_future(run_task(*task)) for task in tasks]
+        try:
+            for next_result in asyncio.as_completed(running):
+                path, start, pages, error = await next_result
+                remaining[path] -= 1
+                if error is not None:
+                    if path not in failed:
+                        logger.error(f"Error extracting text from {path}: {error}")
+                        failed.add(path)
+                    continue
+                collected[path][start] = pages
+                if remaining[path] or path in failed:
+                    continue
+                pages = [page for _, chunk in sorted(collected.pop(path).items()) for page in chunk]
+                if extraction_cache:
+                    await asyncio.to_thread(extraction_cache.put, path, pages, fingerprints.get(path))
+                stats.documents += 1
+                stats.pages += len(pages)
+                await on_document(path, pages)
+        finally:
+            # Not `with`: its shutdown(wait=True) would block the event loop until every
+            # queued page range is extracted when the load is cancelled
+            for task in running:
+                task.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+        stats.failed += len(failed)
+
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        f"Ingested {stats.documents} documents ({stats.pages} pages, {stats.cached} from cache, "
+        f"{stats.failed} failed) in {stats.seconds:.2f}s with {max_workers} workers: "
+        f"{stats.pages_per_second:.1f} pages/sec"
+    )
+    return stats
@@ -2,24 +2,102 @@
 Service for scanning PDF directory, extracting text, and retrieving relevant context.
 """
 
+import hashlib
 import os
 import logging
 import asyncio
-import re
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 import fitz  # PyMuPDF
-import tiktoken
-from app.utils.config import MAX_CONTEXT_TOKENS
+from app.services.chunker import PAGE_BREAK, Chunk, Chunker, join_pages
+from app.services.corpus_store import CorpusStore, open_corpus, save_corpus
+from app.services.context_packer import Candidate, PackedContext, pack_context
+from app.services.dedup import NearDuplicateIndex, strip_boilerplate
+from app.services.extraction_cache import ExtractionCache, content_hash
+from app.services.ingestion import default_workers, ingest_pdfs
+from app.services.pdf_watcher import PDFDirectoryWatcher, stat_pdf
+from app.services.search_index import BM25Index, IndexedChunk, tokenize
+from app.utils.config import (
+    BOILERPLATE_FILTER,
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_TOKENS,
+    CORPUS_DIR,
+    DUPLICATE_SIMILARITY,
+    INGEST_PAGES_PER_TASK,
+    INGEST_WORKERS,
+    MAX_CONTEXT_TOKENS,
+    PDF_CACHE_DIR,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_PROVIDER,
+    PDF_WATCH_POLL_INTERVAL,
+    RETRIEVAL_MODE,
+    RETRIEVAL_TOP_K,
+    VECTOR_INDEX_DIR,
+    WEB_CONCURRENCY,
+)
+from app.utils.tokens import TOKENIZER_MODEL
 
 
 class KnowledgeBaseService:
     """
     Handles scanning PDFs in a directory, extracting their text, and finding relevant text chunks.
     """
-    def __init__(self, pdf_data_dir: str):
+    def __init__(
+        self,
+        pdf_data_dir: str,
+        cache_dir: Optional[str] = None,
+        ingest_workers: Optional[int] = None,
+        retrieval_mode: Optional[str] = None,
+        embedding_provider=None,
+        vector_dir: Optional[str] = None,
+        chunk_tokens: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        corpus_dir: Optional[str] = None,
+        boilerplate_filter: Optional[bool] = None,
+        duplicate_similarity: Optional[float] = None,
+    ):
         self.pdf_data_dir = pdf_data_dir
-        self._text_cache: Dict[str, str] = {}
+        if ingest_workers is None:
+            ingest_workers = INGEST_WORKERS
+        self.ingest_workers = ingest_workers or default_workers(WEB_CONCURRENCY)
+        cache_dir = PDF_CACHE_DIR if cache_dir is None else cache_dir
+        self._extraction_cache = ExtractionCache(cache_dir) if cache_dir else None
+        self._index = BM25Index()
+        self._chunker = Chunker(
+            CHUNK_TOKENS if chunk_tokens is None else chunk_tokens,
+            CHUNK_OVERLAP_TOKENS if chunk_overlap is None else chunk_overlap,
+        )
+        self.boilerplate_filter = BOILERPLATE_FILTER if boilerplate_filter is None else boilerplate_filter
+        self.duplicate_similarity = DUPLICATE_SIMILARITY if duplicate_similarity is None else duplicate_similarity
+        self._duplicates: Optional[NearDuplicateIndex] = None
+        # A stored corpus is only reused if it was chunked and counted the same way
+        self._corpus_settings = {
+            "chunk_tokens": self._chunker.target_tokens,
+            "chunk_overlap": self._chunker.overlap_tokens,
+            "boilerplate_filter": self.boilerplate_filter,
+            "tokenizer": TOKENIZER_MODEL,
+        }
+        self.retrieval_mode = retrieval_mode or RETRIEVAL_MODE
+        if self.retrieval_mode not in ("bm25", "dense", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
+        self._embedder = embedding_provider
+        if self.retrieval_mode != "bm25" and self._embedder is None:
+            # Imported lazily: NumPy is only needed for dense retrieval
+            from app.services.embeddings import get_embedding_provider
+            self._embedder = get_embedding_provider(EMBEDDING_PROVIDER, EMBEDDING_DIMENSION)
+        self._vector_dir = VECTOR_INDEX_DIR if vector_dir is None else vector_dir
+        self._vectors = None
+        self._corpus_dir = CORPUS_DIR if corpus_dir is None else corpus_dir
+        self._corpus: Optional[CorpusStore] = None
+        self._documents: Dict[str, tuple] = {}
+        # SHA-256 of each indexed PDF: the version cached answers depend on, equal on every replica
+        self._content_versions: Dict[str, Optional[str]] = {}
+        self._corpus_version: Optional[str] = None
+        self._watcher: Optional[PDFDirectoryWatcher] = None
+        self._loaded = False
+        # Set while a cold-start load serves questions from the documents indexed so far
+        self._partial = False
+        self._load_lock = asyncio.Lock()
         if not os.path.isdir(self.pdf_data_dir):
             logging.error(f"Invalid PDF data directory: {self.pdf_data_dir}")
         else:
@@ -43,73 +121,441 @@ class KnowledgeBaseService:
             logging.error(f"Error scanning PDF directory {self.pdf_data_dir}: {e}")
         return pdfs
 
-    def _extract_text_from_pdf(self, pdf_path: str) -> str:
+    def _extract_pages_from_pdf(self, pdf_path: str) -> List[str]:
         """
-        Extracts text content from a single PDF, with caching.
+        Extracts the text of each page of a PDF, reusing the on-disk extraction cache.
+        Raises on unreadable files; unchanged files are never parsed twice.
         """
-        if pdf_path in self._text_cache:
-            return self._text_cache[pdf_path]
-        text = ""
+        fingerprint = None
+        if self._extraction_cache:
+            fingerprint = self._extraction_cache.fingerprint(pdf_path)
+            pages = self._extraction_cache.get(pdf_path, fingerprint)
+            if pages is not None:
+                return pages
+        doc = fitz.open(pdf_path)
         try:
-            doc = fitz.open(pdf_path)
-            for page in doc:
-                text += page.get_text() + "\n"
+            pages = [page.get_text() for page in doc]
+        finally:
             doc.close()
-            logging.info(f"Extracted text from {pdf_path}")
+        logging.info(f"Extracted text from {pdf_path}")
+        if self._extraction_cache:
+            self._extraction_cache.put(pdf_path, pages, fingerprint)
+        return pages
+
+    def _extract_text_from_pdf(self, pdf_path: str) -> str:
+        """
+        Extracts text content from a single PDF. Pages are cached on disk, not in
+        memory, and separated by form feeds so chunks can record their page numbers.
+        """
+        try:
+            return join_pages(self._extract_pages_from_pdf(pdf_path))
         except Exception as e:
             logging.error(f"Error extracting text from {pdf_path}: {e}")
-        self._text_cache[pdf_path] = text
-        return text
+            return ""
 
-    async def find_relevant_context(self, question: str, max_context_tokens: int = None, request_id: str = "") -> str:
+    def _stat_and_extract(self, pdf_path: str) -> Tuple[Optional[tuple], Optional[str], str]:
+        # Stat first: a write during extraction then shows up as a new version to the watcher
+        return stat_pdf(pdf_path), self._content_version(pdf_path), self._extract_text_from_pdf(pdf_path)
+
+    def _content_version(self, pdf_path: str) -> Optional[str]:
+        """The PDF's SHA-256, via the extraction cache's stat index when there is one."""
+        if self._extraction_cache:
+            return self._extraction_cache.fingerprint(pdf_path)
+        try:
+            return content_hash(pdf_path)
+        except OSError:
+            return None
+
+    def _content_versions_of(self, pdf_files) -> Dict[str, Optional[str]]:
+        return {path: self._content_version(path) for path in pdf_files}
+
+    @staticmethod
+    def _format_chunk(pdf_path: str, text: str) -> str:
+        """Prefixes a chunk with its source filename, as it appears in the prompt."""
+        return f"[Source: {os.path.basename(pdf_path)}]\n{text}"
+
+    def _prepare_chunks(self, pdf_path: str, text: str) -> List[Chunk]:
         """
-        Finds and returns relevant text chunks from PDFs based on the question.
-        Aggregates from all PDFs, prefixes each chunk with its PDF filename, and truncates based on token count.
+        Splits a document into token-sized chunks and counts each chunk's prompt
+        tokens (source line included) once, at index time, in a single batch.
+        Page furniture repeated on most pages is dropped first.
         """
-        log_message = f"Performing PDF search for question: {question}"
-        if request_id:
-            log_message += f" | request_id={request_id}"
-        logging.info(log_message)
+        if self.boilerplate_filter:
+            text = join_pages(strip_boilerplate(text.split(PAGE_BREAK)))
+        return self._chunker.chunk(text, prefix=self._format_chunk(pdf_path, ""))
 
-        if max_context_tokens is None:
-            max_context_tokens = MAX_CONTEXT_TOKENS
+    @staticmethod
+    def _add_chunks(index: BM25Index, pdf_path: str, chunks: List[Chunk]) -> List[int]:
+        return index.add_document(
+            pdf_path,
+            [chunk.text for chunk in chunks],
+            [chunk.tokens for chunk in chunks],
+            [(chunk.page, chunk.page_end, chunk.section) for chunk in chunks],
+        )
 
-        # Use tiktoken encoding for gpt-4o-mini
-        try:
-            encoding = tiktoken.encoding_for_model("gpt-4o")
-        except Exception:
-            encoding = tiktoken.get_encoding("cl100k_base")
+    def _group_duplicates(self, index: BM25Index) -> Optional[NearDuplicateIndex]:
+        """Groups near-identical chunks of `index`, or None if duplicate suppression is off."""
+        if self.duplicate_similarity <= 0:
+            return None
+        duplicates = NearDuplicateIndex(self.duplicate_similarity)
+        for chunk_id, chunk in index.items():
+            duplicates.add(chunk_id, chunk.text)
+        return duplicates
+
+    def _build_index(self, texts: Dict[str, str]) -> BM25Index:
+        index = BM25Index()
+        for pdf_path, text in texts.items():
+            self._add_chunks(index, pdf_path, self._prepare_chunks(pdf_path, text))
+        return index
 
+    async def load(self, rebuild: bool = False) -> int:
+        """
+        Extracts every PDF in the directory and builds the search index, so the
+        first question does not pay for it. Returns the number of documents loaded.
+
+        If the corpus store holds a build of exactly the current PDFs (e.g. from
+        `python -m app.kb build`), the index is built from it without extracting
+        anything, unless `rebuild` is set.
+        With more than one ingest worker, extraction runs across a process pool and
+        each document is indexed as soon as it is extracted; on a cold start, questions
+        are answered from the documents indexed so far instead of waiting for the load.
+        """
+        async with self._load_lock:
+            try:
+                return await self._load(rebuild)
+            finally:
+                self._partial = False
+
+    @property
+    def loaded(self) -> bool:
+        """True once a full load has completed."""
+        return self._loaded
+
+    def stats(self) -> Dict[str, object]:
+        """Sizes of the current index: documents, chunks, corpus store path and vector rows."""
+        return {
+            "documents": len(self._documents),
+            "chunks": len(self._index),
+            "corpus": self._corpus.path if self._corpus else None,
+            "vectors": len(self._vectors) if self._vectors is not None else None,
+        }
+
+    def chunks(self) -> List[IndexedChunk]:
+        """Every indexed chunk, in index order."""
+        return [chunk for _, chunk in self._index.items()]
+
+    async def ensure_loaded(self) -> None:
+        """Loads the knowledge base unless it is loaded, or waits for a load already in progress."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if not self._loaded:
+                try:
+                    await self._load(rebuild=False)
+                finally:
+                    self._partial = False
+
+    async def _load(self, rebuild: bool) -> int:
         pdf_files = await asyncio.to_thread(self._scan_pdf_files)
-        keywords = set(re.findall(r"\w+", question.lower()))
-        relevant_chunks = []
-        chunk_token_counts = []
+        index = None
+        if not rebuild:
+            index = await asyncio.to_thread(self._load_corpus, pdf_files)
+        if index is not None:
+            count = len(index.documents)
+            documents = {path: tuple(version) for path, version in self._corpus.versions.items()}
+        else:
+            if self.ingest_workers > 1 and len(pdf_files) > 1:
+                index, count = await self._load_parallel(pdf_files)
+            else:
+                index, count = await self._load_sequential(pdf_files)
+            documents = await asyncio.to_thread(self._stat_documents, index.documents)
+            await self._store_corpus(index, documents)
+        content_versions = await asyncio.to_thread(self._content_versions_of, documents)
+        vectors = await self._build_vectors(index) if self._embedder else None
+        duplicates = await asyncio.to_thread(self._group_duplicates, index)
+        # Swap index, vectors and duplicate groups together so their chunk ids always agree
+        self._index, self._vectors, self._duplicates = index, vectors, duplicates
+        self._documents, self._content_versions = documents, content_versions
+        self._corpus_version = None
+        self._loaded = True
+        logging.info(f"Knowledge base loaded {count} documents, {len(self._index)} chunks indexed")
+        return count
 
-        # Collect all relevant chunks from all PDFs
+    async def _load_sequential(self, pdf_files: List[str]) -> Tuple[BM25Index, int]:
+        texts: Dict[str, str] = {}
         for pdf_path in pdf_files:
             try:
-                text = await asyncio.to_thread(self._extract_text_from_pdf, pdf_path)
-                chunks = text.split("\n\n")
-                for chunk in chunks:
-                    low = chunk.lower()
-                    if any(word in low for word in keywords):
-                        chunk_with_source = f"[Source: {os.path.basename(pdf_path)}]\n{chunk.strip()}"
-                        tokens = len(encoding.encode(chunk_with_source))
-                        relevant_chunks.append(chunk_with_source)
-                        chunk_token_counts.append(tokens)
+                texts[pdf_path] = await asyncio.to_thread(self._extract_text_from_pdf, pdf_path)
             except Exception as e:
                 logging.error(f"Error processing PDF {pdf_path}: {e}")
+        # Build off to the side and swap, so queries never see a partial index
+        index = await asyncio.to_thread(self._build_index, texts)
+        return index, len(texts)
+
+    async def _load_parallel(self, pdf_files: List[str]) -> Tuple[BM25Index, int]:
+        index = BM25Index()
+        if not self._loaded:
+            # Cold start: serve keyword questions from documents as they arrive
+            self._index, self._vectors, self._duplicates = index, None, None
+            self._partial = True
+
+        async def on_document(pdf_path: str, pages: List[str]):
+            chunks = await asyncio.to_thread(self._prepare_chunks, pdf_path, join_pages(pages))
+            self._add_chunks(index, pdf_path, chunks)
+
+        stats = await ingest_pdfs(
+            pdf_files,
+            on_document,
+            max_workers=self.ingest_workers,
+            pages_per_task=INGEST_PAGES_PER_TASK,
+            extraction_cache=self._extraction_cache,
+        )
+        return index, stats.documents
+
+    async def _store_corpus(self, index: BM25Index, documents: Dict[str, tuple]) -> None:
+        """
+        Moves the chunk text of a freshly built index into the memory-mapped corpus
+        store in CORPUS_DIR, which every worker maps read-only, so the text is held
+        once in the OS page cache rather than once per worker. The index keeps its
+        in-memory chunks if the store cannot be written.
+        """
+        if not self._corpus_dir:
+            return
+        items = index.items()
+        try:
+            path = await asyncio.to_thread(save_corpus, self._corpus_dir, [chunk for _, chunk in items], documents,
+                                           self._corpus_settings)
+            store = await asyncio.to_thread(CorpusStore, path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to write corpus store to {self._corpus_dir}: {e}")
+            return
+        index.replace_chunks({chunk_id: store.chunk(row) for row, (chunk_id, _) in enumerate(items)})
+        self._corpus = store
+        logging.info(f"Corpus store {store.digest} mapped: {len(store)} chunks")
+
+    @staticmethod
+    def _stat_documents(pdf_files) -> Dict[str, Optional[tuple]]:
+        return {path: stat_pdf(path) for path in pdf_files}
+
+    def _load_corpus(self, pdf_files: List[str]) -> Optional[BM25Index]:
+        """
+        Indexes the current corpus store if it was built from exactly `pdf_files`,
+        at their current size and mtime, with the same chunking settings; None otherwise.
+        Only the postings are built here: chunk text stays in the memory map.
+        """
+        if not self._corpus_dir:
+            return None
+        store = open_corpus(self._corpus_dir)
+        if store is None:
+            return None
+        documents = self._stat_documents(pdf_files)
+        expected = {path: list(version) if version else None for path, version in documents.items()}
+        if None in expected.values() or store.versions != expected or store.settings != self._corpus_settings:
+            logging.info(f"Corpus store {store.digest} does not match the current PDFs, rebuilding")
+            return None
+        by_document: Dict[str, list] = {path: [] for path in store.versions}
+        for row in range(len(store)):
+            chunk = store.chunk(row)
+            by_document.setdefault(chunk.doc_id, []).append(chunk)
+        index = BM25Index()
+        for pdf_path, chunks in by_document.items():
+            index.add_chunks(pdf_path, chunks)
+        self._corpus = store
+        logging.info(f"Loaded prebuilt corpus store {store.digest}: {len(store)} chunks")
+        return index
 
-        # Select chunks until token budget is reached
-        selected_chunks = []
-        total_tokens = 0
-        for chunk, tokens in zip(relevant_chunks, chunk_token_counts):
-            if total_tokens + tokens > max_context_tokens:
-                logging.info(f"Context truncated at {total_tokens} tokens (limit: {max_context_tokens})")
-                break
-            selected_chunks.append(chunk)
-            total_tokens += tokens
-
-        result = "\n\n".join(selected_chunks)
-        logging.info(f"Selected {len(selected_chunks)} chunks, total tokens: {total_tokens}")
-        return result 
\ No newline at end of file
+    async def _build_vectors(self, index: BM25Index):
+        """
+        Embeds every chunk of `index` into a dense matrix. Vectors persisted in
+        VECTOR_INDEX_DIR are reused for unchanged chunk texts, and the result is
+        reopened memory-mapped so the OS page cache holds a single copy.
+        """
+        import numpy as np
+        from app.services.vector_index import VectorIndex, load_vectors, save_vectors, text_key
+
+        items = index.items()
+        keys = [text_key(chunk.text) for _, chunk in items]
+        dimension = self._embedder.dimension
+        stored = await asyncio.to_thread(load_vectors, self._vector_dir) if self._vector_dir else None
+        stored_rows: Dict[bytes, int] = {}
+        if stored and stored[1].shape[1] == dimension:
+            stored_rows = {key: row for row, key in enumerate(stored[0])}
+
+        matrix = np.empty((len(items), dimension), dtype=np.float32)
+        missing = []
+        for row, key in enumerate(keys):
+            if key in stored_rows:
+                matrix[row] = stored[1][stored_rows[key]]
+            else:
+                missing.append(row)
+        if missing:
+            matrix[missing] = await self._embedder.embed([items[row][1].text for row in missing])
+        logging.info(f"Embedded {len(missing)} chunks, reused {len(items) - len(missing)} stored vectors")
+
+        chunk_ids = [chunk_id for chunk_id, _ in items]
+        if self._vector_dir:
+            try:
+                await asyncio.to_thread(save_vectors, self._vector_dir, keys, matrix)
+                reopened = await asyncio.to_thread(load_vectors, self._vector_dir)
+                if reopened and reopened[0] == keys:
+                    return VectorIndex.from_arrays(chunk_ids, reopened[1])
+            except OSError as e:
+                logging.error(f"Failed to persist vectors to {self._vector_dir}: {e}")
+        return VectorIndex.from_arrays(chunk_ids, matrix)
+
+    async def update_document(self, pdf_path: str) -> None:
+        """
+        Re-extracts one added or modified PDF and replaces only its entries in the index.
+        Its new chunks are held in memory until the next full load rewrites the corpus store.
+        """
+        version, content_version, text = await asyncio.to_thread(self._stat_and_extract, pdf_path)
+        chunks = await asyncio.to_thread(self._prepare_chunks, pdf_path, text)
+        texts = [chunk.text for chunk in chunks]
+        vectors = await self._embedder.embed(texts) if self._vectors is not None else None
+        removed = self._index.remove_document(pdf_path)
+        added = self._add_chunks(self._index, pdf_path, chunks)
+        if self._vectors is not None:
+            self._vectors.remove(removed)
+            # Chunks without index terms are skipped by the index; keep only the rows that were added
+            kept = [i for i, chunk in enumerate(texts) if tokenize(chunk)]
+            self._vectors.add(added, vectors[kept])
+        if self._duplicates is not None:
+            self._duplicates.remove(removed)
+            for chunk_id in added:
+                self._duplicates.add(chunk_id, self._index.get_chunk(chunk_id).text)
+        self._documents[pdf_path] = version
+        self._content_versions[pdf_path] = content_version
+        self._corpus_version = None
+        logging.info(f"Re-indexed {pdf_path} ({len(chunks)} chunks)")
+
+    async def remove_document(self, pdf_path: str) -> None:
+        """Drops a deleted PDF from the index and caches."""
+        self._documents.pop(pdf_path, None)
+        self._content_versions.pop(pdf_path, None)
+        self._corpus_version = None
+        removed = self._index.remove_document(pdf_path)
+        if self._vectors is not None:
+            self._vectors.remove(removed)
+        if self._duplicates is not None:
+            self._duplicates.remove(removed)
+        logging.info(f"Removed {pdf_path} from the knowledge base")
+
+    def document_versions(self, doc_ids) -> Dict[str, Optional[str]]:
+        """
+        Returns the indexed version (content hash) of each document, or None
+        for documents no longer in the knowledge base. Replicas holding their
+        own copy of a PDF agree on its version whatever its mtime.
+        """
+        return {doc_id: self._content_versions.get(doc_id) for doc_id in doc_ids}
+
+    @property
+    def corpus_version(self) -> str:
+        """A fingerprint of every indexed document's version; changes whenever any PDF does."""
+        if self._corpus_version is None:
+            digest = hashlib.sha1()
+            for doc_id, version in sorted(self._content_versions.items()):
+                digest.update(f"{doc_id}\0{version}\n".encode())
+            self._corpus_version = digest.hexdigest()
+        return self._corpus_version
+
+    async def start_watching(self, poll_interval: float = None) -> None:
+        """
+        Starts a background watcher that keeps the index in sync with PDF_DATA_DIR.
+        """
+        if self._watcher or not os.path.isdir(self.pdf_data_dir):
+            return
+        if poll_interval is None:
+            poll_interval = PDF_WATCH_POLL_INTERVAL
+        self._watcher = PDFDirectoryWatcher(
+            self.pdf_data_dir,
+            on_change=self.update_document,
+            on_remove=self.remove_document,
+            poll_interval=poll_interval,
+            initial={path: stat for path, stat in self._documents.items() if stat},
+        )
+        await self._watcher.start()
+
+    async def close(self) -> None:
+        """Stops the directory watcher, if running."""
+        if self._watcher:
+            await self._watcher.stop()
+            self._watcher = None
+
+    async def _rank(self, question: str) -> List[Tuple[int, float]]:
+        """
+        Returns the top (chunk_id, score) pairs for the configured retrieval mode.
+        Hybrid mode fuses BM25 and dense rankings with reciprocal rank fusion.
+        Dense modes fall back to BM25 until the vectors are built.
+        """
+        if self.retrieval_mode == "bm25" or self._vectors is None:
+            return self._index.search(question, k=RETRIEVAL_TOP_K)
+        query = (await self._embedder.embed([question]))[0]
+        dense = [(c, s) for c, s in self._vectors.search(query, k=RETRIEVAL_TOP_K) if s > 0]
+        if self.retrieval_mode == "dense":
+            return dense
+        fused: Dict[int, float] = {}
+        for ranking in (self._index.search(question, k=RETRIEVAL_TOP_K), dense):
+            for rank, (chunk_id, _) in enumerate(ranking):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (60 + rank)
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:RETRIEVAL_TOP_K]
+
+    async def rank_candidates(self, question: str) -> Tuple[List[Candidate], int]:
+        """
+        Returns the ranked chunks for `question` as packing candidates, best first,
+        and the number of near-duplicates dropped from them.
+        """
+        candidates = []
+        duplicates = self._duplicates
+        groups = set()
+        suppressed = 0
+        for chunk_id, score in await self._rank(question):
+            if duplicates is not None:
+                group = duplicates.group(chunk_id)
+                if group in groups:
+                    suppressed += 1
+                    continue
+                groups.add(group)
+            chunk = self._index.get_chunk(chunk_id)
+            candidates.append(Candidate(
+                text=self._format_chunk(chunk.doc_id, chunk.text),
+                tokens=chunk.tokens,  # Counted at index time
+                score=score,
+                doc_id=chunk.doc_id,
+                payload=chunk,
+            ))
+        return candidates, suppressed
+
+    async def retrieve(self, question: str, max_context_tokens: int = None, request_id: str = "") -> PackedContext:
+        """
+        Ranks chunks from all PDFs (BM25, dense or hybrid) and packs the most valuable ones into
+        the token budget. Only the best-ranked chunk of each group of near-duplicates is kept.
+        Each chunk is prefixed with its PDF filename; the candidate's payload is the indexed
+        chunk, with its page range and section title.
+        """
+        log_message = f"Performing PDF search for question: {question}"
+        if request_id:
+            log_message += f" | request_id={request_id}"
+        logging.info(log_message)
+
+        if max_context_tokens is None:
+            max_context_tokens = MAX_CONTEXT_TOKENS
+
+        if not self._loaded and not self._partial:
+            await self.ensure_loaded()
+
+        candidates, suppressed = await self.rank_candidates(question)
+        packed = pack_context(candidates, max_context_tokens)
+        logging.info(
+            f"Selected {len(packed.chunks)} of {len(candidates)} ranked chunks "
+            f"({suppressed} near-duplicates dropped), total tokens: {packed.tokens} "
+            f"(limit: {max_context_tokens}), packed score: {packed.score:.2f} ({packed.score_ratio:.0%} of candidates)"
+        )
+        return packed
+
+    async def find_relevant_context(self, question: str, max_context_tokens: int = None, request_id: str = "") -> str:
+        """
+        Finds and returns relevant text chunks from PDFs based on the question.
+        See `retrieve` for the packed result with token and score details.
+        """
+        packed = await self.retrieve(question, max_context_tokens, request_id)
+        return packed.text
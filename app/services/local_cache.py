@@ -0,0 +1,205 @@
+"""
+In-process cache tier in front of Redis.
+
+`LocalLRUCache` is a bounded LRU with per-entry TTLs and approximate memory
+accounting. `TieredCacheService` wraps a RedisService with it: reads are
+served from process memory when possible, writes go to both tiers, and
+writes/deletes are broadcast over Redis pub/sub so other replicas drop their
+local copies.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+@dataclass
+class LocalCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+@dataclass
+class _Fill:
+    """A local miss being filled from Redis; set if the key is invalidated before the read returns."""
+    invalidated: bool = False
+
+
+def _entry_size(key: str, value: str) -> int:
+    # Object headers included, so the limit tracks real memory reasonably well
+    return sys.getsizeof(key) + sys.getsizeof(value) + 64
+
+
+class LocalLRUCache:
+    """
+    Bounded LRU of string values with TTLs.
+    Evicts least recently used entries once `max_bytes` or `max_entries` is exceeded.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 10000, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.stats = LocalCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: float):
+        if ttl_seconds <= 0:
+            self.delete(key)
+            return
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        self._remove(key)
+        self._entries[key] = (value, self._clock() + ttl_seconds, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        return self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[2]
+        return True
+
+
+class TieredCacheService:
+    """
+    Drop-in replacement for RedisService with an in-process tier for
+    get_value/set_value. Every other call is delegated to Redis unchanged.
+    """
+    def __init__(self, redis_service, local: Optional[LocalLRUCache] = None,
+                 channel: str = INVALIDATION_CHANNEL, reconnect_delay: float = 1.0):
+        self.redis_service = redis_service
+        self.local = local or LocalLRUCache()
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.node_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._fills: Dict[str, List[_Fill]] = {}
+
+    def __getattr__(self, name):
+        # Lists, sets, locks, ping... go straight to Redis
+        return getattr(self.redis_service, name)
+
+    async def get_value(self, key: str) -> Optional[str]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        fill = _Fill()
+        self._fills.setdefault(key, []).append(fill)
+        try:
+            value, ttl = await self.redis_service.get_value_with_ttl(key)
+        finally:
+            fills = self._fills[key]
+            fills.remove(fill)
+            if not fills:
+                del self._fills[key]
+        # An invalidation that arrived during the read may be for a newer value than the one read
+        if value is not None and ttl and not fill.invalidated:
+            # Expire locally no later than Redis does
+            self.local.set(key, value, ttl)
+        return value
+
+    async def set_value(self, key: str, value: str, ttl_seconds: int):
+        self.local.set(key, value, ttl_seconds)
+        await self.redis_service.set_value(key, value, ttl_seconds)
+        await self._broadcast(key)
+
+    async def delete_value(self, key: str):
+        self.local.delete(key)
+        await self.redis_service.delete_value(key)
+        await self._broadcast(key)
+
+    async def _broadcast(self, key: str):
+        await self.redis_service.publish(self.channel, json.dumps({"key": key, "origin": self.node_id}))
+
+    def _on_invalidation(self, message: str):
+        try:
+            payload = json.loads(message)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed cache invalidation: {message!r}")
+            return
+        if payload.get("origin") == self.node_id:
+            return
+        key = payload.get("key", "")
+        self._invalidate_fills(self._fills.get(key, ()))
+        if self.local.delete(key):
+            self.local.stats.invalidations += 1
+
+    @staticmethod
+    def _invalidate_fills(fills):
+        for fill in fills:
+            fill.invalidated = True
+
+    async def start(self):
+        """Starts listening for invalidations from other replicas."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self.redis_service.listen(self.channel):
+                    self._on_invalidation(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Cache invalidation listener failed: {e}")
+            # Invalidations may have been missed while disconnected
+            for fills in self._fills.values():
+                self._invalidate_fills(fills)
+            self.local.clear()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.redis_service.close()
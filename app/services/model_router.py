@@ -0,0 +1,158 @@
+"""
+Per-request model selection for OpenAIService.
+
+A `ModelRouter` picks the model, output budget and temperature for each
+question from a policy table: an ordered list of rules, each limiting the
+question's size, the retrieved context's size and the best retrieval score.
+The first rule whose limits all hold is used; otherwise the default route.
+
+    OPENAI_ROUTING_POLICY='[
+      {"name": "fast", "model": "gpt-4o-mini", "max_tokens": 250,
+       "max_context_tokens": 1500, "min_score": 8},
+      {"name": "deep", "model": "gpt-4o", "min_context_tokens": 5000}
+    ]'
+
+Retrieval scores are on the scale of RETRIEVAL_MODE: BM25 scores, cosine
+similarities (dense) or reciprocal-rank sums (hybrid).
+
+The router also keeps each model's recent latencies and token usage
+(`snapshot`), so the thresholds can be tuned against what each tier costs.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Sequence
+
+from app.services.resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    """The model and generation settings chosen for one request."""
+    name: str
+    model: str
+    max_tokens: int
+    temperature: float
+
+
+@dataclass
+class RoutingRule:
+    """
+    One row of the policy table. Limits left as None do not apply; settings
+    left as None are taken from the default route.
+    """
+    name: str
+    model: str
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    max_question_tokens: Optional[int] = None
+    min_context_tokens: Optional[int] = None
+    max_context_tokens: Optional[int] = None
+    min_score: Optional[float] = None
+
+    def matches(self, question_tokens: int, context_tokens: int, top_score: Optional[float]) -> bool:
+        if self.max_question_tokens is not None and question_tokens > self.max_question_tokens:
+            return False
+        if self.min_context_tokens is not None and context_tokens < self.min_context_tokens:
+            return False
+        if self.max_context_tokens is not None and context_tokens > self.max_context_tokens:
+            return False
+        if self.min_score is not None and (top_score is None or top_score < self.min_score):
+            return False
+        return True
+
+
+@dataclass
+class ModelStats:
+    requests: int = 0
+    failures: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+
+class ModelRouter:
+    """Chooses a `Route` per request and records how each model performs."""
+
+    def __init__(self, default: Route, rules: Sequence[RoutingRule] = ()):
+        self.default = default
+        self.rules = list(rules)
+        self.stats: Dict[str, ModelStats] = {}
+        self.route_counts: Dict[str, int] = {}
+
+    @classmethod
+    def from_policy(cls, policy: str, default: Route) -> "ModelRouter":
+        """
+        Builds a router from a JSON list of rules (see the module docstring).
+        An empty policy routes everything to `default`. Raises ValueError on an
+        invalid policy, so a typo fails at startup instead of silently falling back.
+        """
+        if not policy or not policy.strip():
+            return cls(default)
+        try:
+            entries = json.loads(policy)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid routing policy: {e}") from e
+        if not isinstance(entries, list):
+            raise ValueError("Routing policy must be a JSON list of rules")
+        known = {f.name for f in fields(RoutingRule)}
+        rules: List[RoutingRule] = []
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict) or "model" not in entry:
+                raise ValueError(f"Routing rule {position} must be an object with a model")
+            unknown = set(entry) - known
+            if unknown:
+                raise ValueError(f"Routing rule {position} has unknown keys: {', '.join(sorted(unknown))}")
+            entry.setdefault("name", entry["model"])
+            rules.append(RoutingRule(**entry))
+        return cls(default, rules)
+
+    def route(self, question_tokens: int, context_tokens: int, top_score: Optional[float] = None) -> Route:
+        """The route of the first matching rule, or the default route."""
+        for rule in self.rules:
+            if rule.matches(question_tokens, context_tokens, top_score):
+                route = Route(
+                    name=rule.name,
+                    model=rule.model,
+                    max_tokens=self.default.max_tokens if rule.max_tokens is None else rule.max_tokens,
+                    temperature=self.default.temperature if rule.temperature is None else rule.temperature,
+                )
+                break
+        else:
+            route = self.default
+        self.route_counts[route.name] = self.route_counts.get(route.name, 0) + 1
+        return route
+
+    def record(self, route: Route, seconds: float, usage=None, failed: bool = False) -> None:
+        """Records one completed (or failed) request on the route's model."""
+        stats = self.stats.setdefault(route.model, ModelStats())
+        stats.requests += 1
+        if failed:
+            stats.failures += 1
+            return
+        stats.latency.record(seconds)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int):
+            stats.prompt_tokens += prompt_tokens
+        if isinstance(completion_tokens, int):
+            stats.completion_tokens += completion_tokens
+
+    def snapshot(self) -> dict:
+        models = {}
+        for model, stats in self.stats.items():
+            succeeded = stats.requests - stats.failures
+            p50, p95 = stats.latency.percentile(0.5), stats.latency.percentile(0.95)
+            models[model] = {
+                "requests": stats.requests,
+                "failures": stats.failures,
+                "p50_seconds": round(p50, 4) if p50 is not None else None,
+                "p95_seconds": round(p95, 4) if p95 is not None else None,
+                "prompt_tokens": stats.prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "average_completion_tokens": round(stats.completion_tokens / succeeded, 1) if succeeded else 0.0,
+            }
+        return {"routes": dict(self.route_counts), "models": models}
@@ -4,52 +4,232 @@ Service for interacting with the OpenAI API.
 
 import os
 import logging
+import time
 from openai import AsyncOpenAI, APIError # Removed unused import 'openai'
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.model_router import ModelRouter, Route
+from app.services.resilience import CircuitOpenError, ResilientCaller, is_retryable
+from app.utils.metrics import OPENAI_REQUEST_SECONDS, record_openai_usage
 
 # Basic logging configuration (ensure this is set up elsewhere properly in a real app)
 # logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_ROUTE = Route(name="default", model="gpt-4o-mini", max_tokens=500, temperature=0.7)
+
 class OpenAIService:
     """
     Handles interactions with the OpenAI API for generating answers.
     """
-    def __init__(self):
-        """Initializes the asynchronous OpenAI client."""
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('OPENAI_API_KEY')
+    def __init__(self, client: Optional[AsyncOpenAI] = None, admission: Optional[AdmissionController] = None,
+                 resilience: Optional[ResilientCaller] = None, timeout: Optional[float] = None,
+                 router: Optional[ModelRouter] = None):
+        """Initializes the asynchronous OpenAI client.
+
+        A pre-built client (e.g. a stub in tests) can be passed in; otherwise one
+        is created from OPENAI_API_KEY and reused for every request.
+        With `admission`, every call first waits for a concurrency slot and
+        RPM/TPM budget. With `resilience`, calls are retried, hedged and
+        guarded by a circuit breaker, so the client's own retries are turned off.
+        `timeout` bounds each attempt in seconds. `router` picks the model and
+        output budget of each request; without one, every request uses DEFAULT_ROUTE.
+        """
+        client_options = {}
+        if timeout is not None:
+            client_options["timeout"] = timeout
+        if resilience is not None:
+            client_options["max_retries"] = 0
+        self.client = client or AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            **client_options
         )
+        self.admission = admission
+        self.resilience = resilience
+        self.router = router or ModelRouter(DEFAULT_ROUTE)
         logger.info("OpenAI service initialized.") # Corrected spacing
 
-    async def get_answer(self, question: str, context: str, request_id: str = "") -> Optional[str]:
-        """Gets an answer from the OpenAI model based on the question and context."""
-        if not self.client:
-            logger.error("OpenAI client not initialized.")
-            return None
+    async def close(self):
+        """Closes the underlying HTTP client and its keep-alive connections."""
+        if self.client:
+            await self.client.close()
+            logger.info("OpenAI client closed.")
 
-        messages = [
+    @staticmethod
+    def _build_messages(question: str, context: str) -> list:
+        return [
             {"role": "system", "content": "You are a helpful assistant that answers questions based on the provided context."},
             {"role": "user", "content": f"Context: {context}\n\nQuestion: {question}"}
         ]
 
+    def _estimate_tokens(self, messages: list, max_tokens: int) -> int:
+        """Prompt tokens plus the completion allowance, charged against the TPM budget."""
+        from app.utils.tokens import count_tokens
+        return sum(count_tokens(m["content"]) + 4 for m in messages) + max_tokens
+
+    def _route(self, question: str, context: str, retrieval=None) -> Route:
+        """
+        Picks the route for a request. `retrieval` is the PackedContext the context
+        was built from; its token count and best chunk score spare a recount.
+        Nothing is counted when the policy has no rules to evaluate.
+        """
+        question_tokens = context_tokens = 0
+        top_score = None
+        if self.router.rules:
+            from app.utils.tokens import count_tokens
+            question_tokens = count_tokens(question)
+            if retrieval is not None:
+                context_tokens = retrieval.tokens
+                top_score = max((chunk.score for chunk in retrieval.chunks), default=None)
+            else:
+                context_tokens = count_tokens(context)
+        return self.router.route(question_tokens, context_tokens, top_score)
+
+    def _record(self, route: Route, started: float, usage=None, failed: bool = False):
+        """Records one OpenAI request's latency and usage for its model and route."""
+        seconds = time.perf_counter() - started
+        self.router.record(route, seconds, usage, failed=failed)
+        if not failed:
+            OPENAI_REQUEST_SECONDS.labels(model=route.model, route=route.name).observe(seconds)
+            record_openai_usage(usage, model=route.model)
+
+    @asynccontextmanager
+    async def _admit(self, messages: list, route: Route, request_id: str):
+        if self.admission is None:
+            yield None
+            return
+        estimated_tokens = self._estimate_tokens(messages, route.max_tokens)
+        async with self.admission.admit(estimated_tokens, request_id=request_id) as ticket:
+            yield ticket
+
+    async def _call(self, fn, hedge: bool = True, request_id: str = ""):
+        if self.resilience is None:
+            return await fn()
+        return await self.resilience.call(fn, hedge=hedge, request_id=request_id)
+
+    async def get_answer(self, question: str, context: str, request_id: str = "", retrieval=None) -> Optional[str]:
+        """Gets an answer from the OpenAI model based on the question and context.
+
+        The model and output budget are chosen by the router (see `_route`).
+        As in `stream_answer`, API errors are logged and re-raised, so callers
+        can fall back to a stale answer or report the failure. Raises
+        AdmissionRejected when over budget and CircuitOpenError while the
+        upstream is marked unhealthy.
+        """
+        if not self.client:
+            logger.error("OpenAI client not initialized.")
+            return None
+
+        messages = self._build_messages(question, context)
+        route = self._route(question, context, retrieval)
+
         try:
-            log_message = f"Calling OpenAI API with model gpt-4o-mini."
+            log_message = f"Calling OpenAI API with model {route.model} (route: {route.name})."
             if request_id:
                 log_message += f" | request_id={request_id}"
             logger.info(log_message)
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7,
-            )
+
+            async def attempt():
+                started = time.perf_counter()
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=route.model,
+                        messages=messages,
+                        max_tokens=route.max_tokens,
+                        temperature=route.temperature,
+                    )
+                except Exception:
+                    self._record(route, started, failed=True)
+                    raise
+                self._record(route, started, getattr(response, "usage", None))
+                return response
+
+            # Admitted once, as in `stream_answer`: the hedge timer starts only after
+            # the admission wait, so a queued request never triggers a hedge
+            async with self._admit(messages, route, request_id) as ticket:
+                response = await self._call(attempt, request_id=request_id)
+                if ticket and getattr(response, "usage", None):
+                    ticket.settle(response.usage.total_tokens)
             answer = response.choices[0].message.content
             logger.info("Successfully received answer from OpenAI API.")
             return answer
+        except (AdmissionRejected, CircuitOpenError):
+            raise
         except APIError as e:
             logger.error(f"OpenAI API error occurred: {e}")
-            return None
+            raise
         except Exception as e:
             logger.error(f"An unexpected error occurred during OpenAI API call: {e}")
-            return None 
\ No newline at end of file
+            raise
+
+    async def stream_answer(self, question: str, context: str, request_id: str = "",
+                            retrieval=None) -> AsyncIterator[str]:
+        """Streams the answer as text deltas while the model generates it.
+
+        As in `get_answer`, API errors are logged and re-raised, so callers can
+        tell a truncated answer from a complete one.
+        Raises AdmissionRejected if the request cannot be admitted in time.
+        Only opening the stream is retried; a stream that breaks part way is not.
+        """
+        if not self.client:
+            logger.error("OpenAI client not initialized.")
+            return
+
+        messages = self._build_messages(question, context)
+        route = self._route(question, context, retrieval)
+        log_message = f"Streaming OpenAI API with model {route.model} (route: {route.name})."
+        if request_id:
+            log_message += f" | request_id={request_id}"
+        logger.info(log_message)
+        stream = None
+        started = None
+        try:
+            async with self._admit(messages, route, request_id) as ticket:
+                started = time.perf_counter()
+                stream = await self._call(
+                    lambda: self.client.chat.completions.create(
+                        model=route.model,
+                        messages=messages,
+                        max_tokens=route.max_tokens,
+                        temperature=route.temperature,
+                        stream=True,
+                        # The final chunk then reports token usage
+                        stream_options={"include_usage": True},
+                    ),
+                    hedge=False,
+                    request_id=request_id,
+                )
+                completion_chunks = 0
+                usage = None
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        completion_chunks += 1
+                        yield delta
+                self._record(route, started, usage)
+                if ticket:
+                    if usage is not None:
+                        ticket.settle(usage.total_tokens)
+                    else:
+                        # Streamed chunks carry roughly one token each
+                        ticket.settle(ticket.estimated_tokens - route.max_tokens + completion_chunks)
+            logger.info("Finished streaming answer from OpenAI API.")
+        except (AdmissionRejected, CircuitOpenError):
+            raise
+        except APIError as e:
+            logger.error(f"OpenAI API error occurred while streaming: {e}")
+            if started is not None:
+                self._record(route, started, failed=True)
+            # Failures opening the stream were already counted by the breaker
+            if stream is not None and self.resilience and is_retryable(e):
+                self.resilience.breaker.record_failure()
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while streaming from OpenAI: {e}")
+            raise
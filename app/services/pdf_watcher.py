@@ -0,0 +1,156 @@
+"""
+Background watcher for the PDF data directory.
+
+Uses filesystem notifications (inotify via the optional `watchfiles` package)
+where available and falls back to mtime polling. Either way, changes are
+detected by diffing (size, mtime) snapshots, so each added, modified or
+removed PDF is reported exactly once, after its size and mtime have settled.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import watchfiles  # Optional: inotify/FSEvents backed notifications
+except ImportError:  # pragma: no cover - depends on the environment
+    watchfiles = None
+
+logger = logging.getLogger(__name__)
+
+FileStat = Tuple[int, int]  # (size, mtime_ns)
+
+
+def stat_pdf(path: str) -> Optional[FileStat]:
+    """Returns (size, mtime_ns) for a file, or None if it cannot be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def scan_directory(directory: str) -> Dict[str, FileStat]:
+    """Returns {path: (size, mtime_ns)} for every PDF directly inside `directory`."""
+    snapshot: Dict[str, FileStat] = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                    st = entry.stat()
+                    snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+    except OSError as e:
+        logger.error(f"Error scanning PDF directory {directory}: {e}")
+    return snapshot
+
+
+class PDFDirectoryWatcher:
+    """
+    Watches a directory and calls `on_change(path)` for added/modified PDFs and
+    `on_remove(path)` for deleted ones.
+    """
+    def __init__(
+        self,
+        directory: str,
+        on_change: Callable[[str], Awaitable[None]],
+        on_remove: Callable[[str], Awaitable[None]],
+        poll_interval: float = 5.0,
+        initial: Optional[Dict[str, FileStat]] = None,
+        use_notifications: bool = True,
+    ):
+        self.directory = directory
+        self.on_change = on_change
+        self.on_remove = on_remove
+        self.poll_interval = poll_interval
+        self.use_notifications = use_notifications and watchfiles is not None
+        self._known: Dict[str, FileStat] = dict(initial or {})
+        self._pending: Dict[str, FileStat] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    @property
+    def mode(self) -> str:
+        return "notify" if self.use_notifications else "poll"
+
+    async def start(self):
+        if self._task:
+            return
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Watching {self.directory} for PDF changes (mode: {self.mode})")
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._stop_event.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Stopped watching {self.directory}")
+
+    async def _run(self):
+        try:
+            if self.use_notifications:
+                await self._notify_loop()
+            else:
+                await self._poll_loop()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Notification backends can fail (e.g. inotify watch limits); keep going by polling.
+            logger.exception(f"PDF watcher failed in {self.mode} mode, falling back to polling: {e}")
+            self.use_notifications = False
+            await self._poll_loop()
+
+    async def _poll_loop(self):
+        while not self._stop_event.is_set():
+            await self.sync()
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _notify_loop(self):
+        async for changes in watchfiles.awatch(self.directory, stop_event=self._stop_event, recursive=False):
+            if any(path.lower().endswith(".pdf") for _, path in changes):
+                await self.sync()
+                # Files still being written are confirmed on the next event or poll
+                while self._pending and not self._stop_event.is_set():
+                    await asyncio.sleep(self.poll_interval)
+                    await self.sync()
+
+    async def sync(self):
+        """
+        Diffs the directory against the last known state and dispatches callbacks.
+        A new or modified file is only reported once its stat is unchanged
+        between two consecutive syncs, so half-written files are not indexed.
+        """
+        current = await asyncio.to_thread(scan_directory, self.directory)
+        for path in list(self._known):
+            if path not in current:
+                del self._known[path]
+                self._pending.pop(path, None)
+                await self._dispatch(self.on_remove, path)
+        for path, stat in current.items():
+            if self._known.get(path) == stat:
+                self._pending.pop(path, None)
+                continue
+            if self._pending.get(path) != stat:
+                self._pending[path] = stat
+                continue
+            del self._pending[path]
+            self._known[path] = stat
+            await self._dispatch(self.on_change, path)
+        for path in list(self._pending):
+            if path not in current:
+                del self._pending[path]
+
+    async def _dispatch(self, callback, path: str):
+        try:
+            await callback(path)
+        except Exception as e:
+            logger.exception(f"Error handling PDF change for {path}: {e}")
@@ -1,11 +1,19 @@
 import logging
 import os
-from typing import Union
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
 
 import redis.asyncio as redis
 
 logger = logging.getLogger(__name__)
 
+# Deletes a lock only if it still holds the caller's token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
 
 class RedisService:
     """Service class for interacting with Redis."""
@@ -92,6 +100,267 @@ class RedisService:
         except Exception as e:
             logger.exception(f"Unexpected error setting value for key '{key}': {e}")
 
+    async def get_value_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """Gets a value and its remaining time-to-live in one round trip.
+
+        Returns:
+            (value, ttl_seconds). ttl_seconds is None if the key has no expiry
+            or is missing. Returns (None, None) on Redis errors.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot get value.")
+            return None, None
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                value, ttl_ms = await pipe.execute()
+        except redis.RedisError as e:
+            logger.exception(f"Redis error getting value for key '{key}': {e}")
+            return None, None
+        return value, (ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else None)
+
+    async def delete_value(self, key: str):
+        """Deletes a key."""
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot delete value.")
+            return
+        try:
+            await self.redis_client.delete(key)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error deleting key '{key}': {e}")
+
+    async def publish(self, channel: str, message: str):
+        """Publishes a message on a pub/sub channel."""
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.publish(channel, message)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error publishing to '{channel}': {e}")
+
+    async def listen(self, channel: str) -> AsyncIterator[str]:
+        """Yields messages published on `channel` until cancelled.
+
+        Connection errors are raised so the caller can decide how to recover.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot subscribe.")
+            return
+        pubsub = self.redis_client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            logger.info(f"Subscribed to Redis channel '{channel}'.")
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
+    async def get_values(self, keys: List[str]) -> List[Union[str, None]]:
+        """Gets several values in one round trip.
+
+        Args:
+            keys: The keys to retrieve.
+
+        Returns:
+            One entry per key: the value, or None if missing.
+            Returns all None on Redis errors.
+        """
+        if not keys:
+            return []
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot get values.")
+            return [None] * len(keys)
+        try:
+            return await self.redis_client.mget(keys)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error getting {len(keys)} values: {e}")
+            return [None] * len(keys)
+
+    async def add_to_sets(self, keys: List[str], member: str, ttl_seconds: int):
+        """Adds `member` to each set in `keys` and refreshes their TTL.
+
+        Args:
+            keys: The set keys to add to.
+            member: The member to add.
+            ttl_seconds: The time-to-live applied to every set.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot add to sets.")
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.sadd(key, member)
+                    pipe.expire(key, ttl_seconds)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.exception(f"Redis error adding to {len(keys)} sets: {e}")
+
+    async def get_set_members(self, keys: List[str]) -> List[Set[str]]:
+        """Gets the members of several sets in one round trip.
+
+        Returns:
+            One set per key (empty if missing). Returns empty sets on Redis errors.
+        """
+        if not keys:
+            return []
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot get set members.")
+            return [set() for _ in keys]
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.smembers(key)
+                return [set(members) for members in await pipe.execute()]
+        except redis.RedisError as e:
+            logger.exception(f"Redis error reading {len(keys)} sets: {e}")
+            return [set() for _ in keys]
+
+    async def acquire_lock(self, key: str, token: str, ttl_seconds: int) -> bool:
+        """Takes a short-lived lease on `key` if nobody else holds it.
+
+        Args:
+            key: The lease key.
+            token: A value identifying the holder, required to release the lease.
+            ttl_seconds: How long the lease lasts if never released.
+
+        Returns:
+            True if the lease was acquired. Fails open (True) when Redis is
+            unavailable, so callers never block on a broken lease store.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot acquire lock.")
+            return True
+        try:
+            return bool(await self.redis_client.set(key, token, nx=True, ex=ttl_seconds))
+        except redis.RedisError as e:
+            logger.exception(f"Redis error acquiring lock '{key}': {e}")
+            return True
+
+    async def release_lock(self, key: str, token: str):
+        """Releases a lease, but only if `token` still holds it."""
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error releasing lock '{key}': {e}")
+
+    async def add_to_stream(self, stream: str, fields: Dict[str, str], maxlen: Optional[int] = None) -> Optional[str]:
+        """Appends an entry to a stream, trimming it to about `maxlen` entries.
+
+        Returns:
+            The entry ID, or None if the entry could not be written.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot add to stream.")
+            return None
+        try:
+            return await self.redis_client.xadd(stream, fields, maxlen=maxlen, approximate=True)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error adding to stream '{stream}': {e}")
+            return None
+
+    async def create_consumer_group(self, stream: str, group: str) -> bool:
+        """Creates a consumer group (and the stream) if it does not exist yet.
+
+        Returns:
+            True if the group exists afterwards.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot create consumer group.")
+            return False
+        try:
+            await self.redis_client.xgroup_create(stream, group, id="0", mkstream=True)
+            logger.info(f"Created consumer group '{group}' on stream '{stream}'.")
+            return True
+        except redis.ResponseError as e:
+            if "BUSYGROUP" in str(e):
+                return True
+            logger.exception(f"Redis error creating consumer group '{group}': {e}")
+            return False
+        except redis.RedisError as e:
+            logger.exception(f"Redis error creating consumer group '{group}': {e}")
+            return False
+
+    async def read_from_group(self, stream: str, group: str, consumer: str, count: int,
+                              block_ms: int) -> Optional[List[Tuple[str, Dict[str, str]]]]:
+        """Reads up to `count` new entries for `consumer`, blocking up to `block_ms`.
+
+        Returns:
+            (entry ID, fields) pairs. Returns None if Redis could not be read,
+            so callers can back off instead of polling again at once.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot read from stream.")
+            return None
+        try:
+            response = await self.redis_client.xreadgroup(group, consumer, {stream: ">"}, count=count, block=block_ms)
+        except redis.RedisError as e:
+            logger.error(f"Redis error reading stream '{stream}': {e}")
+            return None
+        return [entry for _, entries in response or [] for entry in entries]
+
+    async def ack_messages(self, stream: str, group: str, *entry_ids: str) -> int:
+        """Acknowledges processed entries so they leave the pending list."""
+        if not self.redis_client or not entry_ids:
+            return 0
+        try:
+            return await self.redis_client.xack(stream, group, *entry_ids)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error acknowledging {len(entry_ids)} entries on '{stream}': {e}")
+            return 0
+
+    async def claim_idle_messages(self, stream: str, group: str, consumer: str, min_idle_ms: int,
+                                  count: int) -> List[Tuple[str, Dict[str, str]]]:
+        """Takes over entries another consumer read but did not acknowledge within `min_idle_ms`.
+
+        Returns:
+            The claimed (entry ID, fields) pairs. Returns an empty list on Redis errors.
+        """
+        if not self.redis_client:
+            return []
+        try:
+            response = await self.redis_client.xautoclaim(stream, group, consumer, min_idle_ms,
+                                                          start_id="0-0", count=count)
+        except redis.RedisError as e:
+            logger.exception(f"Redis error claiming idle entries on '{stream}': {e}")
+            return []
+        return [(entry_id, fields) for entry_id, fields in response[1] if fields is not None]
+
+    async def delivery_counts(self, stream: str, group: str, entry_ids: List[str]) -> Dict[str, int]:
+        """Returns how many times each pending entry has been delivered."""
+        if not self.redis_client or not entry_ids:
+            return {}
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for entry_id in entry_ids:
+                    pipe.xpending_range(stream, group, min=entry_id, max=entry_id, count=1)
+                results = await pipe.execute()
+        except redis.RedisError as e:
+            logger.exception(f"Redis error reading pending entries on '{stream}': {e}")
+            return {}
+        return {p["message_id"]: p["times_delivered"] for pending in results for p in pending}
+
+    async def ping(self) -> bool:
+        """Opens a pooled connection and checks the server is reachable.
+
+        Returns:
+            True if the server answered, False otherwise.
+        """
+        if not self.redis_client:
+            logger.error("Redis client not initialized. Cannot ping.")
+            return False
+        try:
+            await self.redis_client.ping()
+            logger.info("Redis connection established.")
+            return True
+        except redis.RedisError as e:
+            logger.error(f"Redis ping failed: {e}")
+            return False
+
     async def close(self):
         """Closes the Redis client connection."""
         if self.redis_client:
@@ -0,0 +1,213 @@
+"""
+Resilience primitives for upstream calls.
+
+- `RetryPolicy`: exponential backoff with full jitter for transient errors.
+- `LatencyTracker`: rolling latency window used to decide when to hedge.
+- `CircuitBreaker`: fails fast while the upstream is unhealthy and lets a
+  probe through after a cool-down.
+- `ResilientCaller`: combines the three around an async call.
+"""
+
+import asyncio
+import functools
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@functools.lru_cache(maxsize=1)
+def retryable_errors() -> Tuple[type, ...]:
+    """
+    Errors worth another attempt: timeouts, dropped connections, 429s and 5xx.
+    Resolved on first use so importing this module (and the handlers) does not load the OpenAI SDK.
+    """
+    import openai
+    return (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+        asyncio.TimeoutError,
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, retryable_errors())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: sleep ~ U(0, min(max_delay, base * 2**attempt))."""
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0,
+                 rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to sleep after the given (0-based) failed attempt."""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Keeps the last `window` successful latencies and answers percentile queries."""
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; after `reset_timeout`
+    seconds the next call is let through as a probe (half-open) and every other
+    call is rejected while it runs. A successful probe closes the circuit, a
+    failed one reopens it; a probe that ends without either is `release`d.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN or self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def release(self):
+        """Frees the half-open probe slot after a call that neither succeeded nor failed."""
+        self._probing = False
+
+    def record_success(self):
+        if self._state != self.CLOSED:
+            logger.info("Circuit closed: upstream recovered.")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._probing = False
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"Circuit opened after {self._failures} consecutive failures.")
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+
+
+class ResilientCaller:
+    """
+    Runs an async call with retries, optional hedging and a circuit breaker.
+
+    Hedging: once `hedge_min_samples` latencies are known, a duplicate call is
+    started if the first has not finished within the `hedge_percentile`
+    latency; whichever succeeds first wins and the other is cancelled.
+    """
+    def __init__(self, retry: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 hedge_percentile: Optional[float] = None, hedge_min_samples: int = 20,
+                 latency: Optional[LatencyTracker] = None):
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = latency or LatencyTracker()
+        self.hedges = 0
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_percentile or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def call(self, fn: Callable[[], Awaitable[T]], hedge: bool = True, request_id: str = "") -> T:
+        """
+        Calls `fn` until it succeeds, a non-retryable error is raised or the
+        attempts run out. Raises CircuitOpenError without calling `fn` while
+        the circuit is open.
+        """
+        for attempt in range(self.retry.max_attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError("upstream circuit is open")
+            started = time.monotonic()
+            try:
+                result = await (self._hedged(fn, request_id) if hedge else fn())
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= self.retry.max_attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+                logger.warning(
+                    f"Retryable upstream error ({type(e).__name__}), retrying in {delay:.2f}s "
+                    f"| attempt={attempt + 1} | request_id={request_id}"
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.latency.record(time.monotonic() - started)
+            return result
+        raise AssertionError("unreachable")
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]], request_id: str) -> T:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await fn()
+        primary = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        self.hedges += 1
+        logger.info(f"Hedging slow upstream call after {delay:.2f}s | request_id={request_id}")
+        pending = {primary, asyncio.ensure_future(fn())}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
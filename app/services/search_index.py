@@ -0,0 +1,160 @@
+"""
+In-memory inverted index with BM25 scoring over knowledge base chunks.
+"""
+
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Common English function words; they carry no retrieval signal and would
+# otherwise match nearly every chunk.
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same
+she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours yourself
+yourselves
+""".split())
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases and splits text into word tokens, dropping stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+@dataclass
+class IndexedChunk:
+    """A retrievable unit of text, the document it came from, its prompt token count and location."""
+    doc_id: str
+    text: str
+    tokens: int = 0
+    page: int = 0
+    page_end: int = 0
+    section: str = ""
+
+
+class BM25Index:
+    """
+    Inverted index over text chunks, scored with Okapi BM25.
+
+    Documents are added and removed as a whole, so a changed PDF only touches
+    its own postings. Queries only visit the postings of the query terms.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._chunks: Dict[int, IndexedChunk] = {}
+        self._chunk_lengths: Dict[int, int] = {}
+        self._doc_chunks: Dict[str, List[int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    @property
+    def documents(self) -> List[str]:
+        return list(self._doc_chunks)
+
+    def add_document(self, doc_id: str, chunks: Sequence[str], token_counts: Optional[Sequence[int]] = None,
+                     locations: Optional[Sequence[Tuple[int, int, str]]] = None) -> List[int]:
+        """
+        Indexes the chunks of a document, replacing any previous version of it.
+        `token_counts` are stored alongside each chunk so queries never re-tokenize;
+        `locations` are each chunk's (first page, last page, section title).
+        Returns the ids assigned to the new chunks.
+        """
+        if token_counts is None:
+            token_counts = [0] * len(chunks)
+        if locations is None:
+            locations = [(0, 0, "")] * len(chunks)
+        return self.add_chunks(doc_id, [
+            IndexedChunk(doc_id, text, tokens, page, page_end, section)
+            for text, tokens, (page, page_end, section) in zip(chunks, token_counts, locations)
+        ])
+
+    def add_chunks(self, doc_id: str, chunks: Sequence[IndexedChunk]) -> List[int]:
+        """
+        Like `add_document`, for ready-made chunk objects (e.g. views into a corpus
+        store), which are kept as they are.
+        """
+        self.remove_document(doc_id)
+        chunk_ids: List[int] = []
+        for chunk in chunks:
+            terms = tokenize(chunk.text)
+            if not terms:
+                continue
+            chunk_id = self._next_id
+            self._next_id += 1
+            self._chunks[chunk_id] = chunk
+            self._chunk_lengths[chunk_id] = len(terms)
+            self._total_length += len(terms)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[chunk_id] = tf
+            chunk_ids.append(chunk_id)
+        self._doc_chunks[doc_id] = chunk_ids
+        return chunk_ids
+
+    def remove_document(self, doc_id: str) -> List[int]:
+        """Drops every chunk of a document from the index and returns their ids."""
+        chunk_ids = self._doc_chunks.pop(doc_id, [])
+        for chunk_id in chunk_ids:
+            chunk = self._chunks.pop(chunk_id)
+            self._total_length -= self._chunk_lengths.pop(chunk_id)
+            for term in set(tokenize(chunk.text)):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        return chunk_ids
+
+    def replace_chunks(self, chunks: Dict[int, IndexedChunk]) -> None:
+        """
+        Swaps the stored objects of existing chunks for equivalent ones (e.g. lazy
+        views of the same text in a corpus store). Postings are left unchanged.
+        """
+        for chunk_id, chunk in chunks.items():
+            if chunk_id in self._chunks:
+                self._chunks[chunk_id] = chunk
+
+    def items(self) -> List[Tuple[int, IndexedChunk]]:
+        """Returns every (chunk_id, chunk) pair in insertion order."""
+        return list(self._chunks.items())
+
+    def get_chunk(self, chunk_id: int) -> IndexedChunk:
+        return self._chunks[chunk_id]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Returns up to `k` (chunk_id, score) pairs, best first.
+        Only chunks sharing at least one non-stopword term with the query are scored.
+        """
+        n = len(self._chunks)
+        if n == 0 or k <= 0:
+            return []
+        avg_length = self._total_length / n
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._chunk_lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,130 @@
+"""
+Similarity-based answer cache.
+
+Questions are reduced to MinHash signatures over their content words, and
+signatures are bucketed with locality-sensitive hashing (LSH) bands stored as
+Redis sets. A lookup only compares against questions that share at least one
+band, so near-duplicates ("How do I reset my password" / "how can I reset my
+password?") resolve to the same cached answer with a couple of round trips.
+"""
+
+import hashlib
+import json
+import logging
+import random
+from typing import List, Optional, Tuple
+
+from app.services.search_index import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Words that change what is being asked; unlike other stopwords they are kept
+# so "who can reset my password" does not match "how do I reset my password".
+_MEANINGFUL_STOPWORDS = frozenset({"who", "what", "when", "where", "why", "how", "which", "not", "no", "nor"})
+_IGNORED_WORDS = STOPWORDS - _MEANINGFUL_STOPWORDS
+
+
+def question_features(normalized_question: str) -> List[str]:
+    """Returns the set of words that identify a question, in first-seen order."""
+    seen = {}
+    for word in normalized_question.split():
+        if word not in _IGNORED_WORDS:
+            seen.setdefault(word, None)
+    return list(seen)
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    """MinHash over string features with fixed, seeded permutations."""
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+                        for _ in range(num_perm)]
+
+    def signature(self, features: List[str]) -> List[int]:
+        hashes = [_hash32(f) for f in features]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in self._params]
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        """Estimated Jaccard similarity of the feature sets behind two signatures."""
+        if not sig_a or len(sig_a) != len(sig_b):
+            return 0.0
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class SemanticAnswerCache:
+    """
+    Maps near-duplicate questions to the cache key of a previously answered one.
+    Answers themselves stay under their exact-question cache keys.
+    """
+    def __init__(self, redis_service, threshold: float = 0.85, num_perm: int = 64, bands: int = 16,
+                 prefix: str = "semcache"):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.redis_service = redis_service
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.prefix = prefix
+        self.hasher = MinHasher(num_perm)
+
+    def _band_keys(self, signature: List[int]) -> List[str]:
+        keys = []
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(",".join(map(str, values)).encode(), digest_size=8).hexdigest()
+            keys.append(f"{self.prefix}:lsh:{band}:{digest}")
+        return keys
+
+    def _signature_key(self, cache_key: str) -> str:
+        return f"{self.prefix}:sig:{cache_key}"
+
+    async def lookup(self, normalized_question: str, request_id: str = "") -> Optional[Tuple[str, float]]:
+        """
+        Returns (cache_key, similarity) of the most similar previously cached
+        question at or above the threshold, or None.
+        """
+        features = question_features(normalized_question)
+        if not features:
+            return None
+        signature = self.hasher.signature(features)
+        buckets = await self.redis_service.get_set_members(self._band_keys(signature))
+        candidates = sorted(set().union(*buckets))
+        if not candidates:
+            logger.info(f"Semantic cache miss (no candidates) | request_id={request_id}")
+            return None
+        stored = await self.redis_service.get_values([self._signature_key(c) for c in candidates])
+        best_key, best_similarity = None, 0.0
+        for candidate, raw in zip(candidates, stored):
+            if not raw:
+                continue
+            similarity = MinHasher.similarity(signature, json.loads(raw))
+            if similarity > best_similarity:
+                best_key, best_similarity = candidate, similarity
+        if best_key and best_similarity >= self.threshold:
+            logger.info(f"Semantic cache hit | similarity={best_similarity:.2f} | matched={best_key} | request_id={request_id}")
+            return best_key, best_similarity
+        logger.info(
+            f"Semantic cache miss | best_similarity={best_similarity:.2f} | threshold={self.threshold} "
+            f"| candidates={len(candidates)} | request_id={request_id}"
+        )
+        return None
+
+    async def store(self, normalized_question: str, cache_key: str, ttl_seconds: int) -> None:
+        """Registers an answered question so similar questions can find its cache key."""
+        features = question_features(normalized_question)
+        if not features:
+            return
+        signature = self.hasher.signature(features)
+        await self.redis_service.set_value(self._signature_key(cache_key), json.dumps(signature), ttl_seconds)
+        await self.redis_service.add_to_sets(self._band_keys(signature), cache_key, ttl_seconds)
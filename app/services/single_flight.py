@@ -0,0 +1,109 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one computation. Inside a
+process they await the same future; across replicas a short Redis lease
+elects one leader while followers poll for the leader's cached result.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Set on the shared future when the leader is cancelled, so a follower takes over."""
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work per key, in-process and (optionally) across replicas.
+    `lease_seconds` must outlive the slowest `fn`, or a second replica starts the same work.
+    """
+    def __init__(self, redis_service=None, lease_seconds: int = 30, poll_interval: float = 0.25,
+                 wait_timeout: float = 30.0, prefix: str = "singleflight"):
+        self.redis_service = redis_service
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.prefix = prefix
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        fetch_result: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+    ) -> T:
+        """
+        Runs `fn` once per key at a time. In-process callers that arrive while it
+        runs share its result (or exception). If the caller running `fn` is
+        cancelled, one of the waiting callers runs it instead. If another replica
+        holds the lease, waits for `fetch_result` to return a value instead of calling `fn`.
+        """
+        while True:
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            logger.info(f"Coalesced onto in-flight request | request_id={key}")
+            try:
+                return await asyncio.shield(pending)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._lead_or_follow(key, fn, fetch_result)
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _lead_or_follow(self, key, fn, fetch_result) -> T:
+        if self.redis_service is None or fetch_result is None:
+            return await fn()
+        lease_key = f"{self.prefix}:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        if await self.redis_service.acquire_lock(lease_key, token, self.lease_seconds):
+            return await self._lead(lease_key, token, fn)
+        # Another replica is computing this result; wait for it to land
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            result = await fetch_result()
+            if result is not None:
+                logger.info(f"Served result computed by another replica | request_id={key}")
+                return result
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for lease holder, computing locally | request_id={key}")
+                return await fn()
+            # The leader finished without a cacheable result (or died); take over
+            if await self.redis_service.acquire_lock(lease_key, token, self.lease_seconds):
+                return await self._lead(lease_key, token, fn)
+
+    async def _lead(self, lease_key: str, token: str, fn) -> T:
+        try:
+            return await fn()
+        finally:
+            await self.redis_service.release_lock(lease_key, token)
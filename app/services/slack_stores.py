@@ -0,0 +1,192 @@
+"""
+Redis-backed Slack OAuth installation and state stores.
+
+Bolt looks up the workspace installation on every request. The file
+stores in slack_sdk read JSON from local disk each time and need a shared
+volume to work across replicas; these keep installations in Redis instead,
+with a short-TTL in-process cache in front so steady-state authorization
+does no I/O at all. A save or delete clears this process's cache at once;
+other replicas see the change within `cache_ttl` seconds, and a new
+installation immediately, since lookups that found nothing are not cached.
+
+`redis_service` may be a zero-argument callable returning the service; it is
+then resolved on every call, so the stores can be created before the service.
+
+Key layout (all under `prefix`):
+    <prefix>:bot:<enterprise>:<team>             latest bot, JSON
+    <prefix>:installation:<enterprise>:<team>    hash: "latest" and "user:<id>" -> JSON
+    <prefix>:oauth-state:<state>                 OAuth state, expires on its own
+"""
+
+import json
+import logging
+import time
+import uuid
+from logging import Logger
+from typing import Any, Dict, Optional, Tuple
+
+from slack_sdk.oauth.installation_store import Bot, Installation
+from slack_sdk.oauth.installation_store.async_installation_store import AsyncInstallationStore
+from slack_sdk.oauth.state_store.async_state_store import AsyncOAuthStateStore
+
+logger = logging.getLogger(__name__)
+
+_NONE = "none"
+_MISSING = object()
+
+
+def _team_key(enterprise_id: Optional[str], team_id: Optional[str], is_enterprise_install: Optional[bool] = False) -> str:
+    # Org-wide installs are stored once per enterprise, like FileInstallationStore does
+    return f"{enterprise_id or _NONE}:{_NONE if is_enterprise_install else team_id or _NONE}"
+
+
+def _client(redis_service):
+    if callable(redis_service):
+        redis_service = redis_service()
+    client = getattr(redis_service, "redis_client", None)
+    if client is None:
+        raise RuntimeError("Redis client not initialized")
+    return client
+
+
+class RedisInstallationStore(AsyncInstallationStore):
+    """Async installation store on Redis with a short-lived local cache."""
+
+    def __init__(self, redis_service, prefix: str = "slack", cache_ttl: float = 30.0, clock=time.monotonic):
+        self.redis_service = redis_service
+        self.prefix = prefix
+        self.cache_ttl = cache_ttl
+        self._clock = clock
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+
+    @property
+    def logger(self) -> Logger:
+        return logger
+
+    def _bot_key(self, team_key: str) -> str:
+        return f"{self.prefix}:bot:{team_key}"
+
+    def _installation_key(self, team_key: str) -> str:
+        return f"{self.prefix}:installation:{team_key}"
+
+    # --- local cache (decoded JSON dicts, so callers always get fresh objects) ---
+
+    def _cached(self, key: str):
+        entry = self._cache.get(key)
+        if entry is None or entry[0] <= self._clock():
+            self._cache.pop(key, None)
+            return _MISSING
+        return entry[1]
+
+    def _remember(self, key: str, data: Optional[dict]):
+        if self.cache_ttl > 0:
+            self._cache[key] = (self._clock() + self.cache_ttl, data)
+
+    def _forget(self, team_key: str):
+        for key in [k for k in self._cache if k.split("|", 1)[0] == team_key]:
+            del self._cache[key]
+
+    async def _load(self, cache_key: str, read) -> Optional[dict]:
+        data = self._cached(cache_key)
+        if data is _MISSING:
+            raw = await read()
+            data = json.loads(raw) if raw else None
+            if data is not None:
+                # Misses are not cached: a workspace installed through another replica works at once
+                self._remember(cache_key, data)
+        return data
+
+    # --- AsyncInstallationStore ---
+
+    async def async_save(self, installation: Installation):
+        team_key = _team_key(installation.enterprise_id, installation.team_id, installation.is_enterprise_install)
+        entity = json.dumps(installation.__dict__)
+        await self.async_save_bot(installation.to_bot())
+        await _client(self.redis_service).hset(self._installation_key(team_key), mapping={
+            "latest": entity,
+            f"user:{installation.user_id or _NONE}": entity,
+        })
+        self._forget(team_key)
+
+    async def async_save_bot(self, bot: Bot):
+        if bot.bot_token is None:
+            logger.debug("Skipped saving a bot without a bot token")
+            return
+        team_key = _team_key(bot.enterprise_id, bot.team_id, bot.is_enterprise_install)
+        await _client(self.redis_service).set(self._bot_key(team_key), json.dumps(bot.__dict__))
+        self._forget(team_key)
+
+    async def async_find_bot(self, *, enterprise_id: Optional[str], team_id: Optional[str],
+                             is_enterprise_install: Optional[bool] = False) -> Optional[Bot]:
+        team_key = _team_key(enterprise_id, team_id, is_enterprise_install)
+        data = await self._load(f"{team_key}|bot", lambda: _client(self.redis_service).get(self._bot_key(team_key)))
+        return Bot(**data) if data else None
+
+    async def async_find_installation(self, *, enterprise_id: Optional[str], team_id: Optional[str],
+                                      user_id: Optional[str] = None,
+                                      is_enterprise_install: Optional[bool] = False) -> Optional[Installation]:
+        team_key = _team_key(enterprise_id, team_id, is_enterprise_install)
+        field = f"user:{user_id}" if user_id is not None else "latest"
+        data = await self._load(
+            f"{team_key}|{field}",
+            lambda: _client(self.redis_service).hget(self._installation_key(team_key), field),
+        )
+        if not data:
+            return None
+        installation = Installation(**data)
+        if user_id is not None or installation.bot_token is None:
+            # A user's installation may predate the workspace's latest bot token
+            bot = await self.async_find_bot(enterprise_id=enterprise_id, team_id=team_id,
+                                            is_enterprise_install=is_enterprise_install)
+            if bot is not None and bot.bot_token != installation.bot_token:
+                installation.bot_id = bot.bot_id
+                installation.bot_user_id = bot.bot_user_id
+                installation.bot_token = bot.bot_token
+                installation.bot_scopes = bot.bot_scopes
+                installation.bot_refresh_token = bot.bot_refresh_token
+                installation.bot_token_expires_at = bot.bot_token_expires_at
+        return installation
+
+    async def async_delete_bot(self, *, enterprise_id: Optional[str], team_id: Optional[str]) -> None:
+        team_key = _team_key(enterprise_id, team_id)
+        await _client(self.redis_service).delete(self._bot_key(team_key))
+        self._forget(team_key)
+
+    async def async_delete_installation(self, *, enterprise_id: Optional[str], team_id: Optional[str],
+                                        user_id: Optional[str] = None) -> None:
+        team_key = _team_key(enterprise_id, team_id)
+        client = _client(self.redis_service)
+        if user_id is None:
+            await client.delete(self._installation_key(team_key))
+        else:
+            await client.hdel(self._installation_key(team_key), f"user:{user_id}")
+        self._forget(team_key)
+
+
+class RedisOAuthStateStore(AsyncOAuthStateStore):
+    """One-time OAuth `state` values in Redis, valid for `expiration_seconds`."""
+
+    def __init__(self, redis_service, expiration_seconds: int = 600, prefix: str = "slack"):
+        self.redis_service = redis_service
+        self.expiration_seconds = expiration_seconds
+        self.prefix = prefix
+
+    @property
+    def logger(self) -> Logger:
+        return logger
+
+    def _key(self, state: str) -> str:
+        return f"{self.prefix}:oauth-state:{state}"
+
+    async def async_issue(self, *args, **kwargs) -> str:
+        state = str(uuid.uuid4())
+        await _client(self.redis_service).set(self._key(state), str(time.time()), ex=self.expiration_seconds)
+        return state
+
+    async def async_consume(self, state: str) -> bool:
+        """True once per issued state; GETDEL makes the check-and-delete atomic across replicas."""
+        try:
+            return await _client(self.redis_service).getdel(self._key(state)) is not None
+        except Exception as e:
+            logger.exception(f"Failed to consume OAuth state: {e}")
+            return False
@@ -0,0 +1,165 @@
+"""
+Dense vector index over knowledge base chunks.
+
+Vectors live in one contiguous float32 matrix and are searched with a single
+matrix-vector product plus `argpartition`, so top-k cost is a few
+milliseconds even for 100k+ chunks. The matrix can be persisted and reopened
+memory-mapped, keyed by chunk text hash so unchanged chunks are never
+re-embedded after a restart. Vectors added later go to a small in-memory
+segment searched alongside the matrix, so an update never copies the map.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.corpus_store import CURRENT_FILE, prune_versions, write_current
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+KEYS_FILE = "keys.npy"
+
+
+def text_key(text: str) -> bytes:
+    """Stable 16-byte key identifying a chunk's text."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class VectorIndex:
+    """
+    Maps chunk ids to rows of a float32 matrix of normalised vectors, followed by
+    a growable delta segment holding vectors added since it was built.
+    Removed rows are masked rather than moved, and reclaimed on compaction.
+    """
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._matrix: np.ndarray = np.zeros((0, dimension), dtype=np.float32)
+        # Capacity grows by doubling; only the first `_delta_rows` rows are in use
+        self._delta: np.ndarray = np.zeros((0, dimension), dtype=np.float32)
+        self._delta_rows = 0
+        self._ids: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+
+    @classmethod
+    def from_arrays(cls, chunk_ids: Sequence[int], matrix: np.ndarray) -> "VectorIndex":
+        """Wraps an existing (possibly memory-mapped) matrix without copying it."""
+        index = cls(matrix.shape[1])
+        index._matrix = matrix
+        index._ids = np.asarray(chunk_ids, dtype=np.int64).copy()
+        index._rows = {int(chunk_id): row for row, chunk_id in enumerate(index._ids)}
+        return index
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def is_memory_mapped(self) -> bool:
+        return isinstance(self._matrix, np.memmap)
+
+    def add(self, chunk_ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Appends vectors for new chunk ids."""
+        if len(chunk_ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(chunk_ids), self.dimension)
+        self.remove([c for c in chunk_ids if c in self._rows])
+        start = len(self._ids)
+        used = self._delta_rows + len(chunk_ids)
+        if used > len(self._delta):
+            grown = np.zeros((max(used, 2 * len(self._delta), 64), self.dimension), dtype=np.float32)
+            grown[:self._delta_rows] = self._delta[:self._delta_rows]
+            self._delta = grown
+        self._delta[self._delta_rows:used] = vectors
+        self._delta_rows = used
+        self._ids = np.concatenate([self._ids, np.asarray(chunk_ids, dtype=np.int64)])
+        for offset, chunk_id in enumerate(chunk_ids):
+            self._rows[int(chunk_id)] = start + offset
+
+    def remove(self, chunk_ids: Sequence[int]) -> None:
+        """Masks the rows of the given chunk ids; compacts once half the rows are dead."""
+        for chunk_id in chunk_ids:
+            row = self._rows.pop(int(chunk_id), None)
+            if row is not None:
+                self._ids[row] = -1
+        if len(self._ids) and len(self._rows) * 2 < len(self._ids):
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the live rows of the matrix and the delta segment into one in-memory matrix."""
+        live = self._ids >= 0
+        base = len(self._matrix)
+        self._matrix = np.concatenate([self._matrix[live[:base]], self._delta[:self._delta_rows][live[base:]]])
+        self._delta = np.zeros((0, self.dimension), dtype=np.float32)
+        self._delta_rows = 0
+        self._ids = self._ids[live]
+        self._rows = {int(chunk_id): row for row, chunk_id in enumerate(self._ids)}
+
+    def search(self, query: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
+        """Returns up to `k` (chunk_id, cosine similarity) pairs, best first."""
+        live = len(self._rows)
+        if live == 0 or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        scores = self._matrix @ query
+        if self._delta_rows:
+            scores = np.concatenate([scores, self._delta[:self._delta_rows] @ query])
+        scores[self._ids < 0] = -np.inf
+        k = min(k, live)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._ids[row]), float(scores[row])) for row in top]
+
+
+def save_vectors(directory: str, keys: Sequence[bytes], matrix: np.ndarray, keep: int = 2) -> str:
+    """
+    Writes the vector matrix and its text keys as a new version under `directory`
+    (named after their digest, like a corpus store version) and switches CURRENT
+    to it in one step, so a reader never pairs keys with another build's vectors.
+    Returns the version's directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    key_array = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 16)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    digest = hashlib.blake2b(key_array.tobytes(), digest_size=16)
+    digest.update(memoryview(matrix).cast("B"))
+    version = digest.hexdigest()
+    path = os.path.join(directory, version)
+    tmp_dir = tempfile.mkdtemp(dir=directory, prefix=".tmp-")
+    try:
+        np.save(os.path.join(tmp_dir, KEYS_FILE), key_array)
+        np.save(os.path.join(tmp_dir, VECTORS_FILE), matrix)
+        try:
+            os.rename(tmp_dir, path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # Same vectors, written by another worker
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    write_current(directory, version)
+    prune_versions(directory, keep, version)
+    return path
+
+
+def load_vectors(directory: str) -> Optional[Tuple[List[bytes], np.ndarray]]:
+    """
+    Opens the CURRENT persisted vectors read-only and memory-mapped;
+    returns None if absent or unreadable.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), "r", encoding="utf-8") as f:
+            path = os.path.join(directory, f.read().strip())
+        keys = np.load(os.path.join(path, KEYS_FILE))
+        matrix = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if len(keys) != len(matrix):
+        logger.warning(f"Ignoring inconsistent vector files in {path}")
+        return None
+    return [key.tobytes() for key in keys], matrix
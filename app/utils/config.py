@@ -13,6 +13,17 @@ SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
 SLACK_CLIENT_ID = os.getenv("SLACK_CLIENT_ID") # Added for OAuth
 SLACK_CLIENT_SECRET = os.getenv("SLACK_CLIENT_SECRET") # Added for OAuth
 SLACK_STATE_SECRET = os.getenv("SLACK_STATE_SECRET", "my-default-state-secret") # Added for OAuth state verification
+# Slack Web API base URL; the load test points it at a local stand-in
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
+# Where OAuth installations and state live: "file" (SLACK_*_DIR) or "redis" (shared by all replicas)
+SLACK_STORE_BACKEND = os.getenv("SLACK_STORE_BACKEND", "file").lower()
+SLACK_INSTALLATION_DIR = os.getenv("SLACK_INSTALLATION_DIR", "/app/data/installation")
+SLACK_STATE_DIR = os.getenv("SLACK_STATE_DIR", "/app/data/state")
+# Seconds a Redis-backed installation lookup is cached in process
+SLACK_INSTALLATION_CACHE_TTL = float(os.getenv("SLACK_INSTALLATION_CACHE_TTL", 30))
+# Reuse auth.test results per bot token instead of calling Slack on every request.
+# Bolt never expires these entries, so revoked or rotated tokens keep authorizing until a restart.
+SLACK_AUTHORIZE_CACHE = os.getenv("SLACK_AUTHORIZE_CACHE", "false").lower() in ("1", "true", "yes")
 
 # --- OpenAI Configuration ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -22,8 +33,85 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 
+# --- Answer Cache Configuration ---
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 86400))
+# In-process cache tier in front of Redis, invalidated across replicas via pub/sub
+LOCAL_CACHE_ENABLED = os.getenv("LOCAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LOCAL_CACHE_MAX_MB = int(os.getenv("LOCAL_CACHE_MAX_MB", 64))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", 10000))
+# Serve cached answers for near-duplicate questions (MinHash similarity >= threshold); opt-in,
+# since a question differing in one word ("enable" vs "disable") can match another's answer
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.85))
+# Coalesce concurrent identical questions; across replicas a Redis lease elects one caller
+SINGLE_FLIGHT_DISTRIBUTED = os.getenv("SINGLE_FLIGHT_DISTRIBUTED", "true").lower() in ("1", "true", "yes")
+# 0 derives the lease from OPENAI_QUEUE_TIMEOUT, OPENAI_TIMEOUT and OPENAI_MAX_ATTEMPTS, and the wait from the lease
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv("SINGLE_FLIGHT_LEASE_SECONDS", 0))
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", 0))
+# Stream answers into a placeholder message that is edited in place
+OPENAI_STREAMING = os.getenv("OPENAI_STREAMING", "true").lower() in ("1", "true", "yes")
+OPENAI_STREAM_UPDATE_INTERVAL = float(os.getenv("OPENAI_STREAM_UPDATE_INTERVAL", 1.5))
+# Default model and generation settings for answers
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", 500))
+OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", 0.7))
+# JSON list of routing rules choosing a model per question; empty sends everything to OPENAI_MODEL
+OPENAI_ROUTING_POLICY = os.getenv("OPENAI_ROUTING_POLICY", "")
+# OpenAI admission control: concurrent calls and per-minute budgets (0 = unlimited)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", 0))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", 0))
+OPENAI_QUEUE_TIMEOUT = float(os.getenv("OPENAI_QUEUE_TIMEOUT", 10))
+OPENAI_MAX_QUEUE = int(os.getenv("OPENAI_MAX_QUEUE", 100))
+# OpenAI resilience: per-attempt timeout, retries, hedging (0 = off) and circuit breaker
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 20))
+OPENAI_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", 3))
+OPENAI_HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", 0))
+OPENAI_CIRCUIT_FAILURES = int(os.getenv("OPENAI_CIRCUIT_FAILURES", 5))
+OPENAI_CIRCUIT_RESET = float(os.getenv("OPENAI_CIRCUIT_RESET", 30))
+# Answers are also kept this long as a fallback while OpenAI is unavailable
+ANSWER_STALE_TTL = int(os.getenv("ANSWER_STALE_TTL", 7 * 86400))
+# Slack accepts at most 5 messages per slash command response_url
+SLACK_RESPONSE_MAX_MESSAGES = int(os.getenv("SLACK_RESPONSE_MAX_MESSAGES", 5))
+
+# --- Ask Queue ---
+# "inline" answers in the web process; "queue" only acks and enqueues, `python -m app.worker` answers
+ASK_MODE = os.getenv("ASK_MODE", "inline").lower()
+ASK_STREAM = os.getenv("ASK_STREAM", "ask:jobs")
+ASK_CONSUMER_GROUP = os.getenv("ASK_CONSUMER_GROUP", "ask-workers")
+ASK_STREAM_MAXLEN = int(os.getenv("ASK_STREAM_MAXLEN", 100000))
+# Questions each worker process answers concurrently
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 8))
+# Jobs unacknowledged this long (a worker died) are claimed by another worker;
+# keep it above the slowest answer (OPENAI_TIMEOUT x OPENAI_MAX_ATTEMPTS plus retrieval)
+WORKER_CLAIM_IDLE = float(os.getenv("WORKER_CLAIM_IDLE", 120))
+# Deliveries before a job is moved to the dead-letter stream
+WORKER_MAX_DELIVERIES = int(os.getenv("WORKER_MAX_DELIVERIES", 3))
+# Prometheus port of a worker process (0 = off)
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 0))
+
+# --- Metrics ---
+# Prometheus metrics route served next to the Slack endpoints
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+# Readiness probe: 503 until the services are warm (knowledge base loaded), then 200
+READINESS_PATH = os.getenv("READINESS_PATH", "/readyz")
+
 # --- Data Configuration ---
 PDF_DATA_DIR = os.getenv("PDF_DATA_DIR", "/app/data/pdfs") # Default to a path within the container
+# Durable extraction cache; put it on a shared volume so replicas reuse each other's work.
+# Set to an empty string to disable.
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "/app/data/cache/extraction")
+# Worker processes for bulk PDF extraction in each web process
+# (0 = the CPU cores split across WEB_CONCURRENCY processes, at most 4; 1 = extract in-process)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 0))
+# uvicorn worker processes; uvicorn reads the same variable as the default for --workers
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+# Large PDFs are split into page ranges of this size and extracted in parallel
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", 32))
+# Watch PDF_DATA_DIR and re-index only the documents that change
+PDF_WATCH_ENABLED = os.getenv("PDF_WATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PDF_WATCH_POLL_INTERVAL = float(os.getenv("PDF_WATCH_POLL_INTERVAL", 5))
 
 # --- Application Configuration ---
 APP_ENV = os.getenv("APP_ENV", "development") # e.g., development, production
@@ -31,6 +119,25 @@ PORT = int(os.getenv("PORT", 3000))
 
 # --- Knowledge Base / OpenAI Context Configuration ---
 MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", 7000))
+# Number of top-ranked chunks considered for the context on each question
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 50))
+# Documents are indexed in chunks of about this many tokens, respecting sentence and heading boundaries
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 300))
+# Tokens of trailing sentences repeated at the start of the next chunk of the same section
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50))
+# Drop lines repeated on most pages of a PDF (running headers, footers, disclaimers) before chunking
+BOILERPLATE_FILTER = os.getenv("BOILERPLATE_FILTER", "true").lower() in ("1", "true", "yes")
+# Retrieved chunks at least this similar (word-shingle Jaccard) to a better-ranked one are dropped; 0 disables
+DUPLICATE_SIMILARITY = float(os.getenv("DUPLICATE_SIMILARITY", 0.8))
+# Retrieval mode: "bm25" (keyword), "dense" (embeddings) or "hybrid" (both, rank-fused)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "bm25").lower()
+# Embedding provider for dense/hybrid retrieval: "hashing" (local, deterministic) or "openai"
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "hashing").lower()
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 0)) or None  # None = provider default
+# Memory-mapped store of indexed chunk text shared by all workers; empty keeps chunks in each worker's memory
+CORPUS_DIR = os.getenv("CORPUS_DIR", "/app/data/cache/corpus")
+# Where chunk embeddings are persisted and memory-mapped from; empty keeps them in memory only
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "/app/data/cache/vectors")
 
 # Simple validation to ensure critical variables are set
 required_vars = [
@@ -43,10 +150,17 @@ required_vars = [
     # Add other mandatory variables here if needed
 ]
 
-missing_vars = [var for var in required_vars if not globals().get(var)]
 
-if missing_vars:
-    raise ValueError(f"Missing critical environment variables: {', '.join(missing_vars)}")
+def validate():
+    """
+    Raises ValueError if a critical variable is missing. Called by the web app and
+    the worker; tools that only need the knowledge base settings (python -m app.kb)
+    can import this module without the Slack and OpenAI secrets.
+    """
+    missing_vars = [var for var in required_vars if not globals().get(var)]
+    if missing_vars:
+        raise ValueError(f"Missing critical environment variables: {', '.join(missing_vars)}")
+
 
 print(f"Configuration loaded for environment: {APP_ENV}")
 # Optionally, print non-sensitive config for debugging (be careful!)
@@ -0,0 +1,167 @@
+"""
+Prometheus metrics for the /ask pipeline and the `/metrics` ASGI endpoint.
+
+Useful queries:
+    histogram_quantile(0.95, sum by (le, stage) (rate(slackgpt_ask_stage_seconds_bucket[5m])))
+    sum(rate(slackgpt_answer_cache_lookups_total{result="hit"}[5m]))
+        / sum(rate(slackgpt_answer_cache_lookups_total[5m]))
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so every
+worker's samples are aggregated into one scrape.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import REGISTRY
+
+# Latency buckets from 5 ms (cache hits) to 60 s (slow completions)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+_TOKEN_BUCKETS = (0, 50, 100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+
+ASK_STAGE_SECONDS = Histogram(
+    "slackgpt_ask_stage_seconds",
+    "Time spent in each /ask stage.",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+ASK_REQUESTS = Counter(
+    "slackgpt_ask_requests_total",
+    "/ask requests by how they were answered.",
+    ["outcome"],
+)
+ASK_IN_FLIGHT = Gauge(
+    "slackgpt_ask_in_flight",
+    "/ask requests currently being processed.",
+    multiprocess_mode="livesum",
+)
+ANSWER_CACHE_LOOKUPS = Counter(
+    "slackgpt_answer_cache_lookups_total",
+    "Answer cache lookups by tier and result.",
+    ["tier", "result"],
+)
+RETRIEVED_TOKENS = Histogram(
+    "slackgpt_retrieved_context_tokens",
+    "Tokens of knowledge base context packed into each prompt.",
+    buckets=_TOKEN_BUCKETS,
+)
+RETRIEVED_CHUNKS = Histogram(
+    "slackgpt_retrieved_context_chunks",
+    "Chunks packed into each prompt.",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64),
+)
+PROMPT_TOKENS = Histogram(
+    "slackgpt_openai_prompt_tokens",
+    "Prompt tokens per OpenAI request, as reported by the API.",
+    buckets=_TOKEN_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    "slackgpt_openai_tokens_total",
+    "OpenAI usage tokens, as reported by the API.",
+    ["kind"],
+)
+OPENAI_REQUEST_SECONDS = Histogram(
+    "slackgpt_openai_request_seconds",
+    "Duration of OpenAI requests by model and routing rule.",
+    ["model", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+OPENAI_MODEL_TOKENS = Counter(
+    "slackgpt_openai_model_tokens_total",
+    "OpenAI usage tokens by model, as reported by the API.",
+    ["model", "kind"],
+)
+OPENAI_FIRST_TOKEN_SECONDS = Histogram(
+    "slackgpt_openai_first_token_seconds",
+    "Time from starting a streamed OpenAI request to its first token.",
+    buckets=_LATENCY_BUCKETS,
+)
+OPENAI_IN_FLIGHT = Gauge(
+    "slackgpt_openai_in_flight",
+    "OpenAI requests admitted and not yet finished.",
+    multiprocess_mode="livesum",
+)
+OPENAI_QUEUE_DEPTH = Gauge(
+    "slackgpt_openai_queue_depth",
+    "OpenAI requests waiting for admission.",
+    multiprocess_mode="livesum",
+)
+OPENAI_QUEUE_WAIT_SECONDS = Histogram(
+    "slackgpt_openai_queue_wait_seconds",
+    "Time admitted OpenAI requests spent queued.",
+    buckets=_LATENCY_BUCKETS,
+)
+OPENAI_REJECTIONS = Counter(
+    "slackgpt_openai_rejections_total",
+    "OpenAI requests rejected by admission control.",
+    ["reason"],
+)
+ASK_QUEUE_WAIT_SECONDS = Histogram(
+    "slackgpt_ask_queue_wait_seconds",
+    "Time /ask jobs spent in the queue before a worker picked them up.",
+    buckets=_LATENCY_BUCKETS,
+)
+ASK_JOBS = Counter(
+    "slackgpt_ask_jobs_total",
+    "Queued /ask jobs processed by workers, by result.",
+    ["result"],
+)
+WORKER_IN_FLIGHT = Gauge(
+    "slackgpt_worker_jobs_in_flight",
+    "/ask jobs a worker is currently answering.",
+    multiprocess_mode="livesum",
+)
+
+
+def stage_timer(stage: str):
+    """Context manager timing one /ask stage."""
+    return ASK_STAGE_SECONDS.labels(stage=stage).time()
+
+
+def record_openai_usage(usage, model: str = None) -> None:
+    """Records the token usage block of a completion (no-op when absent), per model if given."""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if isinstance(prompt_tokens, int):
+        PROMPT_TOKENS.observe(prompt_tokens)
+        OPENAI_TOKENS.labels(kind="prompt").inc(prompt_tokens)
+        if model:
+            OPENAI_MODEL_TOKENS.labels(model=model, kind="prompt").inc(prompt_tokens)
+    if isinstance(completion_tokens, int):
+        OPENAI_TOKENS.labels(kind="completion").inc(completion_tokens)
+        if model:
+            OPENAI_MODEL_TOKENS.labels(model=model, kind="completion").inc(completion_tokens)
+
+
+def render_metrics() -> bytes:
+    """Serialises all metrics in the Prometheus text format."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+async def metrics_app(scope, receive, send):
+    """Minimal ASGI app serving `render_metrics()`."""
+    if scope.get("method", "GET") not in ("GET", "HEAD"):
+        await send({"type": "http.response.start", "status": 405, "headers": [(b"allow", b"GET, HEAD")]})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    body = render_metrics()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", CONTENT_TYPE_LATEST.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body if scope.get("method") != "HEAD" else b""})
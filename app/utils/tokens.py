@@ -0,0 +1,35 @@
+"""
+Process-wide tokenizer helpers.
+
+The tiktoken encoding is loaded once per process and shared; counting many
+texts goes through `encode_batch` so the BPE work runs in tiktoken's thread pool.
+"""
+
+import functools
+from typing import List, Sequence
+
+import tiktoken
+
+TOKENIZER_MODEL = "gpt-4o"
+FALLBACK_ENCODING = "cl100k_base"
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    """Returns the shared tiktoken encoding used for all token counting."""
+    try:
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    """Returns the number of tokens in a single text."""
+    return len(get_encoding().encode(text))
+
+
+def count_tokens_batch(texts: Sequence[str]) -> List[int]:
+    """Returns the token count of each text, encoding them as one batch."""
+    if not texts:
+        return []
+    return [len(tokens) for tokens in get_encoding().encode_batch(list(texts))]
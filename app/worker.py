@@ -0,0 +1,194 @@
+"""
+/ask worker: answers questions queued by the web tier (ASK_MODE=queue).
+
+    python -m app.worker
+
+Run as many processes as needed; they share the Redis consumer group, so
+each job goes to one of them. A job is acknowledged only after its answer
+was posted to the response_url. Jobs left pending by a worker that died
+are claimed by another one after WORKER_CLAIM_IDLE seconds, and moved to
+the dead-letter stream after WORKER_MAX_DELIVERIES attempts.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Optional, Set
+
+from slack_bolt.context.respond.async_respond import AsyncRespond
+
+from app.handlers.ask_command import generic_error_blocks, handle_ask_command
+from app.services.ask_queue import AskJob, AskQueue
+from app.services.container import ServiceContainer, get_services
+from app.utils import config
+from app.utils.logging_config import setup_logging
+from app.utils.metrics import ASK_JOBS, ASK_QUEUE_WAIT_SECONDS, WORKER_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+# Slack accepts posts to a slash command's response_url for 30 minutes
+RESPONSE_URL_TTL = 30 * 60
+# Backoff between failed stream reads (e.g. while Redis is down), doubling up to the maximum
+READ_RETRY_MIN = 1.0
+READ_RETRY_MAX = 30.0
+
+
+async def _no_ack(*args, **kwargs):
+    """The web tier already acknowledged the command."""
+
+
+class AskWorker:
+    """
+    Reads /ask jobs from the consumer group and answers up to `concurrency`
+    of them at a time.
+    """
+    def __init__(self, services: ServiceContainer, queue: AskQueue, consumer: Optional[str] = None,
+                 concurrency: int = 8, claim_idle: float = 120.0, max_deliveries: int = 3,
+                 block_ms: int = 5000, respond_factory=None):
+        self.services = services
+        self.queue = queue
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency
+        self.claim_idle = claim_idle
+        self.max_deliveries = max_deliveries
+        self.block_ms = block_ms
+        self.respond_factory = respond_factory or (lambda url: AsyncRespond(response_url=url))
+        self._active: Set[asyncio.Task] = set()
+        self._active_ids: Set[str] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        """Stops taking new jobs; jobs in progress are finished."""
+        if not self._stopping.is_set():
+            logger.info(f"Worker {self.consumer} stopping after {len(self._active)} in-flight jobs.")
+        self._stopping.set()
+
+    def _start(self, entry_id: str, job: Optional[AskJob], deliveries: int = 1):
+        task = asyncio.create_task(self._process(entry_id, job, deliveries))
+        self._active.add(task)
+        self._active_ids.add(entry_id)
+
+        def done(_):
+            self._active.discard(task)
+            self._active_ids.discard(entry_id)
+        task.add_done_callback(done)
+
+    async def _process(self, entry_id: str, job: Optional[AskJob], deliveries: int):
+        if job is None:
+            await self.queue.dead_letter(entry_id, None, "malformed")
+            ASK_JOBS.labels(result="dead").inc()
+            return
+        age = time.time() - job.enqueued_at
+        if age > RESPONSE_URL_TTL:
+            # Nobody can receive the answer any more
+            await self.queue.dead_letter(entry_id, job, f"expired after {age:.0f}s")
+            ASK_JOBS.labels(result="expired").inc()
+            return
+        respond = self.respond_factory(job.response_url)
+        if deliveries > self.max_deliveries:
+            try:
+                await respond(blocks=generic_error_blocks)
+            except Exception as e:
+                logger.warning(f"Could not notify user about failed job {entry_id}: {e}")
+            await self.queue.dead_letter(entry_id, job, f"failed {deliveries - 1} deliveries")
+            ASK_JOBS.labels(result="dead").inc()
+            return
+
+        if deliveries == 1:
+            ASK_QUEUE_WAIT_SECONDS.observe(max(0.0, age))
+        WORKER_IN_FLIGHT.inc()
+        try:
+            await handle_ask_command(_no_ack, job.to_command(), respond, self.services, allow_queue=False)
+        except Exception as e:
+            # Left pending: another delivery is attempted once the claim timeout passes
+            logger.exception(f"/ask job {entry_id} failed (delivery {deliveries}): {e}")
+            ASK_JOBS.labels(result="failed").inc()
+            return
+        finally:
+            WORKER_IN_FLIGHT.dec()
+        await self.queue.ack(entry_id)
+        ASK_JOBS.labels(result="answered" if deliveries == 1 else "redelivered").inc()
+
+    async def _reclaim_loop(self):
+        """Periodically takes over jobs abandoned by dead workers."""
+        interval = max(1.0, self.claim_idle / 2)
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._active)
+            if free > 0:
+                for entry_id, job, deliveries in await self.queue.claim_idle(self.consumer, self.claim_idle, free):
+                    if entry_id in self._active_ids:
+                        continue  # Our own slow job: it is still being answered
+                    logger.info(f"Claimed idle /ask job {entry_id} (delivery {deliveries})")
+                    self._start(entry_id, job, deliveries)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        """Processes jobs until `stop()` is called, then drains in-flight jobs."""
+        while not await self.queue.ensure_group():
+            logger.error("Could not create the /ask consumer group, retrying in 5s.")
+            if await self._sleep_unless_stopping(5):
+                return
+        logger.info(f"Worker {self.consumer} consuming '{self.queue.stream}' with concurrency {self.concurrency}.")
+        reclaimer = asyncio.create_task(self._reclaim_loop())
+        backoff = READ_RETRY_MIN
+        try:
+            while not self._stopping.is_set():
+                free = self.concurrency - len(self._active)
+                if free <= 0:
+                    await asyncio.wait(self._active, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                entries = await self.queue.read(self.consumer, free, self.block_ms)
+                if entries is None:
+                    logger.warning(f"Could not read '{self.queue.stream}', retrying in {backoff:g}s.")
+                    if await self._sleep_unless_stopping(backoff):
+                        break
+                    backoff = min(backoff * 2, READ_RETRY_MAX)
+                    continue
+                backoff = READ_RETRY_MIN
+                for entry_id, job in entries:
+                    self._start(entry_id, job)
+        finally:
+            reclaimer.cancel()
+            if self._active:
+                await asyncio.gather(*self._active, return_exceptions=True)
+
+    async def _sleep_unless_stopping(self, seconds: float) -> bool:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+async def main():
+    setup_logging()
+    config.validate()
+    if config.WORKER_METRICS_PORT:
+        from prometheus_client import start_http_server
+        start_http_server(config.WORKER_METRICS_PORT)
+    services = get_services()
+    await services.startup()
+    worker = AskWorker(
+        services,
+        services.ask_queue,
+        concurrency=config.WORKER_CONCURRENCY,
+        claim_idle=config.WORKER_CLAIM_IDLE,
+        max_deliveries=config.WORKER_MAX_DELIVERIES,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await services.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+"""
+Reproducible synthetic PDF corpora for benchmarks.
+
+Every corpus is fully determined by (pages, seed): the same arguments always
+produce the same text, so timings from different runs and machines are
+comparable. Each document also contains a few "facts" with unique codenames;
+the generated queries ask about them, which lets the benchmark report
+retrieval hit rates alongside latency.
+"""
+
+import json
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from typing import List
+
+import fitz  # PyMuPDF
+
+PAGES_PER_DOCUMENT = 20
+FACTS_PER_DOCUMENT = 3
+MANIFEST = "manifest.json"
+
+_TOPICS = [
+    "onboarding", "security", "expenses", "travel", "benefits", "payroll", "hardware", "vacation",
+    "compliance", "networking", "deployment", "incident", "backup", "procurement", "training", "privacy",
+]
+_WORDS = (
+    "policy process team request approval manager system access account review document update "
+    "support service customer project budget schedule report meeting office remote device network "
+    "server database release change ticket incident escalation owner contact deadline quarter annual "
+    "employee contractor vendor invoice payment receipt travel booking hotel flight allowance limit "
+    "password token badge laptop monitor license software install backup restore retention audit"
+).split()
+_CODENAME_PARTS = (
+    "amber basalt cedar delta ember falcon garnet harbor indigo juniper kestrel lagoon marble nectar "
+    "onyx prairie quartz raven sierra tundra umber velvet willow xenon yarrow zephyr"
+).split()
+
+
+@dataclass
+class Fact:
+    doc_id: str
+    codename: str
+    question: str
+    answer: str
+
+
+@dataclass
+class CorpusManifest:
+    pages: int
+    seed: int
+    documents: List[str] = field(default_factory=list)
+    facts: List[Fact] = field(default_factory=list)
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(8, 16))
+    words.insert(rng.randrange(len(words)), topic)
+    return " ".join(words).capitalize() + "."
+
+
+def _page_text(rng: random.Random, topic: str, heading: str, facts: List[str]) -> str:
+    paragraphs = [heading]
+    for _ in range(rng.randint(4, 7)):
+        paragraphs.append(" ".join(_sentence(rng, topic) for _ in range(rng.randint(3, 6))))
+    for fact in facts:
+        paragraphs.insert(rng.randint(1, len(paragraphs)), fact)
+    return "\n\n".join(paragraphs)
+
+
+def _write_pdf(path: str, pages: List[str]):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(54, 54, 558, 738), text, fontsize=9)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def generate_corpus(directory: str, pages: int, seed: int = 1) -> CorpusManifest:
+    """
+    Writes `pages` pages of synthetic PDFs into `directory` (split into
+    documents of PAGES_PER_DOCUMENT pages) and returns the manifest.
+    Reuses an existing corpus with the same parameters.
+    """
+    manifest_path = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["pages"] == pages and data["seed"] == seed:
+            return CorpusManifest(pages, seed, data["documents"], [Fact(**fact) for fact in data["facts"]])
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = CorpusManifest(pages=pages, seed=seed)
+    used_codenames = set()
+    remaining = pages
+    doc_number = 0
+    while remaining > 0:
+        page_count = min(PAGES_PER_DOCUMENT, remaining)
+        topic = _TOPICS[doc_number % len(_TOPICS)]
+        doc_id = os.path.join(directory, f"{topic}-{doc_number:05d}.pdf")
+
+        fact_pages = {}
+        for _ in range(min(FACTS_PER_DOCUMENT, page_count)):
+            while True:
+                codename = f"{rng.choice(_CODENAME_PARTS)}-{rng.choice(_CODENAME_PARTS)}-{rng.randint(100, 999)}"
+                if codename not in used_codenames:
+                    used_codenames.add(codename)
+                    break
+            amount = rng.randint(1000, 99000)
+            text = f"The {codename} {topic} budget is {amount} dollars per quarter."
+            fact_pages.setdefault(rng.randrange(page_count), []).append(text)
+            manifest.facts.append(Fact(
+                doc_id=doc_id,
+                codename=codename,
+                question=f"What is the {codename} {topic} budget?",
+                answer=str(amount),
+            ))
+
+        page_texts = [
+            _page_text(rng, topic, f"{topic.title()} handbook, section {number + 1}", fact_pages.get(number, []))
+            for number in range(page_count)
+        ]
+        _write_pdf(doc_id, page_texts)
+        manifest.documents.append(doc_id)
+        remaining -= page_count
+        doc_number += 1
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(asdict(manifest), f)
+    return manifest
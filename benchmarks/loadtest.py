@@ -0,0 +1,296 @@
+"""
+End-to-end load test of `app.main:api` under uvicorn.
+
+    python -m benchmarks.loadtest --workers 1,2,4 --rates 5,10,20,40 --duration 30 \
+        --output benchmarks/results/load.json
+
+For every worker count the app is started in a subprocess, pointed at local
+stand-ins for OpenAI and Slack (see benchmarks/standins.py), and fed signed
+`/ask` slash commands at each offered rate (open loop, Poisson arrivals).
+Reported per step: ack latency and time-to-answer percentiles, errors and
+achieved throughput. The highest rate that met the service objectives
+(p95 ack under --ack-slo, answers within --answer-timeout, under 1% errors)
+is the max sustainable rate for that worker count.
+
+Redis must be reachable with the usual REDIS_* settings; the knowledge base
+is whatever PDF_DATA_DIR points at (e.g. a corpus from benchmarks/corpus.py).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+import uvicorn
+from slack_sdk.oauth.installation_store import Installation
+from slack_sdk.oauth.installation_store.file import FileInstallationStore
+from slack_sdk.signature import SignatureVerifier
+
+from benchmarks.run import git_revision, summarize
+from benchmarks.standins import FakeOpenAI, FakeSlack
+
+SIGNING_SECRET = "loadtest-signing-secret"
+ACK_LIMIT_SECONDS = 3.0  # Slack drops slash commands not acknowledged within 3 s
+
+
+def signed_command(text: str, response_url: str, team_id: str, now: Optional[int] = None,
+                   signing_secret: str = SIGNING_SECRET) -> Tuple[bytes, Dict[str, str]]:
+    """Builds a slash command form body and the Slack signature headers for it."""
+    body = urlencode({
+        "token": "loadtest",
+        "team_id": team_id,
+        "team_domain": "loadtest",
+        "channel_id": "C0LOADTEST",
+        "user_id": f"U{random.randrange(10 ** 6):06d}",
+        "user_name": "loadtest",
+        "command": "/ask",
+        "text": text,
+        "api_app_id": "A0LOADTEST",
+        "response_url": response_url,
+        "trigger_id": uuid.uuid4().hex,
+    })
+    timestamp = str(now or int(time.time()))
+    signature = SignatureVerifier(signing_secret).generate_signature(timestamp=timestamp, body=body)
+    return body.encode(), {
+        "content-type": "application/x-www-form-urlencoded",
+        "x-slack-request-timestamp": timestamp,
+        "x-slack-signature": signature,
+    }
+
+
+def seed_installation(base_dir: str, team_id: str):
+    """Stores a bot installation so Bolt's OAuth authorization accepts the fake team."""
+    FileInstallationStore(base_dir=base_dir).save(Installation(
+        app_id="A0LOADTEST",
+        team_id=team_id,
+        bot_token="xoxb-loadtest",
+        bot_id="B0LOADBOT",
+        bot_user_id="U0LOADBOT",
+        bot_scopes=["commands", "chat:write"],
+        user_id="U0INSTALLER",
+    ))
+
+
+def meets_slo(step: Dict, ack_slo_ms: float) -> bool:
+    return (
+        step["ack"].get("p95_ms", float("inf")) <= ack_slo_ms
+        and step["unanswered"] == 0
+        and step["errors"] <= 0.01 * step["sent"]
+    )
+
+
+def max_sustainable_rps(steps: List[Dict], ack_slo_ms: float) -> float:
+    """Highest offered rate whose step met the SLOs, stopping at the first failure."""
+    best = 0.0
+    for step in sorted(steps, key=lambda s: s["offered_rps"]):
+        if not meets_slo(step, ack_slo_ms):
+            break
+        best = step["offered_rps"]
+    return best
+
+
+async def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server
+
+
+def start_app(port: int, workers: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:api", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    """Polls the readiness probe until the app has loaded the knowledge base."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"App exited with status {process.returncode}")
+            try:
+                if (await client.get(url, timeout=1.0)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise TimeoutError(f"App was not ready within {timeout:.0f}s")
+
+
+async def run_step(client: httpx.AsyncClient, app_url: str, slack: FakeSlack, slack_url: str,
+                   questions: List[str], rate: float, duration: float, answer_timeout: float,
+                   rng: random.Random) -> Dict:
+    acks, answers = [], []
+    errors = unanswered = 0
+
+    async def one(question: str):
+        nonlocal errors, unanswered
+        request_id = uuid.uuid4().hex
+        body, headers = signed_command(question, f"{slack_url}/respond/{request_id}", slack.team_id)
+        started = time.perf_counter()
+        try:
+            response = await client.post(app_url, content=body, headers=headers)
+        except httpx.HTTPError:
+            errors += 1
+            return
+        acks.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+            return
+        try:
+            await asyncio.wait_for(slack.answered(request_id).wait(), timeout=answer_timeout)
+            answers.append(slack.answer_time(request_id) - started)
+        except asyncio.TimeoutError:
+            unanswered += 1
+
+    tasks = []
+    started = time.perf_counter()
+    next_at = started
+    while next_at < started + duration:
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        tasks.append(asyncio.create_task(one(rng.choice(questions))))
+        next_at += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return {
+        "offered_rps": rate,
+        "achieved_rps": len(answers) / duration,
+        "sent": len(tasks),
+        "errors": errors,
+        "unanswered": unanswered,
+        "ack_over_3s": sum(1 for a in acks if a > ACK_LIMIT_SECONDS),
+        "ack": summarize(acks) if acks else {},
+        "time_to_answer": summarize(answers) if answers else {},
+    }
+
+
+async def run_worker_count(workers: int, args, openai: FakeOpenAI, slack: FakeSlack, questions: List[str]) -> Dict:
+    openai_url = f"http://127.0.0.1:{args.openai_port}/v1"
+    slack_url = f"http://127.0.0.1:{args.slack_port}"
+    with tempfile.TemporaryDirectory() as data_dir:
+        installation_dir = os.path.join(data_dir, "installation")
+        seed_installation(installation_dir, slack.team_id)
+        process = start_app(args.app_port, workers, {
+            "SLACK_SIGNING_SECRET": SIGNING_SECRET,
+            "SLACK_API_URL": f"{slack_url}/api/",
+            "SLACK_INSTALLATION_DIR": installation_dir,
+            "SLACK_STATE_DIR": os.path.join(data_dir, "state"),
+            "OPENAI_BASE_URL": openai_url,
+            "OPENAI_API_KEY": "sk-loadtest",
+        })
+        try:
+            app_url = f"http://127.0.0.1:{args.app_port}/slack/events"
+            await wait_until_ready(f"http://127.0.0.1:{args.app_port}/readyz", process)
+            rng = random.Random(args.seed)
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+            steps = []
+            async with httpx.AsyncClient(timeout=args.answer_timeout, limits=limits) as client:
+                for rate in args.rates:
+                    print(f"[{workers} workers] {rate} req/s for {args.duration:.0f}s", file=sys.stderr)
+                    step = await run_step(client, app_url, slack, slack_url, questions, rate,
+                                          args.duration, args.answer_timeout, rng)
+                    steps.append(step)
+                    if not meets_slo(step, args.ack_slo) and not args.keep_going:
+                        break
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return {
+        "workers": workers,
+        "steps": steps,
+        "max_sustainable_rps": max_sustainable_rps(steps, args.ack_slo),
+    }
+
+
+async def main_async(args) -> Dict:
+    openai = FakeOpenAI(
+        latency=args.openai_latency,
+        tokens_per_second=args.openai_token_rate,
+        answer_tokens=args.openai_answer_tokens,
+        error_rate=args.openai_error_rate,
+        error_status=args.openai_error_status,
+        seed=args.seed,
+    )
+    slack = FakeSlack()
+    servers = [await serve(openai, args.openai_port), await serve(slack, args.slack_port)]
+    questions = [f"What is the policy for load test topic {i}?" for i in range(args.distinct_questions)]
+    try:
+        results = [await run_worker_count(w, args, openai, slack, questions) for w in args.workers]
+    finally:
+        for server in servers:
+            server.should_exit = True
+        await asyncio.sleep(0.2)
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "distinct_questions": args.distinct_questions,
+            "ack_slo_ms": args.ack_slo,
+            "openai": {
+                "latency": args.openai_latency,
+                "tokens_per_second": args.openai_token_rate,
+                "answer_tokens": args.openai_answer_tokens,
+                "error_rate": args.openai_error_rate,
+                "requests": openai.requests,
+                "errors": openai.errors,
+            },
+        },
+        "results": results,
+    }
+
+
+def _numbers(kind):
+    return lambda value: [kind(v) for v in value.split(",")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=_numbers(int), default=[1], help="comma-separated uvicorn worker counts")
+    parser.add_argument("--rates", type=_numbers(float), default=[2, 5, 10, 20], help="offered requests/second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per rate step")
+    parser.add_argument("--distinct-questions", type=int, default=1000,
+                        help="size of the question pool; smaller pools raise the cache hit rate")
+    parser.add_argument("--answer-timeout", type=float, default=60.0)
+    parser.add_argument("--ack-slo", type=float, default=1000.0, help="p95 ack latency objective in ms")
+    parser.add_argument("--keep-going", action="store_true", help="run every rate even after an SLO miss")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="seconds to first token")
+    parser.add_argument("--openai-token-rate", type=float, default=50.0, help="tokens/second (0 = instant)")
+    parser.add_argument("--openai-answer-tokens", type=int, default=120)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-error-status", type=int, default=500)
+    parser.add_argument("--app-port", type=int, default=3900)
+    parser.add_argument("--openai-port", type=int, default=3901)
+    parser.add_argument("--slack-port", type=int, default=3902)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(main_async(args))
+    for result in report["results"]:
+        print(f"{result['workers']} workers: max sustainable {result['max_sustainable_rps']:g} req/s", file=sys.stderr)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Benchmark suite for ingestion, retrieval and the /ask pipeline.
+
+    python -m benchmarks.run --pages 10,1000 --output benchmarks/results/latest.json
+    python -m benchmarks.run --pages 1000 --compare benchmarks/results/baseline.json
+
+Corpora are generated once per (pages, seed) under benchmarks/.corpus and
+reused. Redis and OpenAI are replaced by in-memory fakes, so results measure
+this service only. With --compare, any timing that got worse by more than
+--threshold (default 20%) is reported and the exit status is 1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# Benchmarks never reach Slack or OpenAI, but importing the app requires these
+for _name in ("SLACK_BOT_TOKEN", "SLACK_SIGNING_SECRET", "OPENAI_API_KEY", "SLACK_CLIENT_ID", "SLACK_CLIENT_SECRET"):
+    os.environ.setdefault(_name, "benchmark")
+
+from benchmarks.corpus import CorpusManifest, generate_corpus  # noqa: E402
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(__file__), ".corpus")
+
+# Metrics where a larger value is better; every other number is a cost
+HIGHER_IS_BETTER = ("per_second", "hit_rate")
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class FakeOpenAIService:
+    """Answers instantly (or after `latency` seconds) without any network."""
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def get_answer(self, question, context, request_id="", retrieval=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return f"Synthetic answer using {len(context)} characters of context."
+
+
+class MemoryRedisService:
+    """The key/value and set operations of RedisService that the /ask path uses, on plain dicts."""
+    def __init__(self):
+        self.values: Dict[str, tuple] = {}
+        self.sets: Dict[str, set] = {}
+
+    async def get_value(self, key):
+        value, expires = self.values.get(key, (None, 0.0))
+        return value if expires > time.monotonic() else None
+
+    async def set_value(self, key, value, ttl_seconds):
+        self.values[key] = (value, time.monotonic() + ttl_seconds)
+
+    async def get_values(self, keys):
+        return [await self.get_value(key) for key in keys]
+
+    async def add_to_sets(self, keys, member, ttl_seconds):
+        for key in keys:
+            self.sets.setdefault(key, set()).add(member)
+
+    async def get_set_members(self, keys):
+        return [set(self.sets.get(key, ())) for key in keys]
+
+
+async def bench_extraction(manifest: CorpusManifest, workers: int) -> Dict[str, float]:
+    from app.services.ingestion import ingest_pdfs
+
+    async def on_document(path, pages):
+        pass
+
+    stats = await ingest_pdfs(manifest.documents, on_document, max_workers=workers)
+    return {
+        "workers": workers,
+        "pages": stats.pages,
+        "seconds": stats.seconds,
+        "pages_per_second": stats.pages_per_second,
+    }
+
+
+async def bench_knowledge_base(corpus_dir: str, manifest: CorpusManifest, workers: int, rounds: int):
+    """Cold start (load + first query), warm query latency and fact hit rate."""
+    from app.services.knowledge_base import KnowledgeBaseService
+
+    queries = [fact.question for fact in manifest.facts]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        kb = KnowledgeBaseService(corpus_dir, cache_dir=cache_dir, ingest_workers=workers, retrieval_mode="bm25",
+                                  corpus_dir=os.path.join(cache_dir, "chunks"))
+        started = time.perf_counter()
+        await kb.find_relevant_context(queries[0])
+        cold = time.perf_counter() - started
+
+        # A second service reuses the on-disk extraction cache: a restart
+        restarted = KnowledgeBaseService(corpus_dir, cache_dir=cache_dir, ingest_workers=workers,
+                                         retrieval_mode="bm25", corpus_dir=os.path.join(cache_dir, "chunks"))
+        started = time.perf_counter()
+        await restarted.load()
+        restart = time.perf_counter() - started
+
+    samples, hits = [], 0
+    for _ in range(rounds):
+        for fact in manifest.facts:
+            started = time.perf_counter()
+            packed = await kb.retrieve(fact.question)
+            samples.append(time.perf_counter() - started)
+            hits += any(fact.answer in chunk.text for chunk in packed.chunks)
+    return kb, {
+        "cold_first_query_seconds": cold,
+        "restart_load_seconds": restart,
+        "chunks": kb.stats()["chunks"],
+        "warm_query": summarize(samples),
+        "fact_hit_rate": hits / len(samples),
+    }
+
+
+def bench_tokenization(texts: List[str]) -> Dict[str, float]:
+    from app.utils.tokens import count_tokens, count_tokens_batch
+
+    count_tokens("warm up the encoder")
+    started = time.perf_counter()
+    total = sum(count_tokens_batch(texts))
+    batch_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for text in texts:
+        count_tokens(text)
+    single_seconds = time.perf_counter() - started
+    return {
+        "texts": len(texts),
+        "tokens": total,
+        "batch_tokens_per_second": total / batch_seconds if batch_seconds else 0.0,
+        "single_tokens_per_second": total / single_seconds if single_seconds else 0.0,
+    }
+
+
+async def bench_packing(kb, manifest: CorpusManifest, rounds: int) -> Dict[str, float]:
+    from app.services.context_packer import pack_context
+    from app.utils.config import MAX_CONTEXT_TOKENS
+
+    candidate_sets = []
+    for fact in manifest.facts:
+        candidates, _ = await kb.rank_candidates(fact.question)
+        candidate_sets.append(candidates)
+    samples = []
+    for _ in range(rounds):
+        for candidates in candidate_sets:
+            started = time.perf_counter()
+            pack_context(candidates, MAX_CONTEXT_TOKENS)
+            samples.append(time.perf_counter() - started)
+    return {"candidates_per_call": statistics.fmean(len(c) for c in candidate_sets), **summarize(samples)}
+
+
+async def bench_handler(kb, manifest: CorpusManifest) -> Dict[str, Dict[str, float]]:
+    """End-to-end /ask latency with fake Redis, fake OpenAI and no-op Slack calls."""
+    from unittest.mock import patch
+
+    from app.handlers.ask_command import handle_ask_command
+    from app.services.container import ServiceContainer
+    from app.services.semantic_cache import SemanticAnswerCache
+    from app.services.single_flight import SingleFlight
+
+    redis_service = MemoryRedisService()
+    services = ServiceContainer(
+        redis_service=redis_service,
+        kb_service=kb,
+        openai_service=FakeOpenAIService(),
+        semantic_cache=SemanticAnswerCache(redis_service),
+        single_flight=SingleFlight(),
+    )
+
+    async def ack():
+        pass
+
+    async def respond(**kwargs):
+        pass
+
+    results = {}
+    with patch("app.handlers.ask_command.config.OPENAI_STREAMING", False):
+        for label in ("miss", "hit"):
+            samples = []
+            for fact in manifest.facts:
+                command = {"user_id": "UBENCH", "text": fact.question}
+                started = time.perf_counter()
+                await handle_ask_command(ack, command, respond, services)
+                samples.append(time.perf_counter() - started)
+            results[label] = summarize(samples)
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_suite(pages: int, seed: int, corpus_root: str, workers: int, rounds: int) -> Dict:
+    corpus_dir = os.path.join(corpus_root, f"pages-{pages}-seed-{seed}")
+    started = time.perf_counter()
+    manifest = await asyncio.to_thread(generate_corpus, corpus_dir, pages, seed)
+    print(f"[{pages} pages] corpus ready in {time.perf_counter() - started:.1f}s "
+          f"({len(manifest.documents)} documents, {len(manifest.facts)} facts)", file=sys.stderr)
+
+    results = {"extraction": await bench_extraction(manifest, workers)}
+    kb, results["knowledge_base"] = await bench_knowledge_base(corpus_dir, manifest, workers, rounds)
+    texts = [chunk.text for chunk in kb.chunks()]
+    results["tokenization"] = await asyncio.to_thread(bench_tokenization, texts)
+    results["packing"] = await bench_packing(kb, manifest, rounds)
+    results["handler"] = await bench_handler(kb, manifest)
+    return results
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta_ms: float = 0.1) -> List[str]:
+    """
+    Returns one line per metric that regressed by more than `threshold`.
+    Millisecond timings that moved less than `min_delta_ms` are treated as noise.
+    """
+    regressions = []
+    now, before = flatten(current["suites"]), flatten(baseline["suites"])
+    for name, old in sorted(before.items()):
+        new = now.get(name)
+        leaf = name.rsplit(".", 1)[-1]
+        if new is None or old == 0 or leaf in ("count", "pages", "texts", "tokens", "chunks", "workers"):
+            continue
+        if leaf.endswith("_ms") and abs(new - old) < min_delta_ms:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if any(tag in leaf for tag in HIGHER_IS_BETTER) else change
+        if worse > threshold:
+            regressions.append(f"{name}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,1000", help="comma-separated corpus sizes in pages")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=5, help="repetitions of the warm query set")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore smaller latency changes")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "seed": args.seed,
+        },
+        "suites": {},
+    }
+    for pages in (int(p) for p in args.pages.split(",")):
+        report["suites"][f"pages_{pages}"] = asyncio.run(
+            run_suite(pages, args.seed, args.corpus_dir, args.workers, args.rounds)
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against baseline.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
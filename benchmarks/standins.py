@@ -0,0 +1,170 @@
+"""
+Local stand-ins for the external APIs the app calls, used by the load test.
+
+`FakeOpenAI` speaks enough of the chat-completions API (streaming and not)
+for the official SDK, with configurable time-to-first-token, token rate and
+error injection. `FakeSlack` answers `auth.test` and records every
+`response_url` callback so the load generator can measure time-to-answer.
+
+Both are plain ASGI apps; serve them with uvicorn.
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Markers of the interim messages posted by ProgressiveReply
+INTERIM_MARKERS = ("_Thinking..._", ":writing_hand:")
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, status: int, payload: dict):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class FakeOpenAI:
+    """
+    Chat-completions stand-in. Every request waits `latency` seconds before
+    the first token, then produces `answer_tokens` tokens at `tokens_per_second`
+    (0 = all at once). A fraction `error_rate` of requests fail with `error_status`.
+    """
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 50.0, answer_tokens: int = 120,
+                 error_rate: float = 0.0, error_status: int = 500, seed: int = 1):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+
+    def _usage(self, prompt: str) -> dict:
+        prompt_tokens = len(prompt.split())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": self.answer_tokens,
+            "total_tokens": prompt_tokens + self.answer_tokens,
+        }
+
+    async def _tokens(self):
+        await asyncio.sleep(self.latency)
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for number in range(self.answer_tokens):
+            if delay and number:
+                await asyncio.sleep(delay)
+            yield f"token{number} "
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if not scope["path"].endswith("/chat/completions"):
+            await _send_json(send, 404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        request = json.loads(await _read_body(receive) or b"{}")
+        self.requests += 1
+        if self._rng.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(self.latency)
+            await _send_json(send, self.error_status, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        model = request.get("model", "gpt-stand-in")
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        base = {"id": f"chatcmpl-{self.requests}", "created": int(time.time()), "model": model}
+
+        if not request.get("stream"):
+            answer = "".join([token async for token in self._tokens()]).strip()
+            await _send_json(send, 200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": self._usage(prompt),
+            })
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+        })
+
+        async def event(payload):
+            data = payload if isinstance(payload, str) else json.dumps({**base, "object": "chat.completion.chunk", **payload})
+            await send({"type": "http.response.body", "body": f"data: {data}\n\n".encode(), "more_body": True})
+
+        async for token in self._tokens():
+            await event({"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+        await event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            await event({"choices": [], "usage": self._usage(prompt)})
+        await event("[DONE]")
+        await send({"type": "http.response.body", "body": b""})
+
+
+@dataclass
+class Callback:
+    received_at: float
+    final: bool
+
+
+@dataclass
+class FakeSlack:
+    """
+    Slack stand-in: `POST /api/auth.test` succeeds for any token and
+    `POST /respond/<request_id>` records a response_url callback.
+    """
+    team_id: str = "T0LOADTEST"
+    bot_user_id: str = "U0LOADBOT"
+    callbacks: Dict[str, List[Callback]] = field(default_factory=dict)
+    _answered: Dict[str, asyncio.Event] = field(default_factory=dict)
+
+    def answered(self, request_id: str) -> asyncio.Event:
+        """Event set when the final (non-interim) message for `request_id` arrives."""
+        return self._answered.setdefault(request_id, asyncio.Event())
+
+    def answer_time(self, request_id: str) -> Optional[float]:
+        for callback in self.callbacks.get(request_id, []):
+            if callback.final:
+                return callback.received_at
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        body = await _read_body(receive)
+        if path.startswith("/api/auth.test"):
+            await _send_json(send, 200, {
+                "ok": True, "url": "https://loadtest.slack.com/", "team": "Load Test", "user": "slackgpt",
+                "team_id": self.team_id, "user_id": self.bot_user_id, "bot_id": "B0LOADBOT",
+            })
+            return
+        if path.startswith("/respond/"):
+            received_at = time.perf_counter()
+            request_id = path[len("/respond/"):]
+            text = body.decode("utf-8", "replace")
+            final = not any(marker in text for marker in INTERIM_MARKERS)
+            self.callbacks.setdefault(request_id, []).append(Callback(received_at, final))
+            if final:
+                self.answered(request_id).set()
+            await _send_json(send, 200, {"ok": True})
+            return
+        await _send_json(send, 404, {"ok": False, "error": "unknown_method"})
@@ -0,0 +1,133 @@
+"""
+In-memory stand-ins for external services, shared by the test suite.
+"""
+
+import asyncio
+import time
+
+
+class FakeRedisService:
+    """Implements the RedisService interface on top of plain dicts."""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.expiry = {}
+        self.channels = {}
+        self.streams = {}
+        self.groups = {}
+        self._stream_sequence = 0
+
+    def _expired(self, key):
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+            self.expiry.pop(key, None)
+            return True
+        return False
+
+    async def get_value(self, key):
+        self._expired(key)
+        return self.values.get(key)
+
+    async def set_value(self, key, value, ttl_seconds):
+        self.values[key] = value
+        self.expiry[key] = time.monotonic() + ttl_seconds
+
+    async def get_value_with_ttl(self, key):
+        value = await self.get_value(key)
+        if value is None or key not in self.expiry:
+            return value, None
+        return value, self.expiry[key] - time.monotonic()
+
+    async def delete_value(self, key):
+        self.values.pop(key, None)
+        self.expiry.pop(key, None)
+
+    async def publish(self, channel, message):
+        for queue in self.channels.get(channel, []):
+            queue.put_nowait(message)
+
+    async def listen(self, channel):
+        queue = asyncio.Queue()
+        self.channels.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.channels[channel].remove(queue)
+
+    async def get_values(self, keys):
+        return [await self.get_value(key) for key in keys]
+
+    async def add_to_sets(self, keys, member, ttl_seconds):
+        for key in keys:
+            self._expired(key)
+            self.sets.setdefault(key, set()).add(member)
+            self.expiry[key] = time.monotonic() + ttl_seconds
+
+    async def get_set_members(self, keys):
+        result = []
+        for key in keys:
+            self._expired(key)
+            result.append(set(self.sets.get(key, set())))
+        return result
+
+    async def acquire_lock(self, key, token, ttl_seconds):
+        self._expired(key)
+        if key in self.values:
+            return False
+        await self.set_value(key, token, ttl_seconds)
+        return True
+
+    async def release_lock(self, key, token):
+        if self.values.get(key) == token:
+            self.values.pop(key, None)
+            self.expiry.pop(key, None)
+
+    async def add_to_stream(self, stream, fields, maxlen=None):
+        self._stream_sequence += 1
+        entry_id = f"{self._stream_sequence}-0"
+        self.streams.setdefault(stream, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    async def create_consumer_group(self, stream, group):
+        self.streams.setdefault(stream, [])
+        self.groups.setdefault((stream, group), {"delivered": 0, "pending": {}})
+        return True
+
+    async def read_from_group(self, stream, group, consumer, count, block_ms):
+        state = self.groups[(stream, group)]
+        entries = self.streams[stream][state["delivered"]:state["delivered"] + count]
+        state["delivered"] += len(entries)
+        for entry_id, _ in entries:
+            state["pending"][entry_id] = {"consumer": consumer, "since": time.monotonic(), "deliveries": 1}
+        if not entries:
+            await asyncio.sleep(min(block_ms, 10) / 1000)
+        return entries
+
+    async def ack_messages(self, stream, group, *entry_ids):
+        pending = self.groups[(stream, group)]["pending"]
+        return sum(1 for entry_id in entry_ids if pending.pop(entry_id, None) is not None)
+
+    async def claim_idle_messages(self, stream, group, consumer, min_idle_ms, count):
+        pending = self.groups[(stream, group)]["pending"]
+        now = time.monotonic()
+        claimed = []
+        for entry_id, fields in self.streams[stream]:
+            info = pending.get(entry_id)
+            if info and (now - info["since"]) * 1000 >= min_idle_ms and len(claimed) < count:
+                info.update(consumer=consumer, since=now, deliveries=info["deliveries"] + 1)
+                claimed.append((entry_id, fields))
+        return claimed
+
+    async def delivery_counts(self, stream, group, entry_ids):
+        pending = self.groups[(stream, group)]["pending"]
+        return {entry_id: pending[entry_id]["deliveries"] for entry_id in entry_ids if entry_id in pending}
+
+    async def ping(self):
+        return True
+
+    async def close(self):
+        pass
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)  # one token per second
+    bucket.take(60)
+    assert bucket.wait_time(2) == pytest.approx(2.0)
+    clock.now = 2.0
+    assert bucket.wait_time(2) == 0.0
+
+
+def test_token_bucket_clamps_oversized_requests():
+    bucket = TokenBucket(100, clock=FakeClock())
+    assert bucket.wait_time(1000) == 0.0
+    bucket.take(1000)
+    assert bucket.tokens == 0.0
+
+
+def test_disabled_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.take(10**6)
+    assert bucket.wait_time(10**6) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_queues_requests():
+    controller = AdmissionController(max_concurrency=2, max_queue_wait=1.0)
+    active = peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with controller.admit(10):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+    assert controller.stats.admitted == 6
+    assert controller.stats.queued == 0
+    assert controller.stats.in_flight == 0
+    assert controller.stats.max_wait > 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_budget_cannot_be_met_in_time():
+    controller = AdmissionController(rpm_limit=1, max_queue_wait=0.05)
+    async with controller.admit(10):
+        pass
+    with pytest.raises(AdmissionRejected):
+        async with controller.admit(10):
+            pass
+    assert controller.stats.rejected == 1
+    assert controller.snapshot()["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    controller = AdmissionController(max_concurrency=1, max_queue_depth=1, max_queue_wait=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit(1):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    assert controller.stats.queued == 1
+    with pytest.raises(AdmissionRejected):
+        async with controller.admit(1):
+            pass
+    release.set()
+    await asyncio.gather(holder, waiter)
+
+
+@pytest.mark.asyncio
+async def test_settle_refunds_unused_tokens():
+    controller = AdmissionController(tpm_limit=1000)
+    async with controller.admit(600) as ticket:
+        ticket.settle(100)
+    assert controller.tpm.tokens == pytest.approx(900, abs=1)
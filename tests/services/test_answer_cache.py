@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.answer_cache import CORPUS_DEPENDENCY, AnswerCache, decode_entry, encode_entry
+from tests.fakes import FakeRedisService
+
+
+class FakeKnowledgeBase:
+    def __init__(self, versions):
+        self.versions = versions
+        self.loaded = True
+
+    def document_versions(self, doc_ids):
+        return {doc_id: self.versions.get(doc_id) for doc_id in doc_ids}
+
+    @property
+    def corpus_version(self):
+        return ",".join(f"{k}={v}" for k, v in sorted(self.versions.items()))
+
+
+def test_entry_round_trip_and_legacy_values():
+    assert decode_entry(encode_entry("hi", {"a.pdf": "1"})) == ("hi", {"a.pdf": "1"})
+    assert decode_entry("plain answer") == ("plain answer", {})
+    assert decode_entry("{not json") == ("{not json", {})
+
+
+@pytest.mark.asyncio
+async def test_answer_invalidated_when_dependency_changes():
+    kb = FakeKnowledgeBase({"a.pdf": "1", "b.pdf": "1"})
+    cache = AnswerCache(FakeRedisService(), kb, ttl_seconds=60)
+    await cache.put("qa", "from a", cache.dependencies(["a.pdf"]))
+    await cache.put("qb", "from b", cache.dependencies(["b.pdf", "b.pdf"]))
+
+    kb.versions["a.pdf"] = "2"
+    assert await cache.get("qa") is None
+    assert await cache.get("qb") == "from b"
+
+
+@pytest.mark.asyncio
+async def test_removed_document_invalidates_answer():
+    kb = FakeKnowledgeBase({"a.pdf": "1"})
+    cache = AnswerCache(FakeRedisService(), kb, ttl_seconds=60)
+    await cache.put("qa", "from a", cache.dependencies(["a.pdf"]))
+    del kb.versions["a.pdf"]
+    assert await cache.get("qa") is None
+
+
+@pytest.mark.asyncio
+async def test_context_free_answers_depend_on_whole_corpus():
+    kb = FakeKnowledgeBase({"a.pdf": "1"})
+    cache = AnswerCache(FakeRedisService(), kb, ttl_seconds=60)
+    dependencies = cache.dependencies([])
+    assert set(dependencies) == {CORPUS_DEPENDENCY}
+    await cache.put("q", "nothing found", dependencies)
+    assert await cache.get("q") == "nothing found"
+    kb.versions["new.pdf"] = "1"
+    assert await cache.get("q") is None
+
+
+@pytest.mark.asyncio
+async def test_stale_copy_ignores_dependencies():
+    kb = FakeKnowledgeBase({"a.pdf": "1"})
+    cache = AnswerCache(FakeRedisService(), kb, ttl_seconds=60, stale_ttl_seconds=600)
+    await cache.put("q", "old", cache.dependencies(["a.pdf"]))
+    kb.versions["a.pdf"] = "2"
+    assert await cache.get("q") is None
+    assert await cache.get_stale("q") == "old"
+
+
+@pytest.mark.asyncio
+async def test_answers_served_while_knowledge_base_loads():
+    kb = FakeKnowledgeBase({"a.pdf": "1"})
+    cache = AnswerCache(FakeRedisService(), kb, ttl_seconds=60)
+    await cache.put("q", "from a", cache.dependencies(["a.pdf"]))
+    # A restarted process: no document versions are known until the load finishes
+    kb.versions, kb.loaded = {}, False
+    assert await cache.get("q") == "from a"
+    kb.versions, kb.loaded = {"a.pdf": "2"}, True
+    assert await cache.get("q") is None
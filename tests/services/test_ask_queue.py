@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from app.services.ask_queue import AskJob, AskQueue
+from tests.fakes import FakeRedisService
+
+pytestmark = pytest.mark.asyncio
+
+
+def command(text="What is the VPN policy?"):
+    return {"text": text, "user_id": "U1", "response_url": "https://hooks.slack.test/1", "channel_id": "C1",
+            "team_id": "T1"}
+
+
+async def make_queue():
+    queue = AskQueue(FakeRedisService(), stream="ask:test", group="workers")
+    await queue.ensure_group()
+    return queue
+
+
+async def test_enqueued_job_round_trips_through_the_group():
+    queue = await make_queue()
+
+    entry_id = await queue.enqueue(AskJob.from_command(command()))
+    [(read_id, job)] = await queue.read("w1", count=10, block_ms=0)
+
+    assert read_id == entry_id
+    assert job.to_command() == command()
+    assert time.time() - job.enqueued_at < 5
+
+
+async def test_malformed_entries_are_returned_without_a_job():
+    queue = await make_queue()
+    await queue.redis_service.add_to_stream("ask:test", {"question": "no response url"})
+
+    [(_, job)] = await queue.read("w1", count=10, block_ms=0)
+
+    assert job is None
+
+
+async def test_claim_idle_reports_delivery_counts():
+    queue = await make_queue()
+    entry_id = await queue.enqueue(AskJob.from_command(command()))
+    await queue.read("w1", count=10, block_ms=0)
+
+    [(claimed_id, job, deliveries)] = await queue.claim_idle("w2", min_idle_seconds=0, count=10)
+
+    assert claimed_id == entry_id and job.question == "What is the VPN policy?"
+    assert deliveries == 2
+    assert await queue.claim_idle("w2", min_idle_seconds=60, count=10) == []
+
+
+async def test_dead_letter_records_the_job_and_acknowledges_it():
+    queue = await make_queue()
+    job = AskJob.from_command(command())
+    entry_id = await queue.enqueue(job)
+    await queue.read("w1", count=10, block_ms=0)
+
+    await queue.dead_letter(entry_id, job, "expired")
+
+    [(_, fields)] = queue.redis_service.streams["ask:test:dead"]
+    assert fields["reason"] == "expired" and fields["entry_id"] == entry_id
+    assert fields["question"] == job.question
+    assert await queue.ack(entry_id) == 0
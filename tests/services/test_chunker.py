@@ -0,0 +1,110 @@
+import pytest
+
+from app.services.chunker import Chunker, is_heading, join_pages
+
+
+class WordEncoding:
+    """Counts whitespace-separated words as tokens."""
+    def encode_batch(self, texts):
+        return [[0] * len(t.split()) for t in texts]
+
+
+@pytest.fixture(autouse=True)
+def word_encoding(monkeypatch):
+    monkeypatch.setattr('app.utils.tokens.get_encoding', lambda: WordEncoding())
+
+
+def sentences(n, word="word"):
+    return " ".join(f"Sentence {i} has some {word} text." for i in range(n))
+
+
+def test_is_heading():
+    assert is_heading("2.1 Travel Expenses")
+    assert is_heading("VACATION POLICY")
+    assert is_heading("Expense Reports and Receipts")
+    assert not is_heading("Employees must submit receipts within 30 days.")
+    assert not is_heading("vacation policy: vacation days accrue monthly")
+    assert not is_heading("Page 3 of 12")
+
+
+def test_chunks_respect_target_and_sentence_boundaries():
+    chunks = Chunker(target_tokens=20, overlap_tokens=0).chunk(sentences(10))
+    assert len(chunks) == 4
+    for chunk in chunks:
+        assert chunk.tokens <= 20
+        assert chunk.text.endswith("text.")
+    assert " ".join(c.text for c in chunks) == sentences(10)
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = Chunker(target_tokens=20, overlap_tokens=6).chunk(sentences(6))
+    # Each chunk starts with the last sentence of the one before it
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last = previous.text.rsplit(". ", 1)[-1]
+        assert chunk.text.startswith(last[:-1])
+        assert chunk.tokens <= 20
+
+
+def test_headings_start_chunks_and_set_sections():
+    text = "Travel Policy\n" + sentences(2) + "\n\nSecurity Policy\nBadges must be worn at all times."
+    chunks = Chunker(target_tokens=100, overlap_tokens=10).chunk(text)
+    assert [c.section for c in chunks] == ["Travel Policy", "Security Policy"]
+    assert chunks[0].text.startswith("Travel Policy\nSentence 0")
+    # No overlap across sections
+    assert chunks[1].text == "Security Policy\nBadges must be worn at all times."
+
+
+def test_mid_section_chunks_repeat_the_heading():
+    chunks = Chunker(target_tokens=20, overlap_tokens=0).chunk("Travel Policy\n" + sentences(8))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.section == "Travel Policy"
+        assert chunk.text.startswith("Travel Policy\n")
+    # The repeated heading is part of the chunk's token count
+    assert all(c.tokens == len(c.text.split()) for c in chunks)
+
+
+def test_pages_are_recorded():
+    text = join_pages([sentences(3, "first"), sentences(3, "second"), sentences(3, "third")])
+    chunks = Chunker(target_tokens=40, overlap_tokens=0).chunk(text)
+    assert (chunks[0].page, chunks[-1].page_end) == (1, 3)
+    for chunk in chunks:
+        assert chunk.page <= chunk.page_end
+        if "third" in chunk.text:
+            assert chunk.page_end == 3
+
+
+def test_oversized_sentence_is_split_by_words():
+    chunks = Chunker(target_tokens=50, overlap_tokens=10).chunk("cell " * 180)
+    assert len(chunks) == 4
+    assert all(c.tokens <= 50 for c in chunks)
+    assert sum(len(c.text.split()) for c in chunks) == 180
+
+
+def test_short_tail_is_merged_into_previous_chunk():
+    chunks = Chunker(target_tokens=20, overlap_tokens=0).chunk(sentences(4) + " Done.")
+    assert len(chunks) == 2
+    assert chunks[-1].text.endswith("Done.")
+
+
+def test_prefix_tokens_counted_in_one_batch(monkeypatch):
+    batches = []
+
+    class CountingEncoding(WordEncoding):
+        def encode_batch(self, texts):
+            batches.append(list(texts))
+            return super().encode_batch(texts)
+
+    monkeypatch.setattr('app.utils.tokens.get_encoding', lambda: CountingEncoding())
+    chunks = Chunker(target_tokens=20, overlap_tokens=0).chunk(sentences(6), prefix="[Source: a.pdf]\n")
+    assert len(batches) == 1
+    assert all(c.tokens == len(c.text.split()) + 2 for c in chunks)
+
+
+def test_hyphenated_line_breaks_are_rejoined():
+    chunks = Chunker().chunk("Submit the reim-\nbursement form by Friday.")
+    assert chunks[0].text == "Submit the reimbursement form by Friday."
+
+
+def test_empty_text_has_no_chunks():
+    assert Chunker().chunk("  \n\n \f ") == []
@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services import container as container_module
+from app.services.container import ServiceContainer, get_services, set_services
+
+
+def make_container():
+    redis_service = MagicMock()
+    redis_service.ping = AsyncMock(return_value=True)
+    redis_service.start = AsyncMock()
+    redis_service.close = AsyncMock()
+    kb_service = MagicMock(spec=["load", "start_watching"])
+    kb_service.load = AsyncMock(return_value=3)
+    kb_service.start_watching = AsyncMock()
+    openai_service = MagicMock()
+    openai_service.close = AsyncMock()
+    return ServiceContainer(redis_service, kb_service, openai_service)
+
+
+@pytest.mark.asyncio
+async def test_startup_warms_services_once():
+    services = make_container()
+    await services.startup()
+    await services.startup()
+    services.redis_service.ping.assert_awaited_once()
+    services.redis_service.start.assert_awaited_once()
+    services.kb_service.load.assert_awaited_once()
+    services.kb_service.start_watching.assert_awaited_once()
+    assert services.started
+
+
+@pytest.mark.asyncio
+async def test_startup_survives_warmup_errors():
+    services = make_container()
+    services.redis_service.ping = AsyncMock(side_effect=RuntimeError("down"))
+    services.kb_service.load = AsyncMock(side_effect=RuntimeError("bad dir"))
+    await services.startup()
+    assert services.started
+
+
+@pytest.mark.asyncio
+async def test_status_reports_warmup():
+    services = make_container()
+    assert services.status() == {"redis": "not started", "knowledge_base": "not loaded"}
+    services.kb_service.load = AsyncMock(side_effect=RuntimeError("bad dir"))
+    await services.startup()
+    assert services.status() == {"redis": "ok", "knowledge_base": "failed"}
+
+    deferred = make_container()
+    await deferred.startup(load_knowledge_base=False)
+    assert deferred.status()["knowledge_base"] == "deferred"
+    deferred.kb_service.load.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_status_reports_redis_unavailable_when_ping_fails():
+    services = make_container()
+    services.redis_service.ping = AsyncMock(return_value=False)
+    await services.startup()
+    assert services.status()["redis"] == "unavailable"
+    services.redis_service.start.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_closes_services():
+    services = make_container()
+    services.openai_service.close = AsyncMock(side_effect=RuntimeError("already closed"))
+    await services.startup()
+    await services.shutdown()
+    services.redis_service.close.assert_awaited_once()
+    services.openai_service.close.assert_awaited_once()
+    assert not services.started
+
+
+def test_set_services_swaps_and_restores(monkeypatch):
+    monkeypatch.setattr(container_module, "_services", None)
+    fake = make_container()
+    previous = set_services(fake)
+    assert previous is None
+    assert get_services() is fake
+    assert set_services(previous) is fake
+
+
+def test_single_flight_lease_outlives_every_openai_attempt(monkeypatch):
+    monkeypatch.setattr(container_module.config, "SINGLE_FLIGHT_LEASE_SECONDS", 0)
+    monkeypatch.setattr(container_module.config, "SINGLE_FLIGHT_WAIT_TIMEOUT", 0)
+    monkeypatch.setattr(container_module.config, "OPENAI_QUEUE_TIMEOUT", 10)
+    monkeypatch.setattr(container_module.config, "OPENAI_TIMEOUT", 20)
+    monkeypatch.setattr(container_module.config, "OPENAI_MAX_ATTEMPTS", 3)
+    services = make_container()
+    # Queue wait, three 20s attempts and two backoffs of at most 4s
+    assert services.single_flight.lease_seconds == 78
+    assert services.single_flight.wait_timeout == 78
+
@@ -0,0 +1,51 @@
+from app.services.context_packer import Candidate, pack_context
+
+
+def test_skips_oversized_chunk_instead_of_stopping():
+    candidates = [
+        Candidate("big", tokens=90, score=5.0),
+        Candidate("small a", tokens=10, score=4.0),
+        Candidate("small b", tokens=10, score=3.0),
+    ]
+    packed = pack_context(candidates, budget=30)
+    assert [c.text for c in packed.chunks] == ["small a", "small b"]
+    assert packed.tokens == 20
+    assert packed.score == 7.0
+
+
+def test_prefers_value_per_token():
+    candidates = [
+        Candidate("wide", tokens=60, score=6.0),
+        Candidate("dense 1", tokens=30, score=5.0),
+        Candidate("dense 2", tokens=30, score=5.0),
+    ]
+    packed = pack_context(candidates, budget=60)
+    assert {c.text for c in packed.chunks} == {"dense 1", "dense 2"}
+    assert packed.score == 10.0
+
+
+def test_falls_back_to_raw_score_when_density_is_worse():
+    # Density greedy would take the tiny chunk and then not fit the valuable one
+    candidates = [
+        Candidate("tiny", tokens=1, score=1.0),
+        Candidate("valuable", tokens=100, score=50.0),
+    ]
+    packed = pack_context(candidates, budget=100)
+    assert [c.text for c in packed.chunks] == ["valuable"]
+
+
+def test_output_is_relevance_ordered_and_reports_ratio():
+    candidates = [
+        Candidate("low", tokens=5, score=1.0),
+        Candidate("high", tokens=50, score=9.0),
+        Candidate("unused", tokens=100, score=2.0),
+    ]
+    packed = pack_context(candidates, budget=60)
+    assert [c.text for c in packed.chunks] == ["high", "low"]
+    assert packed.text == "high\n\nlow"
+    assert packed.score_ratio == 10.0 / 12.0
+
+
+def test_empty_candidates():
+    packed = pack_context([], budget=100)
+    assert packed.chunks == [] and packed.text == "" and packed.score_ratio == 0.0
@@ -0,0 +1,56 @@
+import os
+
+from app.services.corpus_store import CURRENT_FILE, CorpusStore, open_corpus, save_corpus
+from app.services.search_index import IndexedChunk
+
+CHUNKS = [
+    IndexedChunk("a.pdf", "Travel Policy\nFlights are booked in economy.", 9, 1, 1, "Travel Policy"),
+    IndexedChunk("a.pdf", "Les reçus sont obligatoires — toujours.", 8, 2, 3, ""),
+    IndexedChunk("b.pdf", "Badges must be worn at all times.", 7, 5, 5, "Security"),
+]
+
+
+def test_round_trip(tmp_path):
+    store = CorpusStore(save_corpus(str(tmp_path), CHUNKS, {"a.pdf": (10, 20), "b.pdf": None}))
+    assert len(store) == 3
+    for row, expected in enumerate(CHUNKS):
+        chunk = store.chunk(row)
+        assert (chunk.doc_id, chunk.text, chunk.tokens, chunk.page, chunk.page_end, chunk.section) == (
+            expected.doc_id, expected.text, expected.tokens, expected.page, expected.page_end, expected.section)
+    assert store.versions == {"a.pdf": [10, 20], "b.pdf": None}
+
+
+def test_identical_content_shares_one_version(tmp_path):
+    first = save_corpus(str(tmp_path), CHUNKS)
+    second = save_corpus(str(tmp_path), list(CHUNKS))
+    assert first == second
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")]
+    assert open_corpus(str(tmp_path)).path == first
+
+
+def test_old_versions_are_pruned(tmp_path):
+    paths = [save_corpus(str(tmp_path), CHUNKS[:n], keep=2) for n in (1, 2, 3)]
+    assert not os.path.exists(paths[0])
+    assert os.path.isdir(paths[1]) and os.path.isdir(paths[2])
+    with open(tmp_path / CURRENT_FILE) as f:
+        assert f.read() == os.path.basename(paths[2])
+
+
+def test_pruned_version_stays_readable_while_mapped(tmp_path):
+    store = CorpusStore(save_corpus(str(tmp_path), CHUNKS, keep=1))
+    save_corpus(str(tmp_path), CHUNKS[:1], keep=1)
+    assert not os.path.exists(store.path)
+    assert store.text(2) == CHUNKS[2].text
+
+
+def test_empty_corpus(tmp_path):
+    store = CorpusStore(save_corpus(str(tmp_path), []))
+    assert len(store) == 0
+
+
+def test_open_missing_or_corrupt_corpus(tmp_path):
+    assert open_corpus(str(tmp_path)) is None
+    path = save_corpus(str(tmp_path), CHUNKS)
+    with open(os.path.join(path, "chunks.bin"), "r+b") as f:
+        f.write(b"garbage!")
+    assert open_corpus(str(tmp_path)) is None
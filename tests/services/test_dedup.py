@@ -0,0 +1,37 @@
+from app.services.dedup import NearDuplicateIndex, shingles, sketch, sketch_similarity, strip_boilerplate
+
+
+def test_strip_boilerplate_drops_running_headers_and_footers():
+    bodies = ["Travel needs approval.", "Expenses are due monthly.", "Laptops are replaced yearly.", "Badges open doors."]
+    pages = [f"ACME Corp Confidential\n{body}\nPage {n} of 4" for n, body in enumerate(bodies, start=1)]
+    assert strip_boilerplate(pages) == bodies
+
+
+def test_strip_boilerplate_keeps_short_documents_and_rare_lines():
+    assert strip_boilerplate(["Header\nOne", "Header\nTwo"]) == ["Header\nOne", "Header\nTwo"]
+    pages = ["Intro\nshared line", "shared line\nmore", "other", "text", "words", "again"]
+    assert strip_boilerplate(pages) == pages  # on 2 of 6 pages: not furniture
+
+
+def test_sketch_similarity_estimates_jaccard():
+    base = " ".join(f"word{i}" for i in range(200))
+    edited = base.replace("word100", "changed")
+    a, b = sketch(shingles(base)), sketch(shingles(edited))
+    assert sketch_similarity(a, a) == 1.0
+    assert sketch_similarity(a, b) > 0.8
+    assert sketch_similarity(a, sketch(shingles("something else entirely here"))) == 0.0
+
+
+def test_near_duplicates_share_a_group():
+    paragraph = "All travel must be approved by a manager before any flights or hotels are booked."
+    index = NearDuplicateIndex(threshold=0.7)
+    first = index.add(1, paragraph)
+    assert index.add(2, "Travel Policy\n" + paragraph) == first
+    assert index.add(3, "Expense reports are due within thirty days of the end of a trip.") == 3
+    assert index.group(4) == 4  # Unknown chunks are their own group
+
+    # Removing the group's first chunk does not split the rest
+    index.remove([1])
+    assert index.group(2) == first
+    assert index.add(5, paragraph) == first
+    assert len(index) == 3
@@ -0,0 +1,57 @@
+import os
+
+from app.services.extraction_cache import ExtractionCache, content_hash
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    assert cache.get(str(pdf)) is None
+    cache.put(str(pdf), ["first page", "second page"])
+    assert cache.get(str(pdf)) == ["first page", "second page"]
+
+
+def test_fingerprint_is_content_hash(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    assert cache.fingerprint(str(pdf)) == content_hash(str(pdf))
+
+
+def test_modified_file_misses(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    cache.put(str(pdf), ["old"])
+    pdf.write_bytes(b"%PDF-2 changed")
+    os.utime(pdf, ns=(1, 1))
+    assert cache.get(str(pdf)) is None
+
+
+def test_identical_content_shared_across_paths(tmp_path):
+    # Replicas mounting the corpus at different paths still share entries
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.pdf"
+    a.write_bytes(b"%PDF-same")
+    b.write_bytes(b"%PDF-same")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    cache.put(str(a), ["shared"])
+    assert cache.get(str(b)) == ["shared"]
+
+
+def test_missing_file_has_no_fingerprint(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    assert cache.fingerprint(str(tmp_path / "missing.pdf")) is None
+    cache.put(str(tmp_path / "missing.pdf"), ["x"])
+    assert not (tmp_path / "cache").exists()
+
+
+def test_corrupt_entry_is_ignored(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    cache.put(str(pdf), ["ok"])
+    entry = tmp_path / "cache" / "pages" / f"{content_hash(str(pdf))}.json"
+    entry.write_text("{not json")
+    assert cache.get(str(pdf)) is None
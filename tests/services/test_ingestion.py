@@ -0,0 +1,92 @@
+import fitz
+import pytest
+
+from app.services.extraction_cache import ExtractionCache
+from app.services.ingestion import MAX_DEFAULT_WORKERS, default_workers, ingest_pdfs, plan_tasks
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+def test_plan_tasks_splits_large_documents_first():
+    tasks = plan_tasks({"small.pdf": 2, "big.pdf": 5, "empty.pdf": 0}, pages_per_task=2)
+    assert tasks[:3] == [("big.pdf", 0, 2), ("big.pdf", 2, 4), ("big.pdf", 4, 5)]
+    assert ("small.pdf", 0, 2) in tasks
+    assert ("empty.pdf", 0, 0) in tasks
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdfs_streams_documents_in_page_order(tmp_path):
+    make_pdf(tmp_path / "a.pdf", [f"alpha page {i}" for i in range(5)])
+    make_pdf(tmp_path / "b.pdf", ["beta page 0"])
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    received = {}
+
+    async def on_document(path, pages):
+        received[path] = pages
+
+    stats = await ingest_pdfs(
+        [str(tmp_path / n) for n in ("a.pdf", "b.pdf", "broken.pdf")],
+        on_document,
+        max_workers=2,
+        pages_per_task=2,
+    )
+    assert stats.documents == 2 and stats.pages == 6 and stats.failed == 1
+    assert stats.pages_per_second > 0
+    assert [p.strip() for p in received[str(tmp_path / "a.pdf")]] == [f"alpha page {i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdfs_uses_extraction_cache(tmp_path):
+    make_pdf(tmp_path / "a.pdf", ["alpha"])
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    cache.put(str(tmp_path / "a.pdf"), ["cached alpha"])
+    received = {}
+
+    async def on_document(path, pages):
+        received[path] = pages
+
+    stats = await ingest_pdfs([str(tmp_path / "a.pdf")], on_document, max_workers=2, extraction_cache=cache)
+    assert stats.cached == 1
+    assert received[str(tmp_path / "a.pdf")] == ["cached alpha"]
+
+
+def test_default_workers_split_cores_across_web_processes(monkeypatch):
+    monkeypatch.setattr('app.services.ingestion.os.cpu_count', lambda: 16)
+    assert default_workers() == MAX_DEFAULT_WORKERS
+    assert default_workers(8) == 2
+    assert default_workers(32) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_ingestion_does_not_wait_for_queued_page_ranges(monkeypatch):
+    import asyncio
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def slow_extract(path, start, stop):
+        time.sleep(0.2)
+        return path, start, ["page"] * (stop - start)
+
+    # Threads stand in for the process pool so the slow extractor applies
+    monkeypatch.setattr('app.services.ingestion.ProcessPoolExecutor',
+                        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr('app.services.ingestion.extract_page_range', slow_extract)
+    monkeypatch.setattr('app.services.ingestion.count_pages', lambda path: 20)
+
+    async def on_document(path, pages):
+        pass
+
+    task = asyncio.create_task(ingest_pdfs(["big.pdf"], on_document, max_workers=1, pages_per_task=1))
+    await asyncio.sleep(0.3)
+    started = time.perf_counter()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # 18 or so ranges were still queued: about 3.6s with a blocking shutdown
+    assert time.perf_counter() - started < 0.5
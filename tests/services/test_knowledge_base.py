@@ -19,10 +19,23 @@ def tmp_pdf_dir(tmp_path, monkeypatch):
     txt.write_text("dummy")
     return tmp_path
 
+class DummyEncoding:
+    """Counts whitespace-separated words as tokens."""
+    def encode(self, s):
+        return [0] * len(s.split())
+    def encode_batch(self, texts):
+        return [self.encode(t) for t in texts]
+
+@pytest.fixture(autouse=True)
+def dummy_encoding(monkeypatch):
+    # Avoid downloading BPE files; token counts are word counts in these tests
+    monkeypatch.setattr('app.utils.tokens.get_encoding', lambda: DummyEncoding())
+
 # Fixture for a service instance
 @pytest.fixture
 def kb_service(tmp_pdf_dir):
-    return KnowledgeBaseService(str(tmp_pdf_dir))
+    return KnowledgeBaseService(str(tmp_pdf_dir), cache_dir=str(tmp_pdf_dir / "cache"), ingest_workers=1,
+                                corpus_dir=str(tmp_pdf_dir / "corpus"))
 
 # --- Tests for _scan_pdf_files ---
 
@@ -78,6 +91,22 @@ def test_extract_text_from_pdf_error(kb_service, monkeypatch):
         assert text == ""
         log_err.assert_called()
 
+def test_extract_text_uses_persistent_cache(tmp_pdf_dir, monkeypatch):
+    pdf = tmp_pdf_dir / "real.pdf"
+    pdf.write_bytes(b"%PDF-fake")
+    calls = []
+    def fake_open(path):
+        calls.append(path)
+        return DummyDoc(["page one", "page two"])
+    monkeypatch.setattr('app.services.knowledge_base.fitz.open', fake_open)
+    cache_dir = str(tmp_pdf_dir / "cache")
+    first = KnowledgeBaseService(str(tmp_pdf_dir), cache_dir=cache_dir, ingest_workers=1)
+    text = first._extract_text_from_pdf(str(pdf))
+    # A fresh instance (e.g. after a restart) reads from disk instead of parsing
+    second = KnowledgeBaseService(str(tmp_pdf_dir), cache_dir=cache_dir, ingest_workers=1)
+    assert second._extract_text_from_pdf(str(pdf)) == text
+    assert calls == [str(pdf)]
+
 # --- Tests for find_relevant_context ---
 
 @pytest.mark.asyncio
@@ -88,15 +117,10 @@ async def test_find_relevant_context_success(monkeypatch, kb_service):
     monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: (
         "no match here" if p.endswith('f1.pdf') else "context chunk\n\nanswer chunk\n\nmore text"
     ))
-    with patch('tiktoken.encoding_for_model') as enc_patch:
-        class DummyEncoding:
-            def encode(self, s):
-                return [0] * len(s.split())
-        enc_patch.return_value = DummyEncoding()
-        result = await kb_service.find_relevant_context("answer", max_context_tokens=10)
-        assert "answer chunk" in result
-        # Ensure result is truncated by token count
-        assert isinstance(result, str)
+    result = await kb_service.find_relevant_context("answer", max_context_tokens=10)
+    assert "answer chunk" in result
+    # Ensure result is truncated by token count
+    assert isinstance(result, str)
 
 @pytest.mark.asyncio
 async def test_find_relevant_context_handles_error(monkeypatch, kb_service):
@@ -104,32 +128,22 @@ async def test_find_relevant_context_handles_error(monkeypatch, kb_service):
     # _extract_text throws
     monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: (_ for _ in ()).throw(ValueError("fail")))
     with patch('logging.error') as log_err:
-        with patch('tiktoken.encoding_for_model') as enc_patch:
-            class DummyEncoding:
-                def encode(self, s):
-                    return [0] * len(s.split())
-            enc_patch.return_value = DummyEncoding()
-            result = await kb_service.find_relevant_context("anything", max_context_tokens=10)
-            assert result == ""
-            log_err.assert_called()
+        result = await kb_service.find_relevant_context("anything", max_context_tokens=10)
+        assert result == ""
+        log_err.assert_called()
 
 @pytest.mark.asyncio
 async def test_find_relevant_context_max_context_tokens(monkeypatch, kb_service):
     monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["f.pdf"])
     long_text = "chunk " * 1000  # creates more than 1000 tokens
     monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: long_text)
-    with patch('tiktoken.encoding_for_model') as enc_patch:
-        class DummyEncoding:
-            def encode(self, s):
-                return [0] * len(s.split())
-        enc_patch.return_value = DummyEncoding()
-        result = await kb_service.find_relevant_context("chunk", max_context_tokens=10)
-        # Should be truncated to fit token budget
-        assert isinstance(result, str)
-        assert len(result.split()) <= 10
-
-@pytest.mark.asyncio
-def test_find_relevant_context_multiple_pdfs_with_filenames(monkeypatch, kb_service):
+    result = await kb_service.find_relevant_context("chunk", max_context_tokens=10)
+    # Should be truncated to fit token budget
+    assert isinstance(result, str)
+    assert len(result.split()) <= 10
+
+@pytest.mark.asyncio
+async def test_find_relevant_context_multiple_pdfs_with_filenames(monkeypatch, kb_service):
     # Simulate two PDFs, both with relevant content
     monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["first.pdf", "second.pdf"])
     def fake_extract(path):
@@ -139,14 +153,283 @@ def test_find_relevant_context_multiple_pdfs_with_filenames(monkeypatch, kb_serv
             return "poet three\n\npoet four"
     monkeypatch.setattr(kb_service, '_extract_text_from_pdf', fake_extract)
     # Query for 'poet' should match all chunks
-    with patch('tiktoken.encoding_for_model') as enc_patch:
-        class DummyEncoding:
-            def encode(self, s):
-                return [0] * len(s.split())
-        enc_patch.return_value = DummyEncoding()
-        result = asyncio.run(kb_service.find_relevant_context("poet", max_context_tokens=100))
-        # Should include both filenames and all poets
-        assert "[Source: first.pdf]" in result
-        assert "[Source: second.pdf]" in result
-        assert "poet one" in result
-        assert "poet three" in result 
\ No newline at end of file
+    result = await kb_service.find_relevant_context("poet", max_context_tokens=100)
+    # Should include both filenames and all poets
+    assert "[Source: first.pdf]" in result
+    assert "[Source: second.pdf]" in result
+    assert "poet one" in result
+    assert "poet three" in result
+
+# --- Tests for load ---
+
+@pytest.mark.asyncio
+async def test_load_extracts_every_pdf_once(monkeypatch, kb_service):
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["f1.pdf", "f2.pdf"])
+    opened = []
+    def fake_open(path):
+        opened.append(path)
+        return DummyDoc(["text of " + path])
+    monkeypatch.setattr('app.services.knowledge_base.fitz.open', fake_open)
+    count = await kb_service.load()
+    assert count == 2
+    assert opened == ["f1.pdf", "f2.pdf"]
+    # Whole-document text is not kept in memory once it has been chunked
+    assert not hasattr(kb_service, "_text_cache")
+
+@pytest.mark.asyncio
+async def test_find_relevant_context_ranks_by_relevance(monkeypatch, kb_service):
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["a.pdf", "b.pdf"])
+    monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: (
+        "is a thing that is here\n\nunrelated words" if p == "a.pdf"
+        else "vacation policy: vacation days accrue monthly"
+    ))
+    result = await kb_service.find_relevant_context("what is the vacation policy", max_context_tokens=1000)
+    # Stopwords such as "is" no longer pull in unrelated chunks
+    assert result.startswith("[Source: b.pdf]")
+    assert "is a thing" not in result
+
+@pytest.mark.asyncio
+async def test_concurrent_questions_share_one_load(monkeypatch, kb_service):
+    scans = []
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: scans.append(1) or ["a.pdf"])
+    monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: "router reset steps")
+    results = await asyncio.gather(*(kb_service.find_relevant_context("router") for _ in range(3)))
+    assert all("router reset steps" in r for r in results)
+    assert len(scans) == 1
+
+# --- Tests for incremental re-indexing ---
+
+@pytest.mark.asyncio
+async def test_update_and_remove_document(monkeypatch, kb_service):
+    texts = {"a.pdf": "alpha widgets", "b.pdf": "beta gadgets"}
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: list(texts))
+    monkeypatch.setattr('app.services.knowledge_base.KnowledgeBaseService._extract_pages_from_pdf',
+                        lambda self, p: [texts[p]])
+    await kb_service.load()
+    texts["a.pdf"] = "gamma widgets"
+    await kb_service.update_document("a.pdf")
+    assert kb_service._index.search("alpha") == []
+    assert len(kb_service._index.search("gamma")) == 1
+    # Other documents are untouched
+    assert len(kb_service._index.search("beta")) == 1
+    await kb_service.remove_document("b.pdf")
+    assert kb_service._index.search("beta") == []
+
+@pytest.mark.asyncio
+async def test_load_parallel_indexes_real_pdfs(tmp_path):
+    import fitz
+    for name, body in [("one.pdf", "orchid care guide"), ("two.pdf", "cactus watering schedule")]:
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), body)
+        doc.save(str(tmp_path / name))
+        doc.close()
+    svc = KnowledgeBaseService(str(tmp_path), cache_dir=str(tmp_path / "cache"), ingest_workers=2,
+                               corpus_dir=str(tmp_path / "corpus"))
+    assert await svc.load() == 2
+    hits = svc._index.search("cactus")
+    assert [svc._index.get_chunk(c).doc_id for c, _ in hits] == [str(tmp_path / "two.pdf")]
+
+@pytest.mark.asyncio
+async def test_token_counts_computed_once_at_index_time(monkeypatch, tmp_pdf_dir):
+    # Small chunks, so each paragraph becomes its own chunk
+    kb_service = KnowledgeBaseService(str(tmp_pdf_dir), cache_dir="", ingest_workers=1,
+                                      chunk_tokens=4, chunk_overlap=0, corpus_dir="")
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["a.pdf"])
+    monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: "alpha beta\n\nalpha gamma delta")
+    batches = []
+    class CountingEncoding(DummyEncoding):
+        def encode(self, s):
+            raise AssertionError("single-text encode should not be used")
+        def encode_batch(self, texts):
+            batches.append(list(texts))
+            return [[0] * len(t.split()) for t in texts]
+    monkeypatch.setattr('app.utils.tokens.get_encoding', lambda: CountingEncoding())
+    await kb_service.load()
+    assert len(batches) == 1
+    chunks = [kb_service._index.get_chunk(c) for c, _ in kb_service._index.search("alpha")]
+    assert sorted(c.tokens for c in chunks) == [4, 5]
+    await kb_service.find_relevant_context("alpha", max_context_tokens=100)
+    await kb_service.find_relevant_context("gamma", max_context_tokens=100)
+    assert len(batches) == 1
+
+@pytest.mark.asyncio
+async def test_retrieve_packs_past_oversized_chunk(monkeypatch, kb_service):
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["a.pdf", "b.pdf"])
+    monkeypatch.setattr(kb_service, '_extract_text_from_pdf', lambda p: (
+        "router " + "filler " * 200 if p == "a.pdf" else "router reset steps"
+    ))
+    packed = await kb_service.retrieve("router", max_context_tokens=50)
+    # The oversized chunk from a.pdf is skipped instead of ending the packing
+    assert [c.doc_id for c in packed.chunks] == ["b.pdf"]
+    assert packed.tokens <= 50 and packed.score > 0
+
+
+@pytest.mark.asyncio
+async def test_chunks_keep_page_and_section(monkeypatch, kb_service):
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["h.pdf"])
+    monkeypatch.setattr(kb_service, '_extract_pages_from_pdf', lambda p: [
+        "Employee Handbook\nWelcome to the company.",
+        "Travel Policy\nFlights over six hours may be booked in business class.",
+    ])
+    packed = await kb_service.retrieve("business class flights", max_context_tokens=100)
+    chunk = packed.chunks[0]
+    assert chunk.text.startswith("[Source: h.pdf]\nTravel Policy\n")
+    assert (chunk.payload.page, chunk.payload.section) == (2, "Travel Policy")
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_served_from_the_shared_corpus_store(monkeypatch, tmp_pdf_dir):
+    from app.services.corpus_store import StoredChunk
+    texts = {"a.pdf": "alpha widgets", "b.pdf": "beta gadgets"}
+
+    def service():
+        svc = KnowledgeBaseService(str(tmp_pdf_dir), cache_dir="", ingest_workers=1,
+                                   corpus_dir=str(tmp_pdf_dir / "corpus"))
+        monkeypatch.setattr(svc, '_scan_pdf_files', lambda: list(texts))
+        monkeypatch.setattr(svc, '_extract_text_from_pdf', lambda p: texts[p])
+        return svc
+
+    # Two workers building the same corpus map the same files
+    first, second = service(), service()
+    await first.load()
+    await second.load()
+    assert first._corpus.path == second._corpus.path
+    assert all(isinstance(chunk, StoredChunk) for _, chunk in first._index.items())
+    packed = await first.retrieve("beta", max_context_tokens=100)
+    assert packed.chunks[0].text == "[Source: b.pdf]\nbeta gadgets"
+
+    # A re-indexed document is served from memory alongside the stored chunks
+    texts["a.pdf"] = "gamma widgets"
+    await first.update_document("a.pdf")
+    assert first._index.search("alpha") == []
+    assert (await first.retrieve("gamma", max_context_tokens=100)).chunks[0].doc_id == "a.pdf"
+
+# --- Tests for dense retrieval ---
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+async def test_dense_retrieval_finds_paraphrases(monkeypatch, tmp_pdf_dir, mode):
+    from app.services.embeddings import HashingEmbeddingProvider
+    svc = KnowledgeBaseService(
+        str(tmp_pdf_dir), cache_dir="", ingest_workers=1, retrieval_mode=mode,
+        embedding_provider=HashingEmbeddingProvider(), vector_dir=str(tmp_pdf_dir / "vectors"),
+        corpus_dir=str(tmp_pdf_dir / "corpus"),
+    )
+    texts = {"a.pdf": "Resetting forgotten passwords is done from the login page",
+             "b.pdf": "The cafeteria serves lunch at noon"}
+    monkeypatch.setattr(svc, '_scan_pdf_files', lambda: list(texts))
+    monkeypatch.setattr(svc, '_extract_text_from_pdf', lambda p: texts[p])
+    packed = await svc.retrieve("how do I reset my password", max_context_tokens=100)
+    assert packed.chunks[0].doc_id == "a.pdf"
+    assert svc._vectors.is_memory_mapped
+
+    # A changed document only re-embeds its own chunks
+    texts["b.pdf"] = "Password resets also work from the mobile app"
+    await svc.update_document("b.pdf")
+    packed = await svc.retrieve("reset password mobile", max_context_tokens=100)
+    assert packed.chunks[0].doc_id == "b.pdf"
+
+
+@pytest.mark.asyncio
+async def test_document_versions_change_with_the_pdf(tmp_path):
+    import fitz
+
+    def write_pdf(body):
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), body)
+        doc.save(pdf_path)
+        doc.close()
+
+    pdf_path = str(tmp_path / "doc.pdf")
+    write_pdf("version one")
+    svc = KnowledgeBaseService(str(tmp_path), cache_dir="", ingest_workers=1, corpus_dir="")
+    await svc.load()
+    before = svc.document_versions([pdf_path, "missing.pdf"])
+    corpus_before = svc.corpus_version
+    assert before[pdf_path] and before["missing.pdf"] is None
+
+    write_pdf("version two, which is a little longer")
+    await svc.update_document(pdf_path)
+
+    assert svc.document_versions([pdf_path])[pdf_path] != before[pdf_path]
+    assert svc.corpus_version != corpus_before
+
+
+@pytest.mark.asyncio
+async def test_retrieve_sends_repeated_boilerplate_once(monkeypatch, tmp_pdf_dir):
+    disclaimer = ("This manual is provided for internal use only and does not constitute a contract "
+                  "of employment or a guarantee of any benefit described in it.")
+    texts = {
+        "v1.pdf": f"Remote Work\nRemote work requires manager approval.\nDISCLAIMER\n{disclaimer}",
+        "v2.pdf": f"Remote Work\nRemote work is allowed two days a week.\nDISCLAIMER\n{disclaimer}",
+    }
+    svc = KnowledgeBaseService(str(tmp_pdf_dir), cache_dir="", ingest_workers=1, corpus_dir="",
+                               chunk_tokens=60, chunk_overlap=0)
+    monkeypatch.setattr(svc, '_scan_pdf_files', lambda: list(texts))
+    monkeypatch.setattr(svc, '_extract_text_from_pdf', lambda p: texts[p])
+
+    packed = await svc.retrieve("internal manual contract employment", max_context_tokens=1000)
+    assert sum(disclaimer in chunk.text for chunk in packed.chunks) == 1
+
+    svc.duplicate_similarity = 0
+    await svc.load()
+    packed = await svc.retrieve("internal manual contract employment", max_context_tokens=1000)
+    assert sum(disclaimer in chunk.text for chunk in packed.chunks) == 2
+
+
+@pytest.mark.asyncio
+async def test_page_furniture_is_not_indexed(monkeypatch, kb_service):
+    monkeypatch.setattr(kb_service, '_scan_pdf_files', lambda: ["h.pdf"])
+    monkeypatch.setattr(kb_service, '_extract_pages_from_pdf', lambda p: [
+        f"ACME Employee Handbook\nTopic {n} covers item{n} in detail.\nPage {n}" for n in range(1, 5)
+    ])
+    await kb_service.load()
+    assert all("ACME" not in chunk.text for _, chunk in kb_service._index.items())
+    assert kb_service._index.search("acme handbook") == []
+
+
+@pytest.mark.asyncio
+async def test_cold_start_answers_from_documents_indexed_so_far(monkeypatch, tmp_pdf_dir):
+    svc = KnowledgeBaseService(str(tmp_pdf_dir), cache_dir="", ingest_workers=2, corpus_dir="")
+    monkeypatch.setattr(svc, '_scan_pdf_files', lambda: ["a.pdf", "b.pdf"])
+    first_indexed, finish = asyncio.Event(), asyncio.Event()
+
+    async def fake_ingest(pdf_files, on_document, **kwargs):
+        await on_document("a.pdf", ["alpha widgets"])
+        first_indexed.set()
+        await finish.wait()
+        await on_document("b.pdf", ["beta gadgets"])
+        return MagicMock(documents=2)
+    monkeypatch.setattr('app.services.knowledge_base.ingest_pdfs', fake_ingest)
+
+    load = asyncio.create_task(svc.load())
+    await first_indexed.wait()
+    packed = await asyncio.wait_for(svc.retrieve("alpha", max_context_tokens=100), timeout=1)
+    assert [c.doc_id for c in packed.chunks] == ["a.pdf"]
+    assert not svc.loaded
+    finish.set()
+    assert await load == 2
+    assert svc.loaded and not svc._partial
+
+
+@pytest.mark.asyncio
+async def test_document_versions_agree_across_copies_with_different_mtimes(tmp_path):
+    import fitz
+    import shutil
+
+    replicas = [tmp_path / "a", tmp_path / "b"]
+    for directory in replicas:
+        directory.mkdir()
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "same content")
+    doc.save(str(replicas[0] / "doc.pdf"))
+    doc.close()
+    shutil.copyfile(replicas[0] / "doc.pdf", replicas[1] / "doc.pdf")
+    os.utime(replicas[1] / "doc.pdf", ns=(1, 1))
+
+    versions = []
+    for directory in replicas:
+        svc = KnowledgeBaseService(str(directory), cache_dir=str(directory / "cache"), ingest_workers=1, corpus_dir="")
+        await svc.load()
+        versions.append(svc.document_versions([str(directory / "doc.pdf")])[str(directory / "doc.pdf")])
+    assert versions[0] and versions[0] == versions[1]
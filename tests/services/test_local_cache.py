@@ -0,0 +1,131 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.local_cache import LocalLRUCache, TieredCacheService
+from tests.fakes import FakeRedisService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LocalLRUCache(max_entries=2)
+    cache.set("a", "1", 60)
+    cache.set("b", "2", 60)
+    assert cache.get("a") == "1"
+    cache.set("c", "3", 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats.evictions == 1
+
+
+def test_lru_respects_memory_budget():
+    cache = LocalLRUCache(max_bytes=2000)
+    for i in range(10):
+        cache.set(f"k{i}", "x" * 500, 60)
+    assert cache.bytes <= 2000
+    assert len(cache) < 10
+    cache.set("huge", "x" * 5000, 60)
+    assert cache.get("huge") is None
+
+
+def test_lru_expires_entries():
+    clock = FakeClock()
+    cache = LocalLRUCache(clock=clock)
+    cache.set("a", "1", 10)
+    clock.now = 9.9
+    assert cache.get("a") == "1"
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_hot_reads_skip_redis():
+    redis = FakeRedisService()
+    await redis.set_value("q", "answer", 60)
+    tiered = TieredCacheService(redis)
+    redis.get_value_with_ttl = AsyncMock(wraps=redis.get_value_with_ttl)
+
+    assert await tiered.get_value("q") == "answer"
+    assert await tiered.get_value("q") == "answer"
+    assert await tiered.get_value("q") == "answer"
+
+    redis.get_value_with_ttl.assert_awaited_once()
+    assert tiered.local.stats.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_local_ttl_follows_redis_ttl():
+    redis = FakeRedisService()
+    await redis.set_value("q", "answer", 0.05)
+    tiered = TieredCacheService(redis)
+    assert await tiered.get_value("q") == "answer"
+    await asyncio.sleep(0.06)
+    assert await tiered.get_value("q") is None
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_other_replicas():
+    redis = FakeRedisService()
+    replica_a, replica_b = TieredCacheService(redis), TieredCacheService(redis)
+    await replica_a.start()
+    await replica_b.start()
+    await asyncio.sleep(0)
+
+    await replica_a.set_value("q", "v1", 60)
+    assert await replica_b.get_value("q") == "v1"
+    await replica_a.set_value("q", "v2", 60)
+    await asyncio.sleep(0)
+
+    assert await replica_b.get_value("q") == "v2"
+    assert replica_b.local.stats.invalidations == 1
+    # The writer keeps its own fresh copy
+    assert replica_a.local.stats.invalidations == 0
+
+    await replica_a.close()
+    await replica_b.close()
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_a_fill_keeps_the_old_value_out_of_the_local_tier():
+    redis = FakeRedisService()
+    await redis.set_value("q", "v1", 60)
+    tiered = TieredCacheService(redis)
+    read_started, invalidated = asyncio.Event(), asyncio.Event()
+    read = redis.get_value_with_ttl
+
+    async def slow_read(key):
+        result = await read(key)  # Reads v1...
+        read_started.set()
+        await invalidated.wait()  # ...while another replica writes v2 and broadcasts
+        return result
+    redis.get_value_with_ttl = slow_read
+
+    fill = asyncio.create_task(tiered.get_value("q"))
+    await read_started.wait()
+    await redis.set_value("q", "v2", 60)
+    tiered._on_invalidation(json.dumps({"key": "q", "origin": "other-replica"}))
+    invalidated.set()
+    assert await fill == "v1"
+    assert tiered.local.get("q") is None
+    redis.get_value_with_ttl = read
+    assert await tiered.get_value("q") == "v2"
+    assert tiered._fills == {}
+
+
+@pytest.mark.asyncio
+async def test_delegates_other_calls_to_redis():
+    redis = FakeRedisService()
+    tiered = TieredCacheService(redis)
+    assert await tiered.acquire_lock("lease", "t", 5)
+    await tiered.add_to_sets(["s"], "m", 60)
+    assert await tiered.get_set_members(["s"]) == [{"m"}]
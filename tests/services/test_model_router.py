@@ -0,0 +1,59 @@
+import pytest
+
+from app.services.model_router import ModelRouter, Route, RoutingRule
+
+DEFAULT = Route(name="default", model="gpt-4o-mini", max_tokens=500, temperature=0.7)
+
+POLICY = """[
+  {"name": "fast", "model": "fast-model", "max_tokens": 200, "max_context_tokens": 1000, "min_score": 5},
+  {"name": "deep", "model": "large-model", "min_context_tokens": 4000, "temperature": 0.2}
+]"""
+
+
+def test_first_matching_rule_wins():
+    router = ModelRouter.from_policy(POLICY, DEFAULT)
+    assert router.route(10, 800, top_score=9.0) == Route("fast", "fast-model", 200, 0.7)
+    assert router.route(10, 5000, top_score=9.0) == Route("deep", "large-model", 500, 0.2)
+    # Short context but weak (or unknown) retrieval score: default tier
+    assert router.route(10, 800, top_score=2.0) == DEFAULT
+    assert router.route(10, 800) == DEFAULT
+    assert router.snapshot()["routes"] == {"fast": 1, "deep": 1, "default": 2}
+
+
+def test_question_limit():
+    router = ModelRouter(DEFAULT, [RoutingRule(name="short", model="fast-model", max_question_tokens=20)])
+    assert router.route(15, 3000).name == "short"
+    assert router.route(25, 3000).name == "default"
+
+
+def test_empty_policy_routes_everything_to_the_default():
+    router = ModelRouter.from_policy("", DEFAULT)
+    assert router.rules == []
+    assert router.route(1000, 100000, top_score=100) == DEFAULT
+
+
+@pytest.mark.parametrize("policy", [
+    "not json",
+    '{"model": "x"}',
+    '[{"name": "no model"}]',
+    '[{"model": "x", "max_context": 10}]',
+])
+def test_invalid_policies_are_rejected(policy):
+    with pytest.raises(ValueError):
+        ModelRouter.from_policy(policy, DEFAULT)
+
+
+def test_records_latency_and_usage_per_model():
+    class Usage:
+        prompt_tokens = 900
+        completion_tokens = 120
+
+    router = ModelRouter(DEFAULT)
+    router.record(DEFAULT, 0.8, Usage())
+    router.record(DEFAULT, 1.2, Usage())
+    router.record(DEFAULT, 5.0, failed=True)
+    stats = router.snapshot()["models"]["gpt-4o-mini"]
+    assert stats["requests"] == 3 and stats["failures"] == 1
+    assert stats["prompt_tokens"] == 1800 and stats["completion_tokens"] == 240
+    assert stats["average_completion_tokens"] == 120
+    assert stats["p50_seconds"] == 1.2 and stats["p95_seconds"] == 1.2
@@ -64,18 +64,109 @@ class TestOpenAIService:
         with patch.object(openai_service.client.chat.completions, 'create', new=AsyncMock(side_effect=APIError("Rate limit exceeded", request=mock_request, body={}))):
             question = "What is the capital of France?"
             context = "Paris is the capital of France."
-            answer = await openai_service.get_answer(question, context)
-
-            assert answer is None 
+            with pytest.raises(APIError):
+                await openai_service.get_answer(question, context)
 
     @pytest.mark.asyncio
     async def test_get_answer_generic_exception(self, openai_service):
         """Tests handling of a generic exception during API call."""
         with patch.object(openai_service.client.chat.completions, 'create', new=AsyncMock(side_effect=Exception("unexpected"))), \
-             patch('logging.error') as mock_log_error:
+             patch('app.services.openai_service.logger.error') as mock_log_error:
             question = "What is the capital of Mars?"
             context = "Mars has no capital."
-            answer = await openai_service.get_answer(question, context)
-            assert answer is None
+            with pytest.raises(Exception, match="unexpected"):
+                await openai_service.get_answer(question, context)
             mock_log_error.assert_called_once()
-            assert "An unexpected error occurred" in mock_log_error.call_args[0][0] 
\ No newline at end of file
+            assert "An unexpected error occurred" in mock_log_error.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_stream_answer_yields_deltas(self, openai_service):
+        """Tests that streamed chunks are yielded as text deltas, skipping empty ones."""
+        from unittest.mock import MagicMock
+
+        def chunk(content):
+            return MagicMock(choices=[MagicMock(delta=MagicMock(content=content))], usage=None)
+
+        usage = MagicMock(prompt_tokens=12, completion_tokens=3, total_tokens=15)
+
+        async def stream():
+            for item in [chunk("Paris "), chunk(None), chunk("is the capital."), MagicMock(choices=[], usage=usage)]:
+                yield item
+
+        with patch.object(openai_service.client.chat.completions, 'create', new=AsyncMock(return_value=stream())) as mock_create:
+            deltas = [d async for d in openai_service.stream_answer("Capital?", "ctx")]
+
+        assert deltas == ["Paris ", "is the capital."]
+        assert mock_create.call_args.kwargs["stream"] is True
+
+
+    @pytest.mark.asyncio
+    async def test_get_answer_propagates_admission_rejection(self):
+        """Tests that an over-budget request is rejected before calling the API."""
+        from app.services.admission import AdmissionController, AdmissionRejected
+
+        admission = AdmissionController(rpm_limit=1, max_queue_wait=0.01)
+        service = OpenAIService(admission=admission)
+        service._estimate_tokens = lambda messages, max_tokens: 100
+        response = AsyncMock()
+        response.choices = [AsyncMock(message=AsyncMock(content="ok"))]
+        response.usage.total_tokens = 80
+
+        with patch.object(service.client.chat.completions, 'create', new=AsyncMock(return_value=response)) as mock_create:
+            assert await service.get_answer("q", "ctx") == "ok"
+            with pytest.raises(AdmissionRejected):
+                await service.get_answer("q", "ctx")
+
+        mock_create.assert_awaited_once()
+        assert admission.stats.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_router_picks_model_and_budget_per_request():
+    """Tests that each request uses its route's settings and is recorded on that model."""
+    from unittest.mock import MagicMock
+    from app.services.context_packer import Candidate, PackedContext
+    from app.services.model_router import ModelRouter, Route, RoutingRule
+
+    router = ModelRouter(
+        Route(name="default", model="large-model", max_tokens=800, temperature=0.5),
+        [RoutingRule(name="fast", model="fast-model", max_tokens=150, max_context_tokens=200, min_score=5)],
+    )
+    service = OpenAIService(client=MagicMock(), router=router)
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content="ok"))]
+    response.usage = MagicMock(prompt_tokens=90, completion_tokens=10, total_tokens=100)
+    service.client.chat.completions.create = AsyncMock(return_value=response)
+
+    strong = PackedContext(chunks=[Candidate(text="ctx", tokens=50, score=9.0)], tokens=50)
+    weak = PackedContext(chunks=[Candidate(text="ctx", tokens=50, score=1.0)], tokens=50)
+    with patch('app.utils.tokens.count_tokens', lambda text: len(text.split())):
+        assert await service.get_answer("Short question?", strong.text, retrieval=strong) == "ok"
+        assert await service.get_answer("Short question?", weak.text, retrieval=weak) == "ok"
+
+    calls = service.client.chat.completions.create.call_args_list
+    assert [(c.kwargs["model"], c.kwargs["max_tokens"], c.kwargs["temperature"]) for c in calls] == [
+        ("fast-model", 150, 0.5), ("large-model", 800, 0.5)]
+    models = router.snapshot()["models"]
+    assert models["fast-model"]["requests"] == 1 and models["fast-model"]["completion_tokens"] == 10
+    assert models["large-model"]["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_answer_records_usage_on_the_routed_model():
+    """Tests that a streamed answer's usage and latency are recorded for its model."""
+    from unittest.mock import MagicMock
+    from app.services.model_router import ModelRouter, Route
+
+    router = ModelRouter(Route(name="default", model="stream-model", max_tokens=300, temperature=0.7))
+    service = OpenAIService(client=MagicMock(), router=router)
+    usage = MagicMock(prompt_tokens=40, completion_tokens=2, total_tokens=42)
+
+    async def stream():
+        yield MagicMock(choices=[MagicMock(delta=MagicMock(content="Hi"))], usage=None)
+        yield MagicMock(choices=[], usage=usage)
+
+    service.client.chat.completions.create = AsyncMock(return_value=stream())
+    assert [d async for d in service.stream_answer("q", "ctx")] == ["Hi"]
+    assert service.client.chat.completions.create.call_args.kwargs["max_tokens"] == 300
+    assert router.snapshot()["models"]["stream-model"]["prompt_tokens"] == 40
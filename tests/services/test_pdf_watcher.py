@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from app.services.pdf_watcher import PDFDirectoryWatcher, scan_directory
+
+
+class Recorder:
+    def __init__(self):
+        self.changed = []
+        self.removed = []
+
+    async def on_change(self, path):
+        self.changed.append(os.path.basename(path))
+
+    async def on_remove(self, path):
+        self.removed.append(os.path.basename(path))
+
+
+def make_watcher(directory, recorder, initial=None):
+    return PDFDirectoryWatcher(
+        str(directory),
+        on_change=recorder.on_change,
+        on_remove=recorder.on_remove,
+        initial=initial,
+        use_notifications=False,
+    )
+
+
+def test_scan_directory_only_lists_pdfs(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"x")
+    (tmp_path / "b.txt").write_bytes(b"x")
+    (tmp_path / "sub.pdf").mkdir()
+    assert list(scan_directory(str(tmp_path))) == [str(tmp_path / "a.pdf")]
+
+
+@pytest.mark.asyncio
+async def test_added_file_reported_once_settled(tmp_path):
+    recorder = Recorder()
+    watcher = make_watcher(tmp_path, recorder)
+    (tmp_path / "new.pdf").write_bytes(b"partial")
+    await watcher.sync()
+    assert recorder.changed == []  # not settled yet
+    await watcher.sync()
+    assert recorder.changed == ["new.pdf"]
+    await watcher.sync()
+    assert recorder.changed == ["new.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_modified_and_removed_files(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"v1")
+    recorder = Recorder()
+    watcher = make_watcher(tmp_path, recorder, initial=scan_directory(str(tmp_path)))
+    await watcher.sync()
+    assert recorder.changed == []
+
+    pdf.write_bytes(b"version two")
+    await watcher.sync()
+    await watcher.sync()
+    assert recorder.changed == ["doc.pdf"]
+
+    pdf.unlink()
+    await watcher.sync()
+    assert recorder.removed == ["doc.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_callback_errors_do_not_stop_watcher(tmp_path):
+    async def boom(path):
+        raise RuntimeError("index failure")
+    recorder = Recorder()
+    watcher = PDFDirectoryWatcher(str(tmp_path), boom, recorder.on_remove, use_notifications=False)
+    (tmp_path / "a.pdf").write_bytes(b"x")
+    await watcher.sync()
+    await watcher.sync()
+    (tmp_path / "a.pdf").unlink()
+    await watcher.sync()
+    assert recorder.removed == ["a.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_start_and_stop_poll_loop(tmp_path):
+    recorder = Recorder()
+    watcher = make_watcher(tmp_path, recorder)
+    watcher.poll_interval = 0.01
+    await watcher.start()
+    assert watcher.mode == "poll"
+    await watcher.stop()
@@ -1,5 +1,5 @@
 # Use AsyncMock directly for clearer async mocking
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import pytest_asyncio
@@ -22,6 +22,14 @@ async def mock_redis_client():
     mock.get = AsyncMock()
     mock.setex = AsyncMock()
     mock.close = AsyncMock()
+    mock.ping = AsyncMock()
+    mock.mget = AsyncMock()
+    mock.set = AsyncMock()
+    mock.eval = AsyncMock()
+    mock.xadd = AsyncMock()
+    mock.xgroup_create = AsyncMock()
+    mock.xreadgroup = AsyncMock()
+    mock.xautoclaim = AsyncMock()
     return mock
 
 
@@ -150,6 +158,57 @@ async def test_set_value_client_not_initialized():
             )
 
 
+async def test_get_values_success(redis_service, mock_redis_client):
+    """Test fetching several values in one round trip."""
+    mock_redis_client.mget.return_value = ["a", None]
+    assert await redis_service.get_values(["k1", "k2"]) == ["a", None]
+    mock_redis_client.mget.assert_awaited_once_with(["k1", "k2"])
+
+
+async def test_get_values_redis_error(redis_service, mock_redis_client):
+    """Test that a RedisError during get_values reads as all misses."""
+    mock_redis_client.mget.side_effect = RedisError("MGET failed")
+    assert await redis_service.get_values(["k1", "k2"]) == [None, None]
+
+
+async def test_acquire_lock_uses_set_nx(redis_service, mock_redis_client):
+    """Test that a lease is taken with SET NX and a TTL."""
+    mock_redis_client.set.return_value = True
+    assert await redis_service.acquire_lock("lease", "token", 30) is True
+    mock_redis_client.set.assert_awaited_once_with("lease", "token", nx=True, ex=30)
+
+
+async def test_acquire_lock_held_elsewhere(redis_service, mock_redis_client):
+    """Test that a lease held by someone else is not acquired."""
+    mock_redis_client.set.return_value = None
+    assert await redis_service.acquire_lock("lease", "token", 30) is False
+
+
+async def test_acquire_lock_fails_open(redis_service, mock_redis_client):
+    """Test that a RedisError lets the caller proceed as leader."""
+    mock_redis_client.set.side_effect = RedisError("SET failed")
+    assert await redis_service.acquire_lock("lease", "token", 30) is True
+
+
+async def test_release_lock_checks_token(redis_service, mock_redis_client):
+    """Test that release only deletes the lease through the token check script."""
+    await redis_service.release_lock("lease", "token")
+    args = mock_redis_client.eval.await_args[0]
+    assert args[1:] == (1, "lease", "token")
+
+
+async def test_ping_success(redis_service, mock_redis_client):
+    """Test that ping opens a connection through the client."""
+    assert await redis_service.ping() is True
+    mock_redis_client.ping.assert_awaited_once()
+
+
+async def test_ping_redis_error(redis_service, mock_redis_client):
+    """Test that ping reports an unreachable server as False."""
+    mock_redis_client.ping.side_effect = RedisError("unreachable")
+    assert await redis_service.ping() is False
+
+
 async def test_close_success(redis_service, mock_redis_client):
     """Test that close is called on the underlying client."""
     # The close check is handled in the fixture teardown
@@ -166,3 +225,71 @@ async def test_close_client_already_none():
             await service.close()
             # Check close was not awaited on the (now None) client attribute
             # (No direct assertion needed, just checking no error)
+
+
+async def test_get_value_with_ttl_uses_pipeline(redis_service, mock_redis_client):
+    """Test that value and remaining TTL are read together."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    pipe.execute.return_value = ["answer", 1500]
+    mock_redis_client.pipeline = lambda transaction=False: _AsyncContext(pipe)
+    assert await redis_service.get_value_with_ttl("k") == ("answer", 1.5)
+
+
+async def test_get_value_with_ttl_without_expiry(redis_service, mock_redis_client):
+    """Test that keys without an expiry report no TTL."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    pipe.execute.return_value = ["answer", -1]
+    mock_redis_client.pipeline = lambda transaction=False: _AsyncContext(pipe)
+    assert await redis_service.get_value_with_ttl("k") == ("answer", None)
+
+
+class _AsyncContext:
+    def __init__(self, value):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def test_add_to_stream_trims_approximately(redis_service, mock_redis_client):
+    """Test that stream entries are appended with approximate trimming."""
+    mock_redis_client.xadd.return_value = "1-0"
+    assert await redis_service.add_to_stream("jobs", {"q": "x"}, maxlen=100) == "1-0"
+    mock_redis_client.xadd.assert_awaited_once_with("jobs", {"q": "x"}, maxlen=100, approximate=True)
+
+
+async def test_add_to_stream_redis_error(redis_service, mock_redis_client):
+    """Test that a failed append is reported as None."""
+    mock_redis_client.xadd.side_effect = RedisError("XADD failed")
+    assert await redis_service.add_to_stream("jobs", {"q": "x"}) is None
+
+
+async def test_create_consumer_group_tolerates_existing_group(redis_service, mock_redis_client):
+    """Test that BUSYGROUP (group already exists) counts as success."""
+    mock_redis_client.xgroup_create.side_effect = redis.ResponseError("BUSYGROUP Consumer Group name already exists")
+    assert await redis_service.create_consumer_group("jobs", "workers") is True
+
+
+async def test_read_from_group_flattens_entries(redis_service, mock_redis_client):
+    """Test that entries are read for new messages only and flattened."""
+    mock_redis_client.xreadgroup.return_value = [["jobs", [("1-0", {"q": "a"}), ("2-0", {"q": "b"})]]]
+    entries = await redis_service.read_from_group("jobs", "workers", "w1", count=2, block_ms=100)
+    assert entries == [("1-0", {"q": "a"}), ("2-0", {"q": "b"})]
+    mock_redis_client.xreadgroup.assert_awaited_once_with("workers", "w1", {"jobs": ">"}, count=2, block=100)
+
+
+async def test_claim_idle_messages_skips_deleted_entries(redis_service, mock_redis_client):
+    """Test that entries deleted from the stream while pending are not returned."""
+    mock_redis_client.xautoclaim.return_value = ["0-0", [("1-0", {"q": "a"}), ("2-0", None)], []]
+    assert await redis_service.claim_idle_messages("jobs", "workers", "w2", 60000, 10) == [("1-0", {"q": "a"})]
+
+
+async def test_read_from_group_reports_redis_errors(redis_service, mock_redis_client):
+    """Test that a failed read is distinguishable from an empty one."""
+    mock_redis_client.xreadgroup.side_effect = redis.ConnectionError("down")
+    assert await redis_service.read_from_group("jobs", "workers", "w1", count=2, block_ms=100) is None
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+import openai
+from openai import AsyncOpenAI
+
+from app.services.openai_service import OpenAIService
+from app.services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, ResilientCaller, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeOpenAIServer:
+    """Scripted chat completions endpoint behind an httpx MockTransport."""
+    def __init__(self, statuses, delays=None):
+        self.statuses = list(statuses)
+        self.delays = list(delays or [])
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        index = self.requests
+        self.requests += 1
+        if index < len(self.delays):
+            await asyncio.sleep(self.delays[index])
+        status = self.statuses[min(index, len(self.statuses) - 1)]
+        if status != 200:
+            return httpx.Response(status, json={"error": {"message": f"status {status}", "type": "server_error"}})
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{index}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"answer {index}"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        })
+
+    def client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="test", base_url="http://fake-openai/v1", max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self)),
+        )
+
+
+def make_service(server, **caller_options):
+    caller_options.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0))
+    return OpenAIService(client=server.client(), resilience=ResilientCaller(**caller_options))
+
+
+def test_retry_delay_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=3.0, rng=random.Random(0))
+    delays = [policy.delay(attempt) for attempt in range(10)]
+    assert all(0 <= d <= 3.0 for d in delays)
+    assert len(set(delays)) == len(delays)
+
+
+def test_circuit_breaker_half_opens_after_reset_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 20
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_circuit_admits_a_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow() and not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_during_probe_fail_fast():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    caller = ResilientCaller(retry=RetryPolicy(max_attempts=1), breaker=breaker)
+    release = asyncio.Event()
+    calls = 0
+
+    async def probe():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "ok"
+
+    first = asyncio.create_task(caller.call(probe, hedge=False))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await caller.call(probe, hedge=False)
+    release.set()
+    assert await first == "ok"
+    assert calls == 1 and breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_against_fake_server():
+    server = FakeOpenAIServer([500, 503, 200])
+    service = make_service(server)
+    assert await service.get_answer("q", "ctx") == "answer 2"
+    assert server.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    server = FakeOpenAIServer([400])
+    service = make_service(server)
+    with pytest.raises(openai.BadRequestError):
+        await service.get_answer("q", "ctx")
+    assert server.requests == 1
+    assert service.resilience.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_fails_fast():
+    server = FakeOpenAIServer([500])
+    service = make_service(server, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    with pytest.raises(openai.InternalServerError):
+        await service.get_answer("q", "ctx")
+    assert server.requests == 3
+    with pytest.raises(CircuitOpenError):
+        await service.get_answer("q", "ctx")
+    assert server.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_hedges_slow_request():
+    server = FakeOpenAIServer([200], delays=[1.0, 0.0])
+    latency = LatencyTracker()
+    for _ in range(20):
+        latency.record(0.01)
+    service = make_service(server, hedge_percentile=0.95, latency=latency)
+
+    answer = await asyncio.wait_for(service.get_answer("q", "ctx"), timeout=0.5)
+
+    assert answer == "answer 1"
+    assert service.resilience.hedges == 1
+    assert server.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_admission_wait_does_not_trigger_a_hedge():
+    from app.services.admission import AdmissionController
+
+    server = FakeOpenAIServer([200])
+    latency = LatencyTracker()
+    for _ in range(20):
+        latency.record(0.01)
+    service = make_service(server, hedge_percentile=0.95, latency=latency)
+    service.admission = AdmissionController(max_concurrency=1)
+    service._estimate_tokens = lambda messages, max_tokens: 10
+    release = asyncio.Event()
+
+    async def hold_slot():
+        async with service.admission.admit(10):
+            await release.wait()
+
+    holder = asyncio.create_task(hold_slot())
+    await asyncio.sleep(0)
+    answer = asyncio.create_task(service.get_answer("q", "ctx"))
+    await asyncio.sleep(0.2)  # Queued far longer than the hedge delay
+    release.set()
+    assert await answer == "answer 0"
+    await holder
+    assert service.resilience.hedges == 0
+    assert server.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_enough_samples():
+    server = FakeOpenAIServer([200], delays=[0.05])
+    service = make_service(server, hedge_percentile=0.95)
+    assert await service.get_answer("q", "ctx") == "answer 0"
+    assert service.resilience.hedges == 0
+    assert len(service.resilience.latency) == 1
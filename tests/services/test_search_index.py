@@ -0,0 +1,44 @@
+from app.services.search_index import BM25Index, tokenize
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I reset my Password?") == ["reset", "password"]
+
+
+def test_search_ranks_by_bm25():
+    index = BM25Index()
+    index.add_document("a.pdf", [
+        "password reset steps: open settings and choose reset password",
+        "the office is closed on public holidays",
+    ])
+    index.add_document("b.pdf", ["a password is required to log in"])
+    hits = index.search("how do I reset my password", k=5)
+    texts = [index.get_chunk(chunk_id).text for chunk_id, _ in hits]
+    assert texts[0].startswith("password reset steps")
+    assert "the office is closed on public holidays" not in texts
+    assert all(score > 0 for _, score in hits)
+
+
+def test_stopword_only_query_matches_nothing():
+    index = BM25Index()
+    index.add_document("a.pdf", ["this is a chunk", "is it here"])
+    assert index.search("is a", k=5) == []
+
+
+def test_search_respects_k():
+    index = BM25Index()
+    index.add_document("a.pdf", [f"widget number {i}" for i in range(20)])
+    assert len(index.search("widget", k=3)) == 3
+
+
+def test_replace_and_remove_document():
+    index = BM25Index()
+    index.add_document("a.pdf", ["old alpha text"])
+    index.add_document("b.pdf", ["beta text"])
+    index.add_document("a.pdf", ["new gamma text"])
+    assert index.search("alpha") == []
+    assert len(index.search("gamma")) == 1
+    index.remove_document("a.pdf")
+    assert index.search("gamma") == []
+    assert index.documents == ["b.pdf"]
+    assert len(index) == 1
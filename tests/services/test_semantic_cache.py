@@ -0,0 +1,53 @@
+import pytest
+
+from app.services.semantic_cache import MinHasher, SemanticAnswerCache, question_features
+from tests.fakes import FakeRedisService
+
+
+def test_question_features_keep_question_words():
+    assert question_features("how do i reset my password") == ["how", "reset", "password"]
+    assert question_features("who can reset my password") == ["who", "reset", "password"]
+
+
+def test_minhash_similarity_estimates_jaccard():
+    hasher = MinHasher(num_perm=128)
+    a = hasher.signature(["alpha", "beta", "gamma", "delta"])
+    b = hasher.signature(["alpha", "beta", "gamma", "epsilon"])
+    assert MinHasher.similarity(a, a) == 1.0
+    assert 0.3 < MinHasher.similarity(a, b) < 0.9  # true Jaccard is 0.6
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_question_hits():
+    cache = SemanticAnswerCache(FakeRedisService())
+    await cache.store("how do i reset my password", "key-1", ttl_seconds=60)
+    match = await cache.lookup("how can i reset my password")
+    assert match is not None
+    assert match[0] == "key-1" and match[1] >= 0.85
+
+
+@pytest.mark.asyncio
+async def test_different_question_misses():
+    cache = SemanticAnswerCache(FakeRedisService())
+    await cache.store("how do i reset my password", "key-1", ttl_seconds=60)
+    assert await cache.lookup("who can reset my password") is None
+    assert await cache.lookup("what is the vacation policy") is None
+
+
+@pytest.mark.asyncio
+async def test_threshold_is_configurable():
+    redis = FakeRedisService()
+    strict = SemanticAnswerCache(redis, threshold=1.0)
+    loose = SemanticAnswerCache(redis, threshold=0.3)
+    await strict.store("vacation policy for contractors", "key-1", ttl_seconds=60)
+    assert await strict.lookup("vacation policy for employees") is None
+    assert (await loose.lookup("vacation policy for employees"))[0] == "key-1"
+
+
+@pytest.mark.asyncio
+async def test_stopword_only_question_is_not_cached():
+    redis = FakeRedisService()
+    cache = SemanticAnswerCache(redis)
+    await cache.store("is it", "key-1", ttl_seconds=60)
+    assert redis.values == {}
+    assert await cache.lookup("is it") is None
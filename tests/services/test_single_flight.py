@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+from tests.fakes import FakeRedisService
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "answer"
+
+    tasks = [asyncio.create_task(flight.do("key", work)) for _ in range(10)]
+    await asyncio.sleep(0)
+    assert flight.inflight == 1
+    release.set()
+    assert await asyncio.gather(*tasks) == ["answer"] * 10
+    assert calls == 1
+    assert flight.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail():
+        await release.wait()
+        raise RuntimeError("boom")
+
+    tasks = [asyncio.create_task(flight.do("key", fail)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flight.do("key", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_follower_waits_for_leader_on_another_replica():
+    redis = FakeRedisService()
+    leader, follower = SingleFlight(redis), SingleFlight(redis, poll_interval=0.01)
+    release = asyncio.Event()
+    follower_calls = 0
+
+    async def lead():
+        await release.wait()
+        await redis.set_value("answer:key", "from leader", 60)
+        return "from leader"
+
+    async def follow():
+        nonlocal follower_calls
+        follower_calls += 1
+        return "from follower"
+
+    async def fetch():
+        return await redis.get_value("answer:key")
+
+    leader_task = asyncio.create_task(leader.do("key", lead, fetch))
+    await asyncio.sleep(0)
+    follower_task = asyncio.create_task(follower.do("key", follow, fetch))
+    await asyncio.sleep(0.03)
+    release.set()
+
+    assert await leader_task == "from leader"
+    assert await follower_task == "from leader"
+    assert follower_calls == 0
+    assert await redis.acquire_lock("singleflight:key", "t", 1)
+
+
+@pytest.mark.asyncio
+async def test_follower_computes_after_wait_timeout():
+    redis = FakeRedisService()
+    await redis.acquire_lock("singleflight:key", "someone-else", 60)
+    flight = SingleFlight(redis, poll_interval=0.01, wait_timeout=0.03)
+
+    async def work():
+        return "local"
+
+    async def fetch():
+        return None
+
+    assert await flight.do("key", work, fetch) == "local"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "answer"
+
+    leader = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    # The leader's call was abandoned; exactly one follower repeats it, the others wait for that one
+    assert leader.cancelled()
+    assert calls == 2 and flight.inflight == 1
+    release.set()
+    assert await asyncio.gather(*followers) == ["answer"] * 3
+    assert calls == 2
+    assert flight.inflight == 0
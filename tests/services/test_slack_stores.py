@@ -0,0 +1,148 @@
+from types import SimpleNamespace
+
+import pytest
+from slack_sdk.oauth.installation_store import Installation
+
+from app.services.slack_stores import RedisInstallationStore, RedisOAuthStateStore
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeRedisClient:
+    """The handful of redis.asyncio commands the stores use, counting reads."""
+    def __init__(self):
+        self.strings = {}
+        self.hashes = {}
+        self.reads = 0
+
+    async def get(self, key):
+        self.reads += 1
+        return self.strings.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.strings[key] = value
+
+    async def getdel(self, key):
+        return self.strings.pop(key, None)
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def hget(self, key, field):
+        self.reads += 1
+        return self.hashes.get(key, {}).get(field)
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+    async def delete(self, key):
+        self.strings.pop(key, None)
+        self.hashes.pop(key, None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def installation(user_id="U1", bot_token="xoxb-1"):
+    return Installation(app_id="A1", team_id="T1", user_id=user_id, bot_token=bot_token, bot_id="B1",
+                        bot_user_id="UB1", bot_scopes=["commands"])
+
+
+def make_store(cache_ttl=30.0):
+    client = FakeRedisClient()
+    clock = Clock()
+    store = RedisInstallationStore(SimpleNamespace(redis_client=client), cache_ttl=cache_ttl, clock=clock)
+    return store, client, clock
+
+
+async def test_saved_installation_and_bot_are_found():
+    store, _, _ = make_store()
+    await store.async_save(installation())
+
+    found = await store.async_find_installation(enterprise_id=None, team_id="T1")
+    bot = await store.async_find_bot(enterprise_id=None, team_id="T1")
+
+    assert found.bot_token == "xoxb-1" and found.user_id == "U1"
+    assert bot.bot_token == "xoxb-1" and bot.bot_user_id == "UB1"
+    assert await store.async_find_installation(enterprise_id=None, team_id="T2") is None
+
+
+async def test_lookups_are_served_from_the_local_cache_until_the_ttl():
+    store, client, clock = make_store(cache_ttl=30)
+    await store.async_save(installation())
+
+    for _ in range(5):
+        await store.async_find_installation(enterprise_id=None, team_id="T1")
+    assert client.reads == 1
+
+    clock.now = 31
+    await store.async_find_installation(enterprise_id=None, team_id="T1")
+    assert client.reads == 2
+
+
+async def test_installation_saved_by_another_replica_is_found_at_once():
+    store, client, clock = make_store(cache_ttl=30)
+    other = RedisInstallationStore(SimpleNamespace(redis_client=client), cache_ttl=30, clock=clock)
+    assert await store.async_find_bot(enterprise_id=None, team_id="T1") is None
+
+    await other.async_save(installation())
+
+    assert (await store.async_find_bot(enterprise_id=None, team_id="T1")).bot_token == "xoxb-1"
+
+
+async def test_save_replaces_the_cached_installation():
+    store, _, _ = make_store()
+    await store.async_save(installation(bot_token="xoxb-old"))
+    await store.async_find_bot(enterprise_id=None, team_id="T1")
+
+    await store.async_save(installation(bot_token="xoxb-new"))
+
+    assert (await store.async_find_bot(enterprise_id=None, team_id="T1")).bot_token == "xoxb-new"
+
+
+async def test_user_installation_gets_the_latest_bot_token():
+    store, _, _ = make_store()
+    await store.async_save(installation(user_id="U1", bot_token="xoxb-old"))
+    await store.async_save(installation(user_id="U2", bot_token="xoxb-new"))
+
+    found = await store.async_find_installation(enterprise_id=None, team_id="T1", user_id="U1")
+
+    assert found.user_id == "U1" and found.bot_token == "xoxb-new"
+
+
+async def test_delete_installation_and_bot():
+    store, _, _ = make_store()
+    await store.async_save(installation())
+    await store.async_find_installation(enterprise_id=None, team_id="T1")
+
+    await store.async_delete_installation(enterprise_id=None, team_id="T1")
+    await store.async_delete_bot(enterprise_id=None, team_id="T1")
+
+    assert await store.async_find_installation(enterprise_id=None, team_id="T1") is None
+    assert await store.async_find_bot(enterprise_id=None, team_id="T1") is None
+
+
+async def test_oauth_state_is_consumed_once():
+    store = RedisOAuthStateStore(SimpleNamespace(redis_client=FakeRedisClient()))
+
+    state = await store.async_issue()
+
+    assert await store.async_consume(state) is True
+    assert await store.async_consume(state) is False
+    assert await store.async_consume("never-issued") is False
+
+
+async def test_stores_resolve_a_lazy_redis_service():
+    client = FakeRedisClient()
+    services = {}
+    store = RedisOAuthStateStore(lambda: services.get("redis"))
+    with pytest.raises(RuntimeError):
+        await store.async_issue()
+    services["redis"] = SimpleNamespace(redis_client=client)
+    state = await store.async_issue()
+    assert await store.async_consume(state) is True
@@ -0,0 +1,120 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.services.embeddings import HashingEmbeddingProvider, get_embedding_provider, normalize_rows
+from app.services.vector_index import VectorIndex, load_vectors, save_vectors, text_key
+
+
+@pytest.mark.asyncio
+async def test_hashing_provider_is_deterministic_and_normalised():
+    provider = HashingEmbeddingProvider(dimension=64)
+    a = await provider.embed(["reset my password", "reset my password"])
+    assert a.dtype == np.float32 and a.shape == (2, 64)
+    assert np.allclose(a[0], a[1])
+    assert np.isclose(np.linalg.norm(a[0]), 1.0)
+
+
+@pytest.mark.asyncio
+async def test_hashing_provider_relates_paraphrases():
+    provider = HashingEmbeddingProvider()
+    q, near, far = await provider.embed([
+        "how can I reset my password",
+        "steps for resetting a forgotten password",
+        "cafeteria lunch menu",
+    ])
+    assert q @ near > q @ far
+
+
+@pytest.mark.asyncio
+async def test_hashing_provider_embeds_off_the_event_loop(monkeypatch):
+    import threading
+    provider = HashingEmbeddingProvider(dimension=16)
+    embed_sync = provider.embed_sync
+    threads = []
+    monkeypatch.setattr(provider, "embed_sync", lambda texts: threads.append(threading.get_ident()) or embed_sync(texts))
+    assert (await provider.embed(["reset password"])).shape == (1, 16)
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_provider_interface_is_abstract():
+    from app.services.embeddings import EmbeddingProvider
+    with pytest.raises(TypeError):
+        EmbeddingProvider()
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        get_embedding_provider("nope")
+
+
+def test_search_returns_best_first():
+    index = VectorIndex(3)
+    index.add([10, 11, 12], normalize_rows(np.array([[1, 0, 0], [0, 1, 0], [1, 1, 0]])))
+    hits = index.search(np.array([1, 0, 0], dtype=np.float32), k=2)
+    assert [chunk_id for chunk_id, _ in hits] == [10, 12]
+    assert hits[0][1] == pytest.approx(1.0)
+
+
+def test_remove_masks_rows_and_compacts():
+    index = VectorIndex(2)
+    index.add([1, 2, 3], normalize_rows(np.array([[1, 0], [0.9, 0.1], [0, 1]])))
+    index.remove([1])
+    assert [c for c, _ in index.search(np.array([1, 0]), k=3)] == [2, 3]
+    index.remove([2])
+    assert len(index) == 1 and len(index._ids) == 1  # compacted
+
+
+def test_persisted_vectors_are_memory_mapped(tmp_path):
+    keys = [text_key("a"), text_key("b")]
+    matrix = normalize_rows(np.array([[1, 0], [0, 1]]))
+    save_vectors(str(tmp_path), keys, matrix)
+    loaded_keys, loaded = load_vectors(str(tmp_path))
+    assert loaded_keys == keys
+    assert isinstance(loaded, np.memmap)
+    index = VectorIndex.from_arrays([7, 8], loaded)
+    assert index.is_memory_mapped
+    assert index.search(np.array([0, 1]), k=1)[0][0] == 8
+    # Updates go to the in-memory delta segment; the read-only map is neither written nor copied
+    index.add([9], np.array([[0.8, 0.6]]))
+    index.add([8], np.array([[0.6, 0.8]]))
+    assert index.is_memory_mapped and len(index) == 3
+    assert [c for c, _ in index.search(np.array([1, 0]), k=3)] == [7, 9, 8]
+    index.remove([7, 9])
+    assert not index.is_memory_mapped and len(index._ids) == 1  # compacted into memory
+    assert index.search(np.array([1, 0]), k=3)[0][0] == 8
+
+
+def test_interrupted_save_keeps_keys_and_vectors_paired(tmp_path, monkeypatch):
+    old_keys, new_keys = [text_key("a"), text_key("b")], [text_key("a"), text_key("c")]
+    save_vectors(str(tmp_path), old_keys, np.array([[1, 0], [0, 1]], dtype=np.float32))
+
+    def crash(directory, version):
+        raise OSError("disk full")
+    # Same row count: only the CURRENT switch tells the two builds apart
+    monkeypatch.setattr('app.services.vector_index.write_current', crash)
+    with pytest.raises(OSError):
+        save_vectors(str(tmp_path), new_keys, np.array([[1, 0], [0.6, 0.8]], dtype=np.float32))
+    keys, matrix = load_vectors(str(tmp_path))
+    assert keys == old_keys and matrix[1].tolist() == [0, 1]
+
+    monkeypatch.undo()
+    save_vectors(str(tmp_path), new_keys, np.array([[1, 0], [0.6, 0.8]], dtype=np.float32))
+    keys, matrix = load_vectors(str(tmp_path))
+    assert keys == new_keys and matrix[1] == pytest.approx([0.6, 0.8])
+
+
+def test_load_vectors_missing_dir(tmp_path):
+    assert load_vectors(str(tmp_path / "none")) is None
+
+
+def test_top_k_over_100k_rows_is_fast():
+    rng = np.random.default_rng(0)
+    matrix = normalize_rows(rng.standard_normal((100_000, 128)).astype(np.float32))
+    index = VectorIndex.from_arrays(range(100_000), matrix)
+    index.search(matrix[0], k=10)
+    started = time.perf_counter()
+    hits = index.search(matrix[42], k=10)
+    assert hits[0][0] == 42
+    assert time.perf_counter() - started < 0.5
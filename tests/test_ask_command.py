@@ -1,24 +1,60 @@
+import hashlib
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from app.handlers.ask_command import handle_ask_command
+from app.services.admission import AdmissionRejected
+from app.services.resilience import CircuitOpenError
+from app.services.answer_cache import decode_entry
+from app.services.container import ServiceContainer
+from app.services.context_packer import Candidate, PackedContext
+from app.services.semantic_cache import SemanticAnswerCache
+from app.services.single_flight import SingleFlight
+from tests.fakes import FakeRedisService
+
+
+@pytest.fixture(autouse=True)
+def no_streaming():
+    """Most tests exercise the single-response path."""
+    with patch('app.handlers.ask_command.config.OPENAI_STREAMING', False):
+        yield
+
+
+def packed(text, doc_id='/pdfs/handbook.pdf'):
+    """A retrieval result with one chunk from `doc_id`."""
+    return PackedContext(chunks=[Candidate(text=text, tokens=1, score=1.0, doc_id=doc_id)], tokens=1, score=1.0)
+
+
+def make_services(redis_service=None):
+    """Builds a service container backed by mocks (and optionally a fake Redis)."""
+    kb_service = MagicMock()
+    kb_service.document_versions = lambda doc_ids: {doc_id: 'v1' for doc_id in doc_ids}
+    kb_service.corpus_version = 'corpus-v1'
+    services = ServiceContainer(
+        redis_service=redis_service or MagicMock(),
+        kb_service=kb_service,
+        openai_service=MagicMock(),
+    )
+    services.semantic_cache = None
+    services.single_flight = SingleFlight()
+    return services
+
 
 @pytest.mark.asyncio
-@patch('app.handlers.ask_command.RedisService')
-@patch('app.handlers.ask_command.KnowledgeBaseService')
-@patch('app.handlers.ask_command.OpenAIService')
-async def test_handle_ask_command_valid_question(mock_openai, mock_kb, mock_redis):
+@patch('app.handlers.ask_command.logger')
+async def test_handle_ask_command_valid_question(logger):
     ack = AsyncMock()
     respond = AsyncMock()
-    logger = MagicMock()
+    services = make_services()
     command = {'user_id': 'U123', 'text': 'What is AI?'}
 
     # Simulate cache miss and OpenAI answer
-    mock_redis.return_value.get_value = AsyncMock(return_value=None)
-    mock_redis.return_value.set_value = AsyncMock()
-    mock_kb.return_value.find_relevant_context = AsyncMock(return_value='context')
-    mock_openai.return_value.get_answer = AsyncMock(return_value='AI is artificial intelligence.')
+    services.redis_service.get_value = AsyncMock(return_value=None)
+    services.redis_service.set_value = AsyncMock()
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(return_value='AI is artificial intelligence.')
 
-    await handle_ask_command(ack, command, respond, logger)
+    await handle_ask_command(ack, command, respond, services)
 
     ack.assert_awaited_once()
     respond.assert_awaited()
@@ -29,16 +65,18 @@ async def test_handle_ask_command_valid_question(mock_openai, mock_kb, mock_redi
     # Check that logger.info was called with user_id and question
     log_messages = [call[0][0] for call in logger.info.call_args_list]
     assert any('/ask command received' in msg and 'user_id=U123' in msg and 'question=What is AI?' in msg for msg in log_messages)
+    # The answer is cached, plus a long-lived copy served while OpenAI is down
+    cached_keys = [call[0][0] for call in services.redis_service.set_value.await_args_list]
+    assert len(cached_keys) == 2 and cached_keys[1] == f"stale:{cached_keys[0]}"
 
 @pytest.mark.asyncio
-@patch('app.handlers.ask_command.RedisService')
-async def test_handle_ask_command_empty_question(mock_redis):
+async def test_handle_ask_command_empty_question():
     ack = AsyncMock()
     respond = AsyncMock()
-    logger = MagicMock()
+    services = make_services()
     command = {'user_id': 'U123', 'text': ''}
 
-    await handle_ask_command(ack, command, respond, logger)
+    await handle_ask_command(ack, command, respond, services)
 
     ack.assert_awaited_once()
     respond.assert_awaited_once()
@@ -46,41 +84,276 @@ async def test_handle_ask_command_empty_question(mock_redis):
     assert any('Usage:' in block['text']['text'] for block in blocks if block['type'] == 'section')
 
 @pytest.mark.asyncio
-@patch('app.handlers.ask_command.RedisService')
-async def test_handle_ask_command_cache_hit(mock_redis):
+async def test_handle_ask_command_cache_hit():
     ack = AsyncMock()
     respond = AsyncMock()
-    logger = MagicMock()
+    services = make_services()
     command = {'user_id': 'U123', 'text': 'Cached Q?'}
 
-    mock_redis.return_value.get_value = AsyncMock(return_value='Cached answer.')
+    services.redis_service.get_value = AsyncMock(return_value='Cached answer.')
+    services.kb_service.retrieve = AsyncMock()
 
-    await handle_ask_command(ack, command, respond, logger)
+    await handle_ask_command(ack, command, respond, services)
 
     ack.assert_awaited_once()
     respond.assert_awaited_once()
+    services.kb_service.retrieve.assert_not_awaited()
     blocks = respond.call_args[1]['blocks']
     assert any('You asked:' in block['text']['text'] for block in blocks if block['type'] == 'section')
     assert any('Cached answer.' in block['text']['text'] for block in blocks if block['type'] == 'section')
 
 @pytest.mark.asyncio
-@patch('app.handlers.ask_command.RedisService')
-@patch('app.handlers.ask_command.KnowledgeBaseService')
-@patch('app.handlers.ask_command.OpenAIService')
-async def test_handle_ask_command_no_answer(mock_openai, mock_kb, mock_redis):
+async def test_handle_ask_command_no_answer():
     ack = AsyncMock()
     respond = AsyncMock()
-    logger = MagicMock()
+    services = make_services()
     command = {'user_id': 'U123', 'text': 'Unknown Q?'}
 
-    mock_redis.return_value.get_value = AsyncMock(return_value=None)
-    mock_kb.return_value.find_relevant_context = AsyncMock(return_value='context')
-    mock_openai.return_value.get_answer = AsyncMock(return_value=None)
+    services.redis_service.get_value = AsyncMock(return_value=None)
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(return_value=None)
 
-    await handle_ask_command(ack, command, respond, logger)
+    await handle_ask_command(ack, command, respond, services)
 
     ack.assert_awaited_once()
     respond.assert_awaited_once()
     blocks = respond.call_args[1]['blocks']
-    assert any("couldn't find an answer" in block['text']['text'] for block in blocks if block['type'] == 'section')
-    assert any('You asked:' in block['text']['text'] for block in blocks if block['type'] == 'section') 
\ No newline at end of file
+    assert any("couldn't find a specific answer" in block['text']['text'] for block in blocks if block['type'] == 'section')
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_uses_shared_services():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services()
+    services.redis_service.get_value = AsyncMock(return_value='Shared answer.')
+    command = {'user_id': 'U123', 'text': 'Shared?'}
+
+    with patch('app.handlers.ask_command.get_services', return_value=services) as get_services:
+        await handle_ask_command(ack, command, respond)
+        await handle_ask_command(ack, command, respond)
+
+    assert get_services.call_count == 2
+    assert services.redis_service.get_value.await_count == 2
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_semantic_cache_hit():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    redis = FakeRedisService()
+    services = make_services(redis)
+    services.semantic_cache = SemanticAnswerCache(redis)
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(return_value='Use the reset link.')
+
+    await handle_ask_command(ack, {'user_id': 'U1', 'text': 'How do I reset my password'}, respond, services)
+    await handle_ask_command(ack, {'user_id': 'U2', 'text': 'how can I reset my password?'}, respond, services)
+
+    services.openai_service.get_answer.assert_awaited_once()
+    blocks = respond.call_args[1]['blocks']
+    assert any('Use the reset link.' in block['text']['text'] for block in blocks if block['type'] == 'section')
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_coalesces_concurrent_questions():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.single_flight = SingleFlight(services.redis_service)
+    release = asyncio.Event()
+
+    async def slow_answer(question, context, request_id=None, retrieval=None):
+        await release.wait()
+        return 'One answer.'
+
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(side_effect=slow_answer)
+
+    tasks = [asyncio.create_task(handle_ask_command(ack, {'user_id': f'U{i}', 'text': 'Same Q?'}, respond, services))
+             for i in range(5)]
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    services.openai_service.get_answer.assert_awaited_once()
+    assert respond.await_count == 5
+    for call in respond.call_args_list:
+        assert any('One answer.' in block['text']['text'] for block in call[1]['blocks'] if block['type'] == 'section')
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_streams_into_placeholder():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+
+    async def stream_answer(question, context, request_id=None, retrieval=None):
+        for word in ['AI ', 'is ', 'artificial ', 'intelligence.']:
+            yield word
+
+    services.openai_service.stream_answer = stream_answer
+
+    with patch('app.handlers.ask_command.config.OPENAI_STREAMING', True), \
+            patch('app.handlers.ask_command.config.OPENAI_STREAM_UPDATE_INTERVAL', 0), \
+            patch('app.handlers.ask_command.config.SLACK_RESPONSE_MAX_MESSAGES', 3):
+        await handle_ask_command(ack, {'user_id': 'U1', 'text': 'What is AI?'}, respond, services)
+
+    calls = respond.call_args_list
+    # Placeholder, one throttled update, then the final answer replacing it
+    assert len(calls) == 3
+    assert 'Thinking' in calls[0][1]['blocks'][-1]['text']['text']
+    assert all(call[1].get('replace_original') for call in calls[1:])
+    assert calls[-1][1]['blocks'][-1]['text']['text'] == 'AI is artificial intelligence.'
+    cached = await services.redis_service.get_value(hashlib.sha256('what is ai'.encode()).hexdigest())
+    assert decode_entry(cached)[0] == 'AI is artificial intelligence.'
+
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_stream_failure_is_not_cached():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+
+    async def stream_answer(question, context, request_id=None, retrieval=None):
+        yield 'Partial '
+        raise RuntimeError('connection reset')
+
+    services.openai_service.stream_answer = stream_answer
+
+    with patch('app.handlers.ask_command.config.OPENAI_STREAMING', True):
+        await handle_ask_command(ack, {'user_id': 'U1', 'text': 'What is AI?'}, respond, services)
+
+    assert respond.call_args[1]['replace_original'] is True
+    assert "trouble connecting" in respond.call_args[1]['blocks'][0]['text']['text']
+    assert services.redis_service.values == {}
+
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_serves_stale_answer_when_circuit_open():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    cache_key = hashlib.sha256('what is ai'.encode()).hexdigest()
+    await services.redis_service.set_value(f'stale:{cache_key}', 'Old answer.', 3600)
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(side_effect=CircuitOpenError('open'))
+
+    await handle_ask_command(ack, {'user_id': 'U1', 'text': 'What is AI?'}, respond, services)
+
+    text = respond.call_args[1]['blocks'][-1]['text']['text']
+    assert text.startswith('Old answer.') and 'previously saved answer' in text
+    assert await services.redis_service.get_value(cache_key) is None
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_reports_openai_errors_without_streaming():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(side_effect=RuntimeError('upstream 500'))
+
+    with patch('app.handlers.ask_command.config.OPENAI_STREAMING', False):
+        await handle_ask_command(ack, {'user_id': 'U1', 'text': 'What is AI?'}, respond, services)
+
+    assert "trouble connecting" in respond.call_args[1]['blocks'][0]['text']['text']
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_busy_when_admission_rejected():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services()
+    services.redis_service.get_value = AsyncMock(return_value=None)
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(side_effect=AdmissionRejected('queue full'))
+
+    await handle_ask_command(ack, {'user_id': 'U1', 'text': 'Busy?'}, respond, services)
+
+    blocks = respond.call_args[1]['blocks']
+    assert "answering a lot of questions" in blocks[0]['text']['text']
+
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_pdf_change_invalidates_dependent_answers_only():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    versions = {'/pdfs/a.pdf': 'v1', '/pdfs/b.pdf': 'v1'}
+    services = make_services(FakeRedisService())
+    services.kb_service.document_versions = lambda doc_ids: {d: versions.get(d) for d in doc_ids}
+    services.kb_service.retrieve = AsyncMock(side_effect=lambda question, request_id=None: packed(
+        'context', doc_id='/pdfs/a.pdf' if 'vacation' in question else '/pdfs/b.pdf'))
+    services.openai_service.get_answer = AsyncMock(side_effect=lambda q, c, request_id=None, retrieval=None: f'Answer to {q}')
+
+    async def ask(text):
+        await handle_ask_command(ack, {'user_id': 'U1', 'text': text}, respond, services)
+
+    await ask('vacation policy?')
+    await ask('expense policy?')
+    assert services.openai_service.get_answer.await_count == 2
+
+    versions['/pdfs/a.pdf'] = 'v2'
+    await ask('vacation policy?')
+    await ask('expense policy?')
+
+    # Only the answer built from a.pdf was regenerated
+    assert services.openai_service.get_answer.await_count == 3
+    assert [call[0][0] for call in services.openai_service.get_answer.await_args_list] == [
+        'vacation policy?', 'expense policy?', 'vacation policy?']
+
+@pytest.mark.asyncio
+async def test_handle_ask_command_records_stage_metrics():
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(return_value='Metered answer.')
+    before = {stage: sample('slackgpt_ask_stage_seconds_count', stage=stage)
+              for stage in ('ack', 'cache_get', 'retrieval', 'openai', 'cache_set', 'respond')}
+    hits = sample('slackgpt_answer_cache_lookups_total', tier='exact', result='hit')
+
+    await handle_ask_command(ack, {'user_id': 'U1', 'text': 'Metered?'}, respond, services)
+    await handle_ask_command(ack, {'user_id': 'U1', 'text': 'Metered?'}, respond, services)
+
+    assert sample('slackgpt_ask_stage_seconds_count', stage='openai') == before['openai'] + 1
+    assert sample('slackgpt_ask_stage_seconds_count', stage='respond') == before['respond'] + 2
+    assert sample('slackgpt_ask_stage_seconds_count', stage='ack') == before['ack'] + 2
+    assert sample('slackgpt_answer_cache_lookups_total', tier='exact', result='hit') == hits + 1
+    assert sample('slackgpt_ask_in_flight') == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_mode_only_acks_and_enqueues():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.kb_service.retrieve = AsyncMock()
+    command = {'user_id': 'U123', 'text': 'What is AI?', 'response_url': 'https://hooks.slack.test/1'}
+
+    with patch('app.handlers.ask_command.config.ASK_MODE', 'queue'):
+        await handle_ask_command(ack, command, respond, services)
+
+    ack.assert_awaited_once()
+    respond.assert_not_awaited()
+    services.kb_service.retrieve.assert_not_awaited()
+    [(_, fields)] = services.redis_service.streams[services.ask_queue.stream]
+    assert fields['question'] == 'What is AI?' and fields['response_url'] == 'https://hooks.slack.test/1'
+
+
+@pytest.mark.asyncio
+async def test_queue_mode_answers_inline_when_enqueue_fails():
+    ack = AsyncMock()
+    respond = AsyncMock()
+    services = make_services(FakeRedisService())
+    services.redis_service.add_to_stream = AsyncMock(return_value=None)
+    services.kb_service.retrieve = AsyncMock(return_value=packed('context'))
+    services.openai_service.get_answer = AsyncMock(return_value='Answered inline.')
+    command = {'user_id': 'U123', 'text': 'What is AI?', 'response_url': 'https://hooks.slack.test/1'}
+
+    with patch('app.handlers.ask_command.config.ASK_MODE', 'queue'):
+        await handle_ask_command(ack, command, respond, services)
+
+    blocks = respond.call_args[1]['blocks']
+    assert any('Answered inline.' in block['text']['text'] for block in blocks if block['type'] == 'section')
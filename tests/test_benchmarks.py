@@ -0,0 +1,127 @@
+import fitz
+import httpx
+import pytest
+from openai import AsyncOpenAI, InternalServerError
+from slack_sdk.signature import SignatureVerifier
+
+from benchmarks.corpus import MANIFEST, PAGES_PER_DOCUMENT, generate_corpus
+from benchmarks.loadtest import SIGNING_SECRET, max_sustainable_rps, signed_command
+from benchmarks.run import compare, summarize
+from benchmarks.standins import FakeOpenAI, FakeSlack
+
+
+def openai_client(stand_in):
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stand_in))
+    return AsyncOpenAI(api_key="sk-test", base_url="http://openai.test/v1", http_client=http_client, max_retries=0)
+
+
+def test_generate_corpus_is_reproducible(tmp_path):
+    first = generate_corpus(str(tmp_path / "a"), pages=PAGES_PER_DOCUMENT + 5, seed=7)
+    second = generate_corpus(str(tmp_path / "b"), pages=PAGES_PER_DOCUMENT + 5, seed=7)
+
+    assert len(first.documents) == 2
+    assert [f.question for f in first.facts] == [f.question for f in second.facts]
+    assert [f.answer for f in first.facts] == [f.answer for f in second.facts]
+    with fitz.open(first.documents[-1]) as doc:
+        assert doc.page_count == 5
+        text = "".join(page.get_text() for page in doc)
+    fact = first.facts[-1]
+    assert fact.codename in text and fact.answer in text
+
+
+def test_generate_corpus_reuses_existing_manifest(tmp_path):
+    manifest = generate_corpus(str(tmp_path), pages=3, seed=1)
+    (tmp_path / MANIFEST).touch()
+    mtime = (tmp_path / MANIFEST).stat().st_mtime_ns
+
+    again = generate_corpus(str(tmp_path), pages=3, seed=1)
+
+    assert again == manifest
+    assert (tmp_path / MANIFEST).stat().st_mtime_ns == mtime
+
+
+def test_compare_flags_slower_timings_and_lower_throughput():
+    baseline = {"suites": {"pages_10": {
+        "warm_query": {"count": 30, "p95_ms": 10.0, "p50_ms": 0.05},
+        "extraction": {"pages_per_second": 100.0},
+        "fact_hit_rate": 1.0,
+    }}}
+    current = {"suites": {"pages_10": {
+        "warm_query": {"count": 60, "p95_ms": 15.0, "p50_ms": 0.1},
+        "extraction": {"pages_per_second": 150.0},
+        "fact_hit_rate": 0.5,
+    }}}
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert any(line.startswith("pages_10.warm_query.p95_ms") for line in regressions)
+    assert any(line.startswith("pages_10.fact_hit_rate") for line in regressions)
+    # Faster throughput, sub-noise latency changes and sample counts are not regressions
+    assert len(regressions) == 2
+
+
+def test_summarize_reports_percentiles_in_milliseconds():
+    summary = summarize([i / 1000 for i in range(1, 101)])
+
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == 51.0
+    assert summary["p99_ms"] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_fake_openai_streams_tokens_and_usage_to_the_sdk():
+    client = openai_client(FakeOpenAI(latency=0, tokens_per_second=0, answer_tokens=3))
+
+    stream = await client.chat.completions.create(
+        model="gpt-4", messages=[{"role": "user", "content": "hi there"}],
+        stream=True, stream_options={"include_usage": True},
+    )
+    deltas, usage = [], None
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            deltas.append(chunk.choices[0].delta.content)
+        usage = chunk.usage or usage
+
+    assert "".join(deltas) == "token0 token1 token2 "
+    assert usage.completion_tokens == 3 and usage.prompt_tokens == 2
+
+
+@pytest.mark.asyncio
+async def test_fake_openai_injects_errors():
+    stand_in = FakeOpenAI(latency=0, error_rate=1.0)
+    client = openai_client(stand_in)
+
+    with pytest.raises(InternalServerError):
+        await client.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": "hi"}])
+    assert stand_in.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_fake_slack_records_final_answer_after_placeholder():
+    slack = FakeSlack()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=slack), base_url="http://slack.test") as client:
+        auth = await client.post("/api/auth.test")
+        await client.post("/respond/r1", json={"text": "_Thinking..._"})
+        assert not slack.answered("r1").is_set()
+        await client.post("/respond/r1", json={"text": "The answer", "replace_original": True})
+
+    assert auth.json()["team_id"] == slack.team_id
+    assert slack.answered("r1").is_set()
+    assert slack.answer_time("r1") == slack.callbacks["r1"][1].received_at
+
+
+def test_signed_command_passes_slack_verification():
+    body, headers = signed_command("What is the policy?", "http://slack.test/respond/1", "T1")
+
+    verifier = SignatureVerifier(SIGNING_SECRET)
+    assert verifier.is_valid(body.decode(), headers["x-slack-request-timestamp"], headers["x-slack-signature"])
+    assert b"command=%2Fask" in body
+
+
+def test_max_sustainable_rps_stops_at_first_slo_miss():
+    def step(rate, p95, unanswered=0):
+        return {"offered_rps": rate, "ack": {"p95_ms": p95}, "unanswered": unanswered, "errors": 0, "sent": 100}
+
+    steps = [step(5, 100), step(10, 400), step(20, 2500), step(40, 300, unanswered=3)]
+
+    assert max_sustainable_rps(steps, ack_slo_ms=1000) == 10
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import fitz
+import pytest
+
+from app import kb
+from app.services import knowledge_base
+from app.services.knowledge_base import KnowledgeBaseService
+
+
+class WordEncoding:
+    def encode_batch(self, texts):
+        return [[0] * len(t.split()) for t in texts]
+
+
+@pytest.fixture
+def pdf_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr('app.utils.tokens.get_encoding', lambda: WordEncoding())
+    monkeypatch.setattr(knowledge_base, "PDF_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(knowledge_base, "CORPUS_DIR", str(tmp_path / "corpus"))
+    monkeypatch.setattr(kb.config, "CORPUS_DIR", str(tmp_path / "corpus"))
+    directory = tmp_path / "pdfs"
+    directory.mkdir()
+    for name, body in [("one.pdf", "orchid care guide"), ("two.pdf", "cactus watering schedule")]:
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), body)
+        doc.save(str(directory / name))
+        doc.close()
+    return directory
+
+
+def test_build_writes_a_corpus_that_boots_without_parsing(pdf_dir, monkeypatch, capsys):
+    assert kb.main(["build", "--pdf-dir", str(pdf_dir), "--workers", "1"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["documents"] == 2 and summary["chunks"] == 2 and summary["corpus"]
+
+    def no_parsing(path):
+        raise AssertionError("PDFs should not be parsed when a prebuilt corpus matches")
+    monkeypatch.setattr('app.services.knowledge_base.fitz.open', no_parsing)
+    svc = KnowledgeBaseService(str(pdf_dir), ingest_workers=1, cache_dir="")
+    assert asyncio.run(svc.load()) == 2
+    hits = svc._index.search("cactus")
+    assert [svc._index.get_chunk(c).doc_id for c, _ in hits] == [str(pdf_dir / "two.pdf")]
+
+
+def test_changed_pdf_invalidates_the_prebuilt_corpus(pdf_dir):
+    assert kb.main(["build", "--pdf-dir", str(pdf_dir), "--workers", "1"]) == 0
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "fern misting routine")
+    doc.save(str(pdf_dir / "two.pdf"))
+    doc.close()
+    svc = KnowledgeBaseService(str(pdf_dir), ingest_workers=1)
+    asyncio.run(svc.load())
+    assert svc._index.search("cactus") == []
+    assert len(svc._index.search("fern")) == 1
+
+
+def test_build_reports_unwritable_corpus(pdf_dir, tmp_path, monkeypatch, capsys):
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a directory")
+    monkeypatch.setattr(knowledge_base, "CORPUS_DIR", str(blocked))
+    monkeypatch.setattr(kb.config, "CORPUS_DIR", str(blocked))
+    assert kb.main(["build", "--pdf-dir", str(pdf_dir), "--workers", "1"]) == 1
+
+
+def test_cli_imports_without_slack_or_openai_secrets(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    secrets = ("SLACK_BOT_TOKEN", "SLACK_SIGNING_SECRET", "OPENAI_API_KEY", "SLACK_CLIENT_ID", "SLACK_CLIENT_SECRET")
+    env = {k: v for k, v in os.environ.items() if k not in secrets}
+    # Run from an empty directory so load_dotenv() finds no .env
+    env["PYTHONPATH"] = os.getcwd()
+    result = subprocess.run([sys.executable, "-m", "app.kb", "--help"], capture_output=True, text=True,
+                            env=env, cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
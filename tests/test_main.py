@@ -0,0 +1,136 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.container import ServiceContainer, set_services
+
+pytestmark = pytest.mark.asyncio
+
+
+async def call(app, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+def slow_container(loaded: asyncio.Event):
+    redis_service = MagicMock()
+    redis_service.ping = AsyncMock(return_value=True)
+    redis_service.start = AsyncMock()
+    redis_service.close = AsyncMock()
+    kb_service = MagicMock(spec=["load", "start_watching"])
+    async def load():
+        await loaded.wait()
+
+    kb_service.load = AsyncMock(side_effect=load)
+    kb_service.start_watching = AsyncMock()
+    openai_service = MagicMock()
+    openai_service.close = AsyncMock()
+    return ServiceContainer(redis_service, kb_service, openai_service, semantic_cache=None,
+                            single_flight=MagicMock(), answer_cache=MagicMock(), ask_queue=MagicMock())
+
+
+async def test_lifespan_completes_before_warmup_and_readiness_follows(monkeypatch):
+    from app import main
+    from app.utils import config
+
+    monkeypatch.setattr(config, "PDF_WATCH_ENABLED", False)
+    loaded = asyncio.Event()
+    services = slow_container(loaded)
+    previous = set_services(services)
+    lifespan = None
+    try:
+        inbox = asyncio.Queue()
+        await inbox.put({"type": "lifespan.startup"})
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        lifespan = asyncio.create_task(main.api({"type": "lifespan"}, inbox.get, send))
+        for _ in range(100):
+            if sent:
+                break
+            await asyncio.sleep(0.01)
+        # The server may accept requests while the knowledge base is still loading
+        assert sent == [{"type": "lifespan.startup.complete"}]
+        start, body = await call(main.api, {"type": "http", "method": "GET", "path": config.READINESS_PATH})
+        assert start["status"] == 503
+        assert json.loads(body["body"])["knowledge_base"] == "loading"
+
+        loaded.set()
+        for _ in range(100):
+            if services.started:
+                break
+            await asyncio.sleep(0.01)
+        start, body = await call(main.api, {"type": "http", "method": "GET", "path": config.READINESS_PATH})
+        assert start["status"] == 200
+        assert json.loads(body["body"]) == {"ready": True, "redis": "ok", "knowledge_base": "loaded"}
+
+        await inbox.put({"type": "lifespan.shutdown"})
+        await asyncio.wait_for(lifespan, 1)
+        assert sent[-1] == {"type": "lifespan.shutdown.complete"}
+        services.redis_service.close.assert_awaited_once()
+    finally:
+        if lifespan is not None and not lifespan.done():
+            lifespan.cancel()
+        set_services(previous)
+
+
+async def test_shutdown_does_not_build_services_that_never_started(monkeypatch):
+    from app import main
+    from app.services import container as container_module
+
+    monkeypatch.setattr(container_module, "_services", None)
+    monkeypatch.setattr(main, "get_services", MagicMock(side_effect=AssertionError("container built at shutdown")))
+    inbox = asyncio.Queue()
+    for message in ({"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}):
+        await inbox.put(message)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await asyncio.wait_for(main.api({"type": "lifespan"}, inbox.get, send), 1)
+    assert sent == [{"type": "lifespan.startup.complete"}, {"type": "lifespan.shutdown.complete"}]
+    assert container_module.current_services() is None
+
+
+async def test_readiness_before_services_exist(monkeypatch):
+    from app.services import container as container_module
+
+    monkeypatch.setattr(container_module, "_services", None)
+    start, body = await call(container_module.readiness_app, {"type": "http", "method": "GET", "path": "/readyz"})
+    assert start["status"] == 503
+    assert json.loads(body["body"]) == {"ready": False}
+
+
+async def test_importing_the_app_does_not_load_the_openai_sdk():
+    import subprocess
+    import sys
+
+    code = "import sys, app.main; print('openai' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+
+async def test_redis_store_backend_does_not_build_services_at_import():
+    import os
+    import subprocess
+    import sys
+
+    code = ("import app.main; from app.services.container import current_services; "
+            "print(current_services() is None)")
+    env = dict(os.environ, SLACK_STORE_BACKEND="redis")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    assert result.stdout.strip().splitlines()[-1] == "True"
+    assert "Failed to initialize Slack Bolt App" not in result.stderr
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.handlers.ask_command import generic_error_blocks
+from app.services.ask_queue import AskJob, AskQueue
+from app.worker import RESPONSE_URL_TTL, AskWorker
+from tests.fakes import FakeRedisService
+
+pytestmark = pytest.mark.asyncio
+
+
+def job(question="What is the VPN policy?", enqueued_at=None):
+    return AskJob(question=question, user_id="U1", response_url="https://hooks.slack.test/1",
+                  enqueued_at=time.time() if enqueued_at is None else enqueued_at)
+
+
+async def make_worker(queue=None, **kwargs):
+    if queue is None:
+        queue = AskQueue(FakeRedisService(), stream="ask:test", group="workers")
+        await queue.ensure_group()
+    responses = []
+
+    def respond_factory(url):
+        async def respond(**message):
+            responses.append((url, message))
+        return respond
+
+    worker = AskWorker(services=object(), queue=queue, consumer=kwargs.pop("consumer", "w1"), block_ms=10,
+                       respond_factory=respond_factory, **kwargs)
+    return worker, responses
+
+
+async def run_until(worker, condition, timeout=2.0):
+    task = asyncio.create_task(worker.run())
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(task, timeout)
+
+
+def pending(queue):
+    return queue.redis_service.groups[(queue.stream, queue.group)]["pending"]
+
+
+async def test_worker_answers_and_acknowledges_jobs():
+    worker, _ = await make_worker()
+    await worker.queue.enqueue(job("first"))
+    await worker.queue.enqueue(job("second"))
+
+    with patch("app.worker.handle_ask_command", new_callable=AsyncMock) as handle:
+        await run_until(worker, lambda: handle.await_count == 2)
+
+    questions = sorted(call.args[1]["text"] for call in handle.await_args_list)
+    assert questions == ["first", "second"]
+    assert all(call.kwargs["allow_queue"] is False for call in handle.await_args_list)
+    assert pending(worker.queue) == {}
+
+
+async def test_failed_job_stays_pending_and_is_reclaimed_by_another_worker():
+    crashed, _ = await make_worker()
+    entry_id = await crashed.queue.enqueue(job())
+    with patch("app.worker.handle_ask_command", new_callable=AsyncMock, side_effect=RuntimeError("boom")) as handle:
+        await run_until(crashed, lambda: handle.await_count == 1)
+    assert entry_id in pending(crashed.queue)
+
+    rescuer, _ = await make_worker(crashed.queue, consumer="w2", claim_idle=0)
+    with patch("app.worker.handle_ask_command", new_callable=AsyncMock) as handle:
+        await run_until(rescuer, lambda: handle.await_count == 1)
+
+    assert pending(crashed.queue) == {}
+
+
+async def test_job_over_max_deliveries_is_dead_lettered_and_user_notified():
+    worker, responses = await make_worker(max_deliveries=1)
+    entry_id = await worker.queue.enqueue(job())
+    await worker.queue.read("gone", count=1, block_ms=0)
+    worker.claim_idle = 0
+
+    with patch("app.worker.handle_ask_command", new_callable=AsyncMock) as handle:
+        await run_until(worker, lambda: worker.queue.redis_service.streams.get("ask:test:dead"))
+
+    handle.assert_not_awaited()
+    assert responses == [("https://hooks.slack.test/1", {"blocks": generic_error_blocks})]
+    assert entry_id not in pending(worker.queue)
+
+
+async def test_expired_jobs_are_dropped_without_answering():
+    worker, responses = await make_worker()
+    await worker.queue.enqueue(job(enqueued_at=time.time() - RESPONSE_URL_TTL - 1))
+
+    with patch("app.worker.handle_ask_command", new_callable=AsyncMock) as handle:
+        await run_until(worker, lambda: worker.queue.redis_service.streams.get("ask:test:dead"))
+
+    handle.assert_not_awaited()
+    assert responses == []
+    assert pending(worker.queue) == {}
+
+
+async def test_stop_waits_for_in_flight_jobs():
+    worker, _ = await make_worker()
+    await worker.queue.enqueue(job())
+    finished = asyncio.Event()
+
+    async def slow_answer(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        finished.set()
+
+    with patch("app.worker.handle_ask_command", side_effect=slow_answer):
+        await run_until(worker, lambda: worker._active)
+
+    assert finished.is_set()
+    assert pending(worker.queue) == {}
+
+
+async def test_worker_backs_off_while_the_stream_cannot_be_read():
+    queue = AsyncMock()
+    queue.stream = "ask:test"
+    queue.ensure_group.return_value = True
+    queue.read.return_value = None
+    queue.claim_idle.return_value = []
+    worker, _ = await make_worker(queue)
+    sleeps = []
+
+    async def sleep_unless_stopping(seconds):
+        sleeps.append(seconds)
+        return len(sleeps) == 3
+
+    worker._sleep_unless_stopping = sleep_unless_stopping
+    await asyncio.wait_for(worker.run(), 1.0)
+    assert queue.read.await_count == 3
+    assert sleeps == [1.0, 2.0, 4.0]
@@ -0,0 +1,54 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.metrics import ASK_STAGE_SECONDS, metrics_app, record_openai_usage, stage_timer
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def call_app(app, method="GET"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": "/metrics"}, receive, send)
+    return sent
+
+
+def test_stage_timer_observes_histogram():
+    before = sample("slackgpt_ask_stage_seconds_count", stage="retrieval")
+    with stage_timer("retrieval"):
+        pass
+    assert sample("slackgpt_ask_stage_seconds_count", stage="retrieval") == before + 1
+
+
+def test_record_openai_usage_counts_tokens():
+    class Usage:
+        prompt_tokens = 120
+        completion_tokens = 30
+
+    before = sample("slackgpt_openai_tokens_total", kind="prompt")
+    record_openai_usage(Usage())
+    record_openai_usage(None)
+    assert sample("slackgpt_openai_tokens_total", kind="prompt") == before + 120
+
+
+@pytest.mark.asyncio
+async def test_metrics_app_serves_prometheus_text():
+    ASK_STAGE_SECONDS.labels(stage="ack").observe(0.01)
+    start, body = await call_app(metrics_app)
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/plain")
+    assert b'slackgpt_ask_stage_seconds_bucket{le="0.01",stage="ack"}' in body["body"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_app_rejects_other_methods():
+    start, _ = await call_app(metrics_app, method="POST")
+    assert start["status"] == 405
@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock, patch
+
+from app.utils import tokens
+
+
+def test_encoding_loaded_once_per_process():
+    tokens.get_encoding.cache_clear()
+    encoding = MagicMock()
+    try:
+        with patch("tiktoken.encoding_for_model", return_value=encoding) as loader:
+            assert tokens.get_encoding() is encoding
+            assert tokens.get_encoding() is encoding
+            loader.assert_called_once_with("gpt-4o")
+    finally:
+        tokens.get_encoding.cache_clear()
+
+
+def test_falls_back_to_cl100k():
+    tokens.get_encoding.cache_clear()
+    fallback = MagicMock()
+    try:
+        with patch("tiktoken.encoding_for_model", side_effect=KeyError("gpt-4o")), \
+             patch("tiktoken.get_encoding", return_value=fallback) as get_encoding:
+            assert tokens.get_encoding() is fallback
+            get_encoding.assert_called_once_with("cl100k_base")
+    finally:
+        tokens.get_encoding.cache_clear()
+
+
+def test_count_tokens_batch_uses_encode_batch(monkeypatch):
+    encoding = MagicMock()
+    encoding.encode_batch.return_value = [[1, 2], [3]]
+    monkeypatch.setattr(tokens, "get_encoding", lambda: encoding)
+    assert tokens.count_tokens_batch(["a b", "c"]) == [2, 1]
+    encoding.encode_batch.assert_called_once_with(["a b", "c"])
+    assert tokens.count_tokens_batch([]) == []